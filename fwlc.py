@@ -7,20 +7,54 @@
 :date: 2018, Mars
 
 :synopsis: REPL for Fun With Lambda Calculus
+
+Given arguments, fwlc does not start the REPL but evaluates a file (or the
+standard input) in batch mode:
+
+    python3 fwlc.py --batch corpus.txt --strategy need --format json
+
+Each line of the input is either an expression, a definition <Id> = <Exp>,
+or an <Id> defined above; blank lines and lines starting with # are skipped.
+The normal forms are computed by a pool of processes, and printed in the
+order of the input as soon as they are known, either as plain text or as
+JSON lines.
+
+The normal forms are cached, shared by the alpha equivalent expressions;
+with --cache FILE, the cache is also kept in FILE from one session to the
+next.
 """
 
+import argparse
+import json
+import multiprocessing
+import sys
 import lib.lexpr
 import lib.lread
+import lib.lbudget
 from string import ascii_uppercase
 
 PROMPT = "<°λ°> " 
 DIC = dict()
+# the normal forms already computed, see openCache
+CACHE = None
+# the strategies of the batch mode, the parallel one would need a pool in the
+# processes of the pool
+STRATEGIES = ("nbe", "hoas", "bytecode", "krivine", "cek", "need", "optimal",\
+              "explicit", "arena", "normal", "applicative")
+# the time given to :eval when no bound is given on the command line
+REPL_SECONDS = 10.0
 
 
-def repl_loop():
+def repl_loop(budget=None):
     """
     REPL loop for fwlc.
+
+    :param budget: the bounds on the evaluations of :eval, by default
+       REPL_SECONDS seconds
+    :type budget: Budget or NoneType
     """
+    if budget is None:
+        budget = lib.lbudget.Budget(maxSeconds=REPL_SECONDS)
     while True:
         
         command = input(PROMPT).split()
@@ -61,24 +95,27 @@ def repl_loop():
             except:
                 print("That does not seem to be a correct lambda expression.")
                     
-        elif command[0] == ":NOBeval":
+        elif command[0] in (":NOBeval", ":AOBeval"):
             try:
                 assert command[1] in DIC.keys()
-                traces = DIC[command[1]].betaEvalWithTraces()
-                for exp in traces:
-                    print(exp)
+                if command[0] == ":NOBeval":
+                    printTrace(DIC[command[1]], "normal")
+                else:
+                    printTrace(DIC[command[1]], "applicative")
             except AssertionError:
                 print("That is not a valid identificator.")
-
-        elif command[0] == ":AOBeval":
+               
+        elif command[0] == ":eval":
             try:
                 assert command[1] in DIC.keys()
-                traces = DIC[command[1]].betaEvalWithTraces(applicative)
-                for exp in traces:
-                    print(exp)
+                print(DIC[command[1]].normalize("hoas", budget, CACHE))
             except AssertionError:
                 print("That is not a valid identificator.")
-               
+            except lib.lbudget.BudgetError as error:
+                print(error.message)
+            except KeyboardInterrupt:
+                print("Interrupted.")
+
         elif command[0] == ":info":
             try:
                 assert command[1] in DIC.keys()
@@ -93,7 +130,7 @@ def repl_loop():
                     print("This is a combinator.")
                 else:
                     print("This is the set of free variables:")
-                    print(FV)
+                    print(set(FV))
 
             except AssertionError:
                 print("This is not a valid identificator.")
@@ -103,6 +140,28 @@ def repl_loop():
 
 
 
+def printTrace(exp, evalMode):
+    """
+    Print the steps of a Beta-evaluation as soon as they are reached, until
+    the normal form, until a term comes back, or until the user interrupts
+    it with Ctrl-C.
+
+    :param exp: the lambda expression to evaluate
+    :type exp: LambdaExp
+    :param evalMode: order of evaluation, either normal or applicative
+    :type evalMode: str
+    """
+    budget = lib.lbudget.Budget(detectCycles=True)
+    try:
+        for step in exp.iterBetaEval(evalMode, budget):
+            print(step, flush=True)
+    except lib.lbudget.BudgetError as error:
+        print(error.message)
+    except KeyboardInterrupt:
+        print("Interrupted.")
+
+
+
 def greeting():
     """
     Print greeting message for repl loop of fwlc.
@@ -130,6 +189,11 @@ def printHelp():
     in normal order of the lambda expression attached to the Id")
     print("\t :AOBeval <Id> :: print all the steps of a Beta-evaluation\n\t\t\
     in applicative order of the lambda expression attached to the Id")
+    print("\t\t(the steps are printed as they come, until a term comes\n\t\t\
+    back; Ctrl-C stops them)")
+    print("\t :eval <Id> :: print the Beta normal form of the lambda\n\t\t\
+    expression attached to the Id, compiled once for all")
+    print("\t\t(the evaluation is bounded, Ctrl-C stops it)")
     print("\t :info <Id> :: print some info about the lambda expression\n\t\t\
     attached to the <Id>.")
     print("\t <Id> = <Exp> :: assign the lambda expression <Exp> the the\n\t\t\
@@ -138,9 +202,184 @@ def printHelp():
 
 
 
+def readJobs(stream):
+    """
+    Read the lines of a batch, resolving the identificators they use.
+
+    :param stream: the lines of the batch
+    :type stream: iterable
+    :return: the jobs (line number, name or None, expression) and the errors
+       (line number, name or None, expression, message), in the order of the
+       input
+    :rtype: generator
+    """
+    definitions = dict()
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        name, _, expression = line.rpartition("=")
+        name, expression = name.strip() or None, expression.strip()
+        if not expression:
+            yield (number, name, expression,\
+                   "Syntax error: there is no expression after =.")
+            continue
+        if set(expression).issubset(ascii_uppercase):
+            if expression not in definitions:
+                yield (number, name, expression, "Unknown identificator: "\
+                       + expression)
+                continue
+            expression = definitions[expression]
+        if name is not None:
+            if not set(name).issubset(ascii_uppercase):
+                yield (number, name, expression,\
+                       "This is not a valid identificator.")
+                continue
+            definitions[name] = expression
+        yield (number, name, expression)
+
+
+
+def evalJob(job):
+    """
+    Compute the normal form of a job of the batch.
+
+    :param job: the job given by readJobs, with the strategy, the budget and
+       whether to contract the eta redexes
+    :type job: tuple
+    :return: the result, with either the normal form or the error
+    :rtype: dict
+    """
+    (number, name, expression, *error), strategy, budget, eta = job
+    result = {"line": number, "name": name, "input": expression}
+    if error:
+        result["error"] = error[0]
+        return result
+    try:
+        exp = lib.lread.read(expression)
+        result["normal"] = str(exp.normalize(strategy, budget, CACHE, eta))
+    except lib.lbudget.BudgetError as error:
+        result["error"] = error.message
+    except RecursionError:
+        result["error"] = "The expression is too deep."
+    except Exception as error:
+        result["error"] = getattr(error, "message", str(error))\
+                          or type(error).__name__
+    return result
+
+
+
+def openCache(path=None):
+    """
+    Open the cache of the normal forms of this process.
+
+    :param path: the file of the disk tier of the cache, if any
+    :type path: str or NoneType
+    """
+    global CACHE
+    CACHE = lib.lexpr.NormalFormCache(path=path)
+
+
+
+def batch(stream, strategy="nbe", outputFormat="text", processes=None,\
+          budget=None, cachePath=None, eta=False):
+    """
+    Normalize all the expressions of a batch and print them in order.
+
+    :param stream: the lines of the batch
+    :type stream: iterable
+    :param strategy: the engine to use, see STRATEGIES
+    :type strategy: str
+    :param outputFormat: either text or json
+    :type outputFormat: str
+    :param processes: the number of processes, by default the number of
+       cores
+    :type processes: int or NoneType
+    :param budget: the bounds on the evaluation of each expression, if any
+    :type budget: Budget or NoneType
+    :param cachePath: the file of the disk tier of the cache, if any
+    :type cachePath: str or NoneType
+    :param eta: whether to compute the beta-eta normal forms
+    :type eta: bool
+    :return: whether every expression has been normalized
+    :rtype: bool
+    """
+    jobs = ((job, strategy, budget, eta) for job in readJobs(stream))
+    success = True
+    with multiprocessing.Pool(processes, openCache, (cachePath,)) as pool:
+        for result in pool.imap(evalJob, jobs, chunksize=16):
+            if outputFormat == "json":
+                print(json.dumps(result, ensure_ascii=False))
+            elif "error" in result:
+                print("line " + str(result["line"]) + ": "\
+                      + result["error"], file=sys.stderr)
+            elif result["name"] is None:
+                print(result["normal"])
+            else:
+                print(result["name"] + " = " + result["normal"])
+            success = success and "error" not in result
+    return success
+
+
+
+def parseArguments():
+    """
+    Parse the arguments of the command line.
+
+    :return: the arguments
+    :rtype: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(description="Fun With Lambda Calculus.")
+    parser.add_argument("--batch", metavar="FILE", nargs="?", const="-",\
+                        help="normalize the expressions of FILE (or of the\
+                        standard input) instead of starting the REPL")
+    parser.add_argument("--strategy", choices=STRATEGIES, default="nbe",\
+                        help="the engine used to normalize (default: nbe)")
+    parser.add_argument("--eta", action="store_true", help="compute the\
+                        beta-eta normal forms instead of the beta normal\
+                        forms")
+    parser.add_argument("--format", choices=("text", "json"),\
+                        default="text", help="the output format, plain text\
+                        or JSON lines (default: text)")
+    parser.add_argument("--processes", type=int, default=None,\
+                        help="the size of the pool (default: one per core)")
+    parser.add_argument("--max-steps", type=int, default=None,\
+                        help="stop the evaluation of an expression after so\
+                        many steps")
+    parser.add_argument("--max-seconds", type=float, default=None,\
+                        help="stop the evaluation of an expression after so\
+                        many seconds")
+    parser.add_argument("--detect-cycles", action="store_true",\
+                        help="stop the evaluation of an expression as soon\
+                        as a term comes back (normal and applicative\
+                        strategies)")
+    parser.add_argument("--cache", metavar="FILE", default=None,\
+                        help="keep the normal forms in FILE from one session\
+                        to the next")
+    return parser.parse_args()
+
+
 
 
 if __name__ == '__main__':
-    greeting()
-    repl_loop()    
+    arguments = parseArguments()
+    budget = None
+    if arguments.max_steps is not None or arguments.max_seconds is not None\
+       or arguments.detect_cycles:
+        budget = lib.lbudget.Budget(arguments.max_steps, arguments.max_seconds,\
+                                    detectCycles=arguments.detect_cycles)
+    if arguments.batch is None:
+        openCache(arguments.cache)
+        greeting()
+        repl_loop(budget)
+    else:
+        if arguments.batch == "-":
+            stream = sys.stdin
+        else:
+            stream = open(arguments.batch, "r")
+        with stream:
+            success = batch(stream, arguments.strategy, arguments.format,\
+                            arguments.processes, budget, arguments.cache,\
+                            arguments.eta)
+        sys.exit(0 if success else 1)
 
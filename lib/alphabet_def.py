@@ -1,10 +1,99 @@
 #!/usr/bin/env python3
 
-from string import ascii_lowercase
+from string import ascii_lowercase, digits
 
 VAR_SET = set(ascii_lowercase)
+# a variable name may be followed by an index, as in x1 or y42
+INDEX_SET = set(digits)
 POSSIBLE_OP = (chr(955), '/')
 # for representation:
 LAMBDA_OP = POSSIBLE_OP[0]
 LAMBDA_DOT = '.'
-TOTAL_ALPHABET = VAR_SET.union(set(POSSIBLE_OP).union(set(LAMBDA_DOT)))
+TOTAL_ALPHABET = VAR_SET.union(INDEX_SET, set(POSSIBLE_OP), set(LAMBDA_DOT))
+
+
+
+def isVarName(name):
+    """
+    Test whether a string is the name of a variable, that is a letter of
+    VAR_SET followed by an optional index made of digits.
+
+    :param name: the candidate name
+    :type name: str
+    :rtype: bool
+    :Examples:
+
+    >>> isVarName("x") and isVarName("x12")
+    True
+    >>> isVarName("12") or isVarName("xy") or isVarName("") or isVarName(3)
+    False
+    """
+    return type(name) == str and len(name) > 0 and name[0] in VAR_SET\
+        and all(char in INDEX_SET for char in name[1:])
+
+
+
+def tokenize(string):
+    """
+    Split the representation of a lambda expression into tokens: a variable
+    name with its index is one token, any other character is a token on its
+    own.
+
+    :param string: the representation of a lambda expression
+    :type string: str
+    :return: the tokens, from left to right
+    :rtype: generator
+    :Examples:
+
+    >>> list(tokenize("(/x1.(x1y))"))
+    ['(', '/', 'x1', '.', '(', 'x1', 'y', ')', ')']
+    """
+    position = 0
+    while position < len(string):
+        end = position + 1
+        if string[position] in VAR_SET:
+            while end < len(string) and string[end] in INDEX_SET:
+                end += 1
+        yield string[position:end]
+        position = end
+
+
+
+def freshVar(hint, *avoid):
+    """
+    Build a variable name which is in none of the given sets.
+
+    .. note::
+
+       The name is the letter of the hint followed by the first value of a
+       counter that gives an unused name: the supply never runs out, and
+       only the given sets are looked at, never a whole expression.
+
+    :param hint: the name the fresh variable is derived from
+    :type hint: str
+    :param avoid: the sets of names that can not be used
+    :type avoid: set
+    :return: a fresh variable name
+    :rtype: str
+    :Examples:
+
+    >>> freshVar("x", {"x"})
+    'x1'
+    >>> freshVar("x1", {"x1", "x2"}, {"x3"})
+    'x4'
+    """
+    base = hint.rstrip(digits)
+    counter = 1
+    name = base + str(counter)
+    while any(name in names for names in avoid):
+        counter += 1
+        name = base + str(counter)
+    return name
+
+
+
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
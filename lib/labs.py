@@ -12,6 +12,7 @@
 from lib.alphabet_def import *
 from lib.lvar import *
 from lib.lapp import *
+from lib.lintern import NODES
 
 class LambdaAbsError(Exception):
     """
@@ -35,9 +36,12 @@ class LambdaAbs():
 
     :methods:
 
-    - init(self, binder, body)
+    - new(cls, binder, body)
     - repr(self)
+    - getParts(self)
     - eq(self other)
+    - hash(self)
+    - setattr(self, name, value)
     - getBody(self)
     - getBinder(self)
     - getFreeVar(self)
@@ -51,10 +55,20 @@ class LambdaAbs():
 
 
 
-    def __init__(self, binder, body):
+    __slots__ = ('binder', 'body', 'freeVars', 'boundVars', 'betaNormal',\
+                 'hashValue', '__weakref__')
+
+
+
+    def __new__(cls, binder, body):
         """
         Constructor for LambdaAbs class.
 
+        .. note::
+
+           Abstractions are hash-consed: building an abstraction with the
+           same binder and the very same body returns the existing node.
+
         :param binder: the binder variable of tha lambda abstraction
         :type binder: str
         :param body: the body of the lambda abstraction
@@ -77,6 +91,8 @@ class LambdaAbs():
         True
         >>> type(identity.body) == LambdaVar
         True
+        >>> LambdaAbs("x", x) is identity
+        True
         >>> binder_error = LambdaAbs(",", x)
         Traceback (most recent call last):
         ...
@@ -88,12 +104,22 @@ class LambdaAbs():
         """
         try:
             assert type(binder) == str
-            assert binder in VAR_SET
+            assert isVarName(binder)
             # assert type(body) in {LambdaAbs, LambdaVar, LambdaApp}
-            self.binder = binder
-            self.body = body
         except AssertionError:
             raise LambdaAbsError('This is not a lambda abstraction.')
+        key = (cls, binder, body)
+        node = NODES.get(key)
+        if node is None:
+            node = object.__new__(cls)
+            object.__setattr__(node, "binder", binder)
+            object.__setattr__(node, "body", body)
+            object.__setattr__(node, "freeVars", body.freeVars - {binder})
+            object.__setattr__(node, "boundVars", body.boundVars | {binder})
+            object.__setattr__(node, "betaNormal", body.betaNormal)
+            object.__setattr__(node, "hashValue", hash(key))
+            NODES[key] = node
+        return node
 
         
 
@@ -117,19 +143,25 @@ class LambdaAbs():
         >>> print(double)
         (λx.(xx))
         """
-        rep = "({}".format(LAMBDA_OP)
-        rep += self.binder
-        rep += LAMBDA_DOT
-        rep += "{}".format(self.body)
-        rep += ")"
-        return rep
+        return represent(self)
+
+
+
+    def getParts(self):
+        """
+        Get the parts of the representation, see lvar.represent.
+
+        :rtype: list
+        """
+        return ["(" + LAMBDA_OP + self.binder + LAMBDA_DOT, self.body, ")"]
         
 
  
     def __eq__(self, other):
         """
         This is used for strict equivalence, that is for two lambda expressions
-        that are written exactly the same.
+        that are written exactly the same. Since the nodes are hash-consed,
+        this is an identity check.
 
         :return:
 
@@ -148,7 +180,23 @@ class LambdaAbs():
         >>> x == z
         False
         """
-        return self.__repr__() == other.__repr__()
+        return self is other
+
+
+
+    def __hash__(self):
+        """
+        Get the structural hash, computed once when the node is built.
+        """
+        return self.hashValue
+
+
+
+    def __setattr__(self, name, value):
+        """
+        Lambda abstractions are immutable: build a new abstraction instead.
+        """
+        raise LambdaAbsError("Lambda abstractions are immutable.")
 
        
 
@@ -156,8 +204,12 @@ class LambdaAbs():
         """
         Get free variables in the expression.
 
+        .. note::
+
+           The set is computed once, when the node is built.
+
         :return: the name of the free variables
-        :rtype: str
+        :rtype: frozenset
         :Examples:
 
         >>> from lvar import *
@@ -168,7 +220,7 @@ class LambdaAbs():
         >>> LambdaAbs("x", xy).freeVar() == {"y"}
         True
         """
-        return self.body.freeVar() - set(self.binder)
+        return self.freeVars
 
 
 
@@ -177,12 +229,14 @@ class LambdaAbs():
         Get the set of bound variables in the expression.
 
         :return: the set of the bound variables
-        :rtype: set
+        :rtype: frozenset
         :Examples:
 
+        >>> from lvar import *
+        >>> LambdaAbs("x", LambdaAbs("y", LambdaVar("z"))).boundVar() == {"x", "y"}
+        True
         """
-        # TODO: doctests
-        return set(self.binder).union(self.body.boundVar())
+        return self.boundVars
  
 
     def rename(self, old_name, new_name):
@@ -197,7 +251,9 @@ class LambdaAbs():
         :type old_name: str
         :param new_name: the new name to give
         :type new_name: str
-        :UC: new_name in VAR_SET == True
+        :return: the renamed expression
+        :rtype: LambdaAbs
+        :UC: isVarName(new_name) == True
         :Examples:
 
         >>> from lvar import *
@@ -205,22 +261,25 @@ class LambdaAbs():
         >>> identity = LambdaAbs("x", LambdaVar("x"))
         >>> xy = LambdaApp(LambdaVar("x"), LambdaVar("y"))
         >>> apply_y = LambdaAbs("x", xy)
-        >>> identity.rename("x", "y")
-        >>> identity.binder == "y"
+        >>> renamed = identity.rename("x", "y")
+        >>> renamed.binder == "y"
+        True
+        >>> renamed.body.getName() == "y"
         True
-        >>> identity.body.getName() == "y"
+        >>> identity.binder == "x"
         True
-        >>> apply_y.rename("y", "l")
-        >>> apply_y.freeVar() == {"l"}
+        >>> apply_y.rename("y", "l").freeVar() == {"l"}
         True
         """
         try:
-            assert new_name in VAR_SET
-            if self.binder == old_name:
-                self.binder = new_name
-            self.body.rename(old_name, new_name)
+            assert isVarName(new_name)
         except AssertionError:
             raise LambdaAbsError("This is not the name of a lambda variable.")
+        if self.binder == old_name:
+            binder = new_name
+        else:
+            binder = self.binder
+        return LambdaAbs(binder, self.body.rename(old_name, new_name))
 
 
 
@@ -253,7 +312,7 @@ class LambdaAbs():
         >>> NewTwo.body.argument == np
         True
         """
-        if self.binder != var_name:
+        if var_name in self.freeVars:
             newBody = self.body.substitute(var_name, expression)
             return LambdaAbs(self.binder, newBody)
         else:
@@ -286,7 +345,7 @@ class LambdaAbs():
         >>> LambdaAbs("x", LambdaApp(LambdaVar("x"), LambdaVar("y"))).isBetaNormal()
         True
         """
-        return self.body.isBetaNormal()
+        return self.betaNormal
 
 
 
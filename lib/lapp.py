@@ -12,6 +12,7 @@
 from lib.alphabet_def import *
 from lib.lvar import *
 from lib.labs import *
+from lib.lintern import NODES
 
 
 
@@ -41,8 +42,11 @@ class LambdaApp():
 
     :methods:
 
-    - __initi__
+    - __new__
     - __repr__
+    - getParts
+    - __hash__
+    - __setattr__
     - getFunction(self)
     - getArgument(self)
     - getFreeVar(self)
@@ -55,10 +59,20 @@ class LambdaApp():
 
 
 
-    def __init__(self, function, argument):
+    __slots__ = ('function', 'argument', 'freeVars', 'boundVars', 'betaNormal',\
+                 'hashValue', '__weakref__')
+
+
+
+    def __new__(cls, function, argument):
         """
         Constructor for LambdaApp class.
 
+        .. note::
+
+           Applications are hash-consed: building an application of the very
+           same function and argument returns the existing node.
+
         :param function: the function of the lambda application
         :type function: lexpr.LambdaExpr
         :param argument: the argument passed to the function of the lambda application
@@ -75,14 +89,26 @@ class LambdaApp():
         >>> xyx = LambdaApp(xy, x)
         >>> type(xyx) == LambdaApp
         True
+        >>> LambdaApp(x, y) is xy
+        True
         """
-        try:
-            # assert type(function) in {LambdaAbs, LambdaVar, LambdaApp}
-            # assert type(argument) in {LambdaAbs, LambdaVar, LambdaApp}
-            self.function = function
-            self.argument = argument
-        except AssertionError:
-            raise LambdaAppError('This is not a lambda application.')
+        key = (cls, function, argument)
+        node = NODES.get(key)
+        if node is None:
+            node = object.__new__(cls)
+            object.__setattr__(node, "function", function)
+            object.__setattr__(node, "argument", argument)
+            object.__setattr__(node, "freeVars",\
+                               function.freeVars | argument.freeVars)
+            object.__setattr__(node, "boundVars",\
+                               function.boundVars | argument.boundVars)
+            object.__setattr__(node, "betaNormal",\
+                               type(function) != LambdaAbs\
+                               and function.betaNormal\
+                               and argument.betaNormal)
+            object.__setattr__(node, "hashValue", hash(key))
+            NODES[key] = node
+        return node
 
 
 
@@ -104,14 +130,25 @@ class LambdaApp():
         >>> print(xyz)
         ((xy)z)
         """
-        return "({}".format(self.function) + "{})".format(self.argument)
+        return represent(self)
+
+
+
+    def getParts(self):
+        """
+        Get the parts of the representation, see lvar.represent.
+
+        :rtype: list
+        """
+        return ["(", self.function, self.argument, ")"]
 
  
 
     def __eq__(self, other):
         """
         This is used for strict equivalence, that is for two lambda expressions
-        that are written exactly the same.
+        that are written exactly the same. Since the nodes are hash-consed,
+        this is an identity check.
 
         :return:
 
@@ -130,7 +167,29 @@ class LambdaApp():
         >>> x == z
         False
         """
-        return self.__repr__() == other.__repr__()
+        return self is other
+
+
+
+    def __hash__(self):
+        """
+        Get the structural hash, computed once when the node is built.
+        """
+        return self.hashValue
+
+
+
+    def __setattr__(self, name, value):
+        """
+        Lambda applications are immutable: build a new application instead.
+
+        >>> xy = LambdaApp(LambdaVar("x"), LambdaVar("y"))
+        >>> xy.function = LambdaVar("z") # doctest: +IGNORE_EXCEPTION_DETAIL
+        Traceback (most recent call last):
+        ...
+        lapp.LambdaAppError: Lambda applications are immutable.
+        """
+        raise LambdaAppError("Lambda applications are immutable.")
 
 
 
@@ -138,8 +197,12 @@ class LambdaApp():
         """
         Get the free variables of the expression.
 
+        .. note::
+
+           The set is computed once, when the node is built.
+
         :return: the free variables
-        :rtype: set
+        :rtype: frozenset
         :Examples:
         
         >>> from lvar import *
@@ -149,7 +212,7 @@ class LambdaApp():
         True
         >>> 
         """
-        return self.function.freeVar().union(self.argument.freeVar())
+        return self.freeVars
 
 
 
@@ -158,23 +221,33 @@ class LambdaApp():
         Get the set of bound variables in the expression.
 
         :return: the set of the bound variables
-        :rtype: set
+        :rtype: frozenset
         :Examples:
 
+        >>> from lvar import *
+        >>> xy = LambdaApp(LambdaVar("x"), LambdaVar("y"))
+        >>> LambdaApp(LambdaAbs("z", xy), xy).boundVar() == {"z"}
+        True
         """
-        # TODO: doctests
-        return self.function.boundVar().union(self.argument.boundVar())
+        return self.boundVars
 
 
 
-    def freshVar(self):
+    def freshVar(self, hint="v"):
         """
         Find a variable that does not occur in the expression.
 
+        :param hint: the name the fresh variable is derived from
+        :type hint: str
         :return: a fresh variable
         :rtype: str
+        :Examples:
+
+        >>> from lvar import *
+        >>> LambdaApp(LambdaVar("x"), LambdaVar("x1")).freshVar("x")
+        'x2'
         """
-        return list(alphabet - set(self.__repr__()))[0]
+        return freshVar(hint, self.freeVars, self.boundVars)
 
 
 
@@ -191,25 +264,27 @@ class LambdaApp():
         :type old_name: str
         :param new_name: the new name to give
         :type new_name: str
-        :UC: new_name in VAR_SET == True
+        :return: the renamed expression
+        :rtype: LambdaApp
+        :UC: isVarName(new_name) == True
         :Examples:
 
         >>> from lvar import *
         >>> xy = LambdaApp(LambdaVar("x"), LambdaVar("y"))
         >>> xyz = LambdaApp(LambdaApp(LambdaVar("x"), LambdaVar("y")), LambdaVar("z"))
-        >>> xy.rename("x", "u")
-        >>> xy.function.getName() == "u"
+        >>> xy.rename("x", "u").function.getName() == "u"
+        True
+        >>> xyz.rename("y", "o").function.argument.getName() == "o"
         True
-        >>> xyz.rename("y", "o")
-        >>> xyz.function.argument.getName() == "o"
+        >>> xy.function.getName() == "x"
         True
         """
         try:
-            assert new_name in VAR_SET
-            self.function.rename(old_name, new_name)
-            self.argument.rename(old_name, new_name)
+            assert isVarName(new_name)
         except AssertionError:
             raise LambdaAppError("This is not the name of a lambda variable.")
+        return LambdaApp(self.function.rename(old_name, new_name),\
+                         self.argument.rename(old_name, new_name))
 
 
 
@@ -221,6 +296,10 @@ class LambdaApp():
 
            The verification of the fact that the variable is free is done when
            the method is applied to a LambdaAbs.
+
+           The subterms where the variable is not free are kept as they are,
+           so the cost depends on the number of occurrences, not on the size
+           of the expression.
         
         :param var_name: the variable to substitute
         :type var: str
@@ -244,7 +323,11 @@ class LambdaApp():
         >>> newThree = newOne.substitute("p", np)
         >>> print(newThree)
         ((n(np))y)
+        >>> xy.substitute("z", np) is xy
+        True
         """
+        if var_name not in self.freeVars:
+            return self
         newFunction = self.function.substitute(var_name, expression)
         newArgument = self.argument.substitute(var_name, expression)
         return LambdaApp(newFunction, newArgument)
@@ -278,6 +361,12 @@ class LambdaApp():
         """
         Test whether a Lambda expression is in its beta normal form.
 
+        .. note::
+
+           The answer is computed once, when the node is built, so the
+           search for the next redex only descends into the subterms which
+           contain one.
+
         :return: 
 
            - True if the expression is its beta normal form
@@ -294,8 +383,7 @@ class LambdaApp():
         >>> LambdaApp(LambdaVar("x"), redex).isBetaNormal()
         False
         """
-        return (not self.isRedex()) and (self.function.isBetaNormal() and\
-                                       self.argument.isBetaNormal())
+        return self.betaNormal
         
 
 
@@ -304,14 +392,18 @@ class LambdaApp():
         Rename the bound variables in the function that are free in the
         argument.
 
+        :return: the function of the redex, without name clash
+        :rtype: LambdaAbs
         :UC: expression is a redex
         """
-        boundVarSet = self.function.body.boundVar()
+        function = self.function
+        boundVarSet = function.body.boundVar()
         freeVarSet = self.argument.freeVar()
-        nameClash = boundVarSet.intersection(freeVarSet)
-        if nameClash != {}:
-            for var in nameClash:
-                self.function.body.rename(var, self.freshVar())
+        for var in boundVarSet.intersection(freeVarSet):
+            newVar = LambdaApp(function, self.argument).freshVar(var)
+            function = LambdaAbs(function.binder,\
+                                 function.body.rename(var, newVar))
+        return function
         
 
 
@@ -330,10 +422,10 @@ class LambdaApp():
         True
         """
         # TODO test name clash 
-        self.avoidNameClash()
-        var_name = self.function.binder
+        function = self.avoidNameClash()
+        var_name = function.binder
         expression = self.argument
-        return self.function.body.substitute(var_name, expression)
+        return function.body.substitute(var_name, expression)
 
 
 
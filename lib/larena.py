@@ -0,0 +1,673 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+:module name: larena
+:module author: Nicolas Osborne <nicolas.osborne@etudiant.univ-lille1.fr>
+:date: 2018
+
+:synopsis: Provide a compact, array backed storage for huge lambda
+expressions.
+
+A LambdaArena stores de Bruijn terms in parallel typed arrays: a node is an
+integer, and its tag, children and binder data are the entries of the arrays
+at that position. Building, traversing and reducing a term in an arena does
+not allocate a Python object per node, which makes terms of millions of nodes
+tractable. LambdaExp are only used at the edges, to fill the arena and to get
+results back; LambdaExp.normalize reduces in an arena in its arena mode.
+
+All the walks over a term use explicit stacks, so the depth of a term is not
+limited by the recursion limit.
+
+:Tests:
+
+>>> from lib.lread import read
+>>> arena = LambdaArena()
+>>> root = arena.addExpression(read("((/x.(xx))((/z.(tz))r))"))
+>>> arena.size(root)
+11
+>>> print(arena.getExpression(root))
+((λx.(xx))((λz.(tz))r))
+>>> normal, steps = arena.normalize(root)
+>>> print(arena.getExpression(normal), steps)
+((tr)(tr)) 3
+"""
+
+from array import array
+from lib.ldebruijn import *
+# lib.lexpr uses the arenas too: its names are looked up when they are used
+import lib.lexpr
+
+# tags of the nodes
+TAG_VAR = 0
+TAG_FREE = 1
+TAG_APP = 2
+TAG_ABS = 3
+# hint of an abstraction without hint
+NO_HINT = -1
+# normalize collects the arena when it holds this many times the nodes it
+# held after the last collection, and at least COLLECT_MINIMUM nodes
+COLLECT_RATIO = 2
+COLLECT_MINIMUM = 1024
+
+
+
+class LambdaArenaError(Exception):
+    """
+    Exception for bad use of a LambdaArena.
+    """
+    def __init__(self, msg):
+        self.message = msg
+
+
+
+
+class LambdaArena():
+    """
+    Class for arenas of de Bruijn terms stored in parallel arrays.
+
+    :attributes:
+
+    - tags: the tag of each node
+    - left: the index of a bound variable, the name of a free variable, the
+      function of an application or the body of an abstraction
+    - right: the argument of an application or the hint of an abstraction
+    - reach: one more than the highest dangling index of each node
+    - normal: 1 if the node is in beta normal form, 0 otherwise
+    - names: the table of the names of free variables and hints
+
+    :methods:
+
+    - __init__(self)
+    - __len__(self)
+    - addVar(self, index)
+    - addFree(self, name)
+    - addApp(self, function, argument)
+    - addAbs(self, body, hint)
+    - addDeBruijn(self, term)
+    - getDeBruijn(self, node)
+    - addExpression(self, expression)
+    - getExpression(self, node)
+    - size(self, node)
+    - shift(self, node, offset, cutoff)
+    - substitute(self, node, argument)
+    - isBetaNormal(self, node)
+    - oneStepNOBetaEval(self, node)
+    - normalize(self, node, maxSteps, collect, budget)
+    - collect(self, roots)
+    """
+
+
+
+    def __init__(self):
+        """
+        Constructor for LambdaArena class.
+
+        :Examples:
+
+        >>> arena = LambdaArena()
+        >>> len(arena)
+        0
+        """
+        self.tags = array('b')
+        self.left = array('q')
+        self.right = array('q')
+        self.reach = array('q')
+        self.normal = array('b')
+        self.names = []
+        self.nameIds = dict()
+
+
+
+    def __len__(self):
+        """
+        Get the number of nodes allocated in the arena.
+        """
+        return len(self.tags)
+
+
+
+    def nameId(self, name):
+        """
+        Get the position of a name in the table of names, adding it if need
+        be.
+
+        :param name: the name
+        :type name: str
+        :rtype: int
+        """
+        if name not in self.nameIds:
+            self.nameIds[name] = len(self.names)
+            self.names.append(name)
+        return self.nameIds[name]
+
+
+
+    def newNode(self, tag, left, right, reach, normal):
+        """
+        Allocate a node.
+
+        :return: the new node
+        :rtype: int
+        """
+        self.tags.append(tag)
+        self.left.append(left)
+        self.right.append(right)
+        self.reach.append(reach)
+        self.normal.append(normal)
+        return len(self.tags) - 1
+
+
+
+    def addVar(self, index):
+        """
+        Allocate a bound variable.
+
+        :param index: the de Bruijn index of the variable
+        :type index: int
+        :return: the new node
+        :rtype: int
+        """
+        return self.newNode(TAG_VAR, index, 0, index + 1, 1)
+
+
+
+    def addFree(self, name):
+        """
+        Allocate a free variable.
+
+        :param name: the name of the variable
+        :type name: str
+        :return: the new node
+        :rtype: int
+        """
+        return self.newNode(TAG_FREE, self.nameId(name), 0, 0, 1)
+
+
+
+    def addApp(self, function, argument):
+        """
+        Allocate an application.
+
+        :param function: the node of the function
+        :type function: int
+        :param argument: the node of the argument
+        :type argument: int
+        :return: the new node
+        :rtype: int
+        """
+        normal = self.normal[function] and self.normal[argument]\
+            and self.tags[function] != TAG_ABS
+        return self.newNode(TAG_APP, function, argument,\
+                            max(self.reach[function], self.reach[argument]),\
+                            1 if normal else 0)
+
+
+
+    def addAbs(self, body, hint=NO_HINT):
+        """
+        Allocate an abstraction.
+
+        :param body: the node of the body
+        :type body: int
+        :param hint: the position of the name of the binder in the table
+        :type hint: int
+        :return: the new node
+        :rtype: int
+        """
+        return self.newNode(TAG_ABS, body, hint,\
+                            max(self.reach[body] - 1, 0), self.normal[body])
+
+
+
+    def addDeBruijn(self, term):
+        """
+        Store a de Bruijn term in the arena.
+
+        .. note::
+
+           Shared subterms of term are stored once.
+
+        :param term: the term to store
+        :type term: DBVar, DBFree, DBApp or DBAbs
+        :return: the node of the term
+        :rtype: int
+        """
+        nodes = dict()
+        stack = [term]
+        while stack:
+            current = stack[-1]
+            if current in nodes:
+                stack.pop()
+            elif type(current) == DBVar:
+                nodes[current] = self.addVar(current.index)
+                stack.pop()
+            elif type(current) == DBFree:
+                nodes[current] = self.addFree(current.name)
+                stack.pop()
+            elif type(current) == DBApp:
+                if current.function not in nodes:
+                    stack.append(current.function)
+                elif current.argument not in nodes:
+                    stack.append(current.argument)
+                else:
+                    nodes[current] = self.addApp(nodes[current.function],\
+                                                 nodes[current.argument])
+                    stack.pop()
+            else:
+                if current.body not in nodes:
+                    stack.append(current.body)
+                else:
+                    hint = NO_HINT
+                    if current.hint is not None:
+                        hint = self.nameId(current.hint)
+                    nodes[current] = self.addAbs(nodes[current.body], hint)
+                    stack.pop()
+        return nodes[term]
+
+
+
+    def getDeBruijn(self, node):
+        """
+        Build the de Bruijn term stored at a node.
+
+        :param node: the node
+        :type node: int
+        :return: the de Bruijn term
+        :rtype: DBVar, DBFree, DBApp or DBAbs
+        """
+        terms = dict()
+        stack = [node]
+        while stack:
+            current = stack[-1]
+            tag = self.tags[current]
+            if current in terms:
+                stack.pop()
+            elif tag == TAG_VAR:
+                terms[current] = DBVar(self.left[current])
+                stack.pop()
+            elif tag == TAG_FREE:
+                terms[current] = DBFree(self.names[self.left[current]])
+                stack.pop()
+            elif tag == TAG_APP:
+                function = self.left[current]
+                argument = self.right[current]
+                if function not in terms:
+                    stack.append(function)
+                elif argument not in terms:
+                    stack.append(argument)
+                else:
+                    terms[current] = DBApp(terms[function], terms[argument])
+                    stack.pop()
+            else:
+                body = self.left[current]
+                if body not in terms:
+                    stack.append(body)
+                else:
+                    hint = None
+                    if self.right[current] != NO_HINT:
+                        hint = self.names[self.right[current]]
+                    terms[current] = DBAbs(terms[body], hint)
+                    stack.pop()
+        return terms[node]
+
+
+
+    def addExpression(self, expression):
+        """
+        Store a lambda expression in the arena.
+
+        :param expression: the expression to store
+        :type expression: LambdaExp
+        :return: the node of the expression
+        :rtype: int
+        """
+        return self.addDeBruijn(expression.toDeBruijn())
+
+
+
+    def getExpression(self, node):
+        """
+        Build the lambda expression stored at a node.
+
+        :param node: the node
+        :type node: int
+        :return: the lambda expression
+        :rtype: LambdaExp
+        """
+        return lib.lexpr.LambdaExp(fromDeBruijn(self.getDeBruijn(node)))
+
+
+
+    def size(self, node):
+        """
+        Get the number of nodes of the term, shared subterms counted as
+        many times as they occur.
+
+        .. note::
+
+           The size of each node is computed once, from the sizes of its
+           children: the time is linear in the number of nodes reachable,
+           not in the size of the term, which may be exponential in it once
+           normalize has shared the substituted arguments.
+
+        :param node: the root of the term
+        :type node: int
+        :rtype: int
+        :Examples:
+
+        >>> arena = LambdaArena()
+        >>> node = arena.addFree("x")
+        >>> for _ in range(100):
+        ...     node = arena.addApp(node, node)
+        >>> arena.size(node) == 2 ** 101 - 1
+        True
+        """
+        sizes = dict()
+        stack = [node]
+        while stack:
+            current = stack[-1]
+            tag = self.tags[current]
+            if current in sizes:
+                stack.pop()
+            elif tag == TAG_APP:
+                function, argument = self.left[current], self.right[current]
+                if function not in sizes:
+                    stack.append(function)
+                elif argument not in sizes:
+                    stack.append(argument)
+                else:
+                    sizes[current] = 1 + sizes[function] + sizes[argument]
+                    stack.pop()
+            elif tag == TAG_ABS:
+                if self.left[current] not in sizes:
+                    stack.append(self.left[current])
+                else:
+                    sizes[current] = 1 + sizes[self.left[current]]
+                    stack.pop()
+            else:
+                sizes[current] = 1
+                stack.pop()
+        return sizes[node]
+
+
+
+    def rebuild(self, node, depth, onVar):
+        """
+        Rebuild a term, replacing its variables of index at least depth
+        (counted from the root of the term).
+
+        .. note::
+
+           The subterms whose reach shows they have no such variable are
+           kept as they are.
+
+        :param node: the root of the term
+        :type node: int
+        :param depth: the lowest index to replace
+        :type depth: int
+        :param onVar: build the replacement of a variable node, given the
+           number of binders crossed from the root of the term
+        :type onVar: function
+        :return: the rebuilt term
+        :rtype: int
+        """
+        results = []
+        stack = [(node, 0, False)]
+        while stack:
+            current, crossed, built = stack.pop()
+            tag = self.tags[current]
+            if built:
+                if tag == TAG_APP:
+                    argument = results.pop()
+                    function = results.pop()
+                    results.append(self.addApp(function, argument))
+                else:
+                    body = results.pop()
+                    results.append(self.addAbs(body, self.right[current]))
+            elif self.reach[current] <= depth + crossed:
+                results.append(current)
+            elif tag == TAG_VAR:
+                results.append(onVar(current, crossed))
+            elif tag == TAG_APP:
+                stack.append((current, crossed, True))
+                stack.append((self.right[current], crossed, False))
+                stack.append((self.left[current], crossed, False))
+            else:
+                stack.append((current, crossed, True))
+                stack.append((self.left[current], crossed + 1, False))
+        return results[0]
+
+
+
+    def shift(self, node, offset, cutoff=0):
+        """
+        Add offset to the indices which are not bound inside the term.
+
+        :param node: the root of the term
+        :type node: int
+        :param offset: the value to add to the dangling indices
+        :type offset: int
+        :param cutoff: the number of binders already crossed
+        :type cutoff: int
+        :return: the shifted term
+        :rtype: int
+        """
+        if offset == 0:
+            return node
+        return self.rebuild(node, cutoff, lambda var, crossed:\
+                            self.addVar(self.left[var] + offset))
+
+
+
+    def substitute(self, node, argument):
+        """
+        Substitute the variable of index 0 of a body by an argument, and
+        decrement the other dangling indices.
+
+        .. note::
+
+           The argument is shifted once for each number of binders crossed,
+           and the shifted copy is shared by all the occurrences below that
+           many binders; a closed argument is never copied.
+
+        :param node: the root of the body
+        :type node: int
+        :param argument: the root of the argument
+        :type argument: int
+        :return: the new term
+        :rtype: int
+        """
+        # the copies of the argument, by number of binders crossed
+        shifted = dict()
+        def onVar(var, crossed):
+            if self.left[var] == crossed:
+                if crossed not in shifted:
+                    shifted[crossed] = self.shift(argument, crossed)
+                return shifted[crossed]
+            else:
+                return self.addVar(self.left[var] - 1)
+        return self.rebuild(node, 0, onVar)
+
+
+
+    def isBetaNormal(self, node):
+        """
+        Test whether the term is in its beta normal form.
+
+        :param node: the root of the term
+        :type node: int
+        :rtype: bool
+        """
+        return self.normal[node] == 1
+
+
+
+    def oneStepNOBetaEval(self, node):
+        """
+        Perform one step of a normal order Beta-evaluation, with the same
+        order as LambdaApp.oneStepNOBetaEval.
+
+        :param node: the root of the term
+        :type node: int
+        :return: the root of the new term
+        :rtype: int
+        :UC: the term must not be in beta normal form
+        """
+        try:
+            assert not self.isBetaNormal(node)
+        except AssertionError:
+            raise LambdaArenaError(\
+                "Can not carry on beta evaluation on a beta normal form.")
+        path = []
+        current = node
+        while True:
+            tag = self.tags[current]
+            if tag == TAG_ABS:
+                path.append(current)
+                current = self.left[current]
+            elif self.tags[self.left[current]] == TAG_ABS:
+                break
+            elif not self.normal[self.left[current]]:
+                path.append(current)
+                current = self.left[current]
+            else:
+                path.append(current)
+                current = self.right[current]
+        result = self.substitute(self.left[self.left[current]],\
+                                 self.right[current])
+        child = current
+        while path:
+            parent = path.pop()
+            if self.tags[parent] == TAG_ABS:
+                result = self.addAbs(result, self.right[parent])
+            elif self.left[parent] == child:
+                result = self.addApp(result, self.right[parent])
+            else:
+                result = self.addApp(self.left[parent], result)
+            child = parent
+        return result
+
+
+
+    def normalize(self, node, maxSteps=None, collect=True, budget=None):
+        """
+        Reduce a term to its beta normal form in normal order.
+
+        .. note::
+
+           The arrays only grow as the steps allocate nodes. With collect,
+           the arena is collected whenever it has grown COLLECT_RATIO times
+           bigger than after the last collection, and once more at the end,
+           so that it only holds the normal form: the other node numbers
+           must not be used anymore.
+
+        :param node: the root of the term
+        :type node: int
+        :param maxSteps: the maximal number of steps, None for no limit
+        :type maxSteps: int
+        :param collect: whether to drop the intermediate terms
+        :type collect: bool
+        :param budget: the budget charged a step for each beta step, if any;
+           its size bound applies to the nodes the arena holds after each
+           collection
+        :type budget: Budget or NoneType
+        :return: the root of the normal form and the number of steps
+        :rtype: tuple
+        :Examples:
+
+        >>> from lib.lread import read
+        >>> arena = LambdaArena()
+        >>> two = "(/f.(/x.(f(fx))))"
+        >>> root = arena.addExpression(read("((" + two + two + ")g)"))
+        >>> normal, steps = arena.normalize(root)
+        >>> print(arena.getExpression(normal), steps)
+        (λx.(g(g(g(gx))))) 7
+        >>> len(arena)
+        7
+        """
+        steps = 0
+        threshold = max(COLLECT_RATIO * len(self), COLLECT_MINIMUM)
+        while not self.isBetaNormal(node):
+            if maxSteps is not None and steps >= maxSteps:
+                raise LambdaArenaError("Too many steps.")
+            node = self.oneStepNOBetaEval(node)
+            steps += 1
+            if budget is not None:
+                budget.tick()
+            if collect and len(self) > threshold:
+                node = self.collect([node])[0]
+                threshold = max(COLLECT_RATIO * len(self), COLLECT_MINIMUM)
+                if budget is not None:
+                    budget.checkSize(len(self))
+        if collect:
+            node = self.collect([node])[0]
+        return node, steps
+
+
+
+    def collect(self, roots):
+        """
+        Drop the nodes that are not reachable from the given roots.
+
+        .. note::
+
+           The nodes are renumbered: the old node numbers must not be used
+           anymore.
+
+        :param roots: the nodes to keep, with all their subterms
+        :type roots: list
+        :return: the new numbers of the roots
+        :rtype: list
+        :Examples:
+
+        >>> arena = LambdaArena()
+        >>> x = arena.addFree("x")
+        >>> garbage = arena.addApp(x, x)
+        >>> identity = arena.addAbs(arena.addVar(0))
+        >>> arena.collect([identity])
+        [1]
+        >>> len(arena)
+        2
+        """
+        tags, left, right = self.tags, self.left, self.right
+        reach, normal = self.reach, self.normal
+        self.tags = array('b')
+        self.left = array('q')
+        self.right = array('q')
+        self.reach = array('q')
+        self.normal = array('b')
+        moved = dict()
+        for root in roots:
+            stack = [root]
+            while stack:
+                current = stack[-1]
+                tag = tags[current]
+                if current in moved:
+                    stack.pop()
+                elif tag == TAG_APP and left[current] not in moved:
+                    stack.append(left[current])
+                elif tag == TAG_APP and right[current] not in moved:
+                    stack.append(right[current])
+                elif tag == TAG_ABS and left[current] not in moved:
+                    stack.append(left[current])
+                else:
+                    newLeft = left[current]
+                    newRight = right[current]
+                    if tag in (TAG_APP, TAG_ABS):
+                        newLeft = moved[left[current]]
+                    if tag == TAG_APP:
+                        newRight = moved[right[current]]
+                    moved[current] = self.newNode(tag, newLeft, newRight,\
+                                                  reach[current],\
+                                                  normal[current])
+                    stack.pop()
+        return [moved[root] for root in roots]
+
+
+
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+:module name: lbudget
+:module author: Nicolas Osborne <nicolas.osborne@etudiant.univ-lille1.fr>
+:date: 2018
+
+:synopsis: Budgets bounding the cost of an evaluation.
+
+A Budget is given to an evaluator, which charges it at each step and stops
+with a BudgetError as soon as one of its bounds is exceeded:
+
+- a number of steps;
+- a number of seconds of wall clock time;
+- a size of the terms built by the evaluation;
+- a detection of cycles: the terms are hash-consed, so that a term which
+  comes back during the evaluation is found in constant time, and the
+  evaluation is stopped since it would repeat itself forever. The terms
+  reached are kept until the next start: they share their subterms, and
+  their number is bounded by the steps.
+
+The engines rewriting terms (normal and applicative order, and the complete
+developments) charge a step for each beta step, and check the size and the
+cycles on the term they reach. The processes which develop parts of a term
+get the bounds left (see Budget.left), and their steps are charged back.
+The abstract machines have no term to check: they charge a step for each of
+their transitions, and check the size of their stacks. The read-back of
+their values charges a step for each node it reads, and checks the size of
+the term it builds, so that a normal form too big to be built is stopped
+too.
+
+:Tests:
+
+>>> from lib.lread import read
+>>> omega = read("((/x.(xx))(/x.(xx)))")
+>>> omega.betaEvalWithTraces(budget=Budget(detectCycles=True)) # doctest: +IGNORE_EXCEPTION_DETAIL
+Traceback (most recent call last):
+...
+lbudget.DivergenceError: The term of step 1 is the one of step 0.
+>>> omega.normalize("krivine", Budget(maxSteps=1000)) # doctest: +IGNORE_EXCEPTION_DETAIL
+Traceback (most recent call last):
+...
+lbudget.StepBudgetError: The budget of 1000 steps is exhausted.
+"""
+
+import time
+
+
+
+class BudgetError(Exception):
+    """
+    Exception for evaluations stopped by their budget.
+    """
+    def __init__(self, msg):
+        self.message = msg
+
+    def __str__(self):
+        return self.message
+
+
+
+class StepBudgetError(BudgetError):
+    """
+    Exception for evaluations which take too many steps.
+    """
+
+
+
+class TimeBudgetError(BudgetError):
+    """
+    Exception for evaluations which take too much time.
+    """
+
+
+
+class SizeBudgetError(BudgetError):
+    """
+    Exception for evaluations which build too big terms.
+    """
+
+
+
+class DivergenceError(BudgetError):
+    """
+    Exception for evaluations which come back to a term they already reached.
+    """
+
+
+
+class Budget():
+    """
+    Bounds on the cost of an evaluation.
+
+    .. note::
+
+       The clock is read at each step: the time a step takes is not known
+       in advance, and the time bound must stop an evaluation whose steps
+       are slow as well as one whose steps are fast.
+
+    :param maxSteps: the number of steps allowed, None for no bound
+    :type maxSteps: int or NoneType
+    :param maxSeconds: the wall clock time allowed, None for no bound
+    :type maxSeconds: float or NoneType
+    :param maxSize: the size of the terms allowed, None for no bound
+    :type maxSize: int or NoneType
+    :param detectCycles: whether to stop when a term comes back
+    :type detectCycles: bool
+
+    :attributes:
+
+    - maxSteps
+    - maxSeconds
+    - maxSize
+    - detectCycles
+    - steps, the number of steps charged since the start
+
+    :methods:
+
+    - __init__(self, maxSteps, maxSeconds, maxSize, detectCycles)
+    - start(self)
+    - tick(self)
+    - charge(self, steps)
+    - left(self)
+    - checkTime(self)
+    - checkSize(self, size)
+    - check(self, term)
+    """
+    __slots__ = ('maxSteps', 'maxSeconds', 'maxSize', 'detectCycles',\
+                 'steps', 'deadline', 'seen')
+
+    def __init__(self, maxSteps=None, maxSeconds=None, maxSize=None,\
+                 detectCycles=False):
+        self.maxSteps = maxSteps
+        self.maxSeconds = maxSeconds
+        self.maxSize = maxSize
+        self.detectCycles = detectCycles
+        self.start()
+
+
+    def start(self):
+        """
+        Start a new evaluation: reset the steps, the clock and the terms
+        seen.
+        """
+        self.steps = 0
+        self.deadline = None
+        if self.maxSeconds is not None:
+            self.deadline = time.monotonic() + self.maxSeconds
+        # the step at which each term has been reached
+        self.seen = dict()
+
+
+    def tick(self):
+        """
+        Charge one step.
+
+        :Examples:
+
+        >>> budget = Budget(maxSteps=2)
+        >>> budget.tick(); budget.tick()
+        >>> budget.tick() # doctest: +IGNORE_EXCEPTION_DETAIL
+        Traceback (most recent call last):
+        ...
+        lbudget.StepBudgetError: The budget of 2 steps is exhausted.
+        """
+        self.charge(1)
+
+
+    def charge(self, steps):
+        """
+        Charge some steps at once, such as the steps performed by another
+        process.
+
+        :param steps: the number of steps
+        :type steps: int
+        :Examples:
+
+        >>> budget = Budget(maxSteps=2)
+        >>> budget.charge(2)
+        >>> budget.charge(1) # doctest: +IGNORE_EXCEPTION_DETAIL
+        Traceback (most recent call last):
+        ...
+        lbudget.StepBudgetError: The budget of 2 steps is exhausted.
+        """
+        self.steps += steps
+        if self.maxSteps is not None and self.steps > self.maxSteps:
+            raise StepBudgetError("The budget of " + str(self.maxSteps)\
+                                  + " steps is exhausted.")
+        self.checkTime()
+
+
+    def left(self):
+        """
+        Get the bounds left to the evaluation, to give them to another
+        process.
+
+        :return: the steps and the seconds left, None for no bound, and the
+           size bound
+        :rtype: tuple
+        :Examples:
+
+        >>> budget = Budget(maxSteps=5, maxSize=10)
+        >>> budget.tick()
+        >>> budget.left()
+        (4, None, 10)
+        """
+        steps = seconds = None
+        if self.maxSteps is not None:
+            steps = self.maxSteps - self.steps
+        if self.deadline is not None:
+            seconds = max(self.deadline - time.monotonic(), 0)
+        return (steps, seconds, self.maxSize)
+
+
+    def checkTime(self):
+        """
+        Check the clock, without charging a step.
+
+        :Examples:
+
+        >>> budget = Budget(maxSeconds=0)
+        >>> budget.checkTime() # doctest: +IGNORE_EXCEPTION_DETAIL
+        Traceback (most recent call last):
+        ...
+        lbudget.TimeBudgetError: The budget of 0 seconds is exhausted after 0 steps.
+        """
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise TimeBudgetError("The budget of " + str(self.maxSeconds)\
+                                  + " seconds is exhausted after "\
+                                  + str(self.steps) + " steps.")
+
+
+    def checkSize(self, size):
+        """
+        Check the size of what the evaluation holds, a term or the structure
+        of a machine.
+
+        :param size: the number of nodes
+        :type size: int
+        :Examples:
+
+        >>> Budget(maxSize=2).checkSize(3) # doctest: +IGNORE_EXCEPTION_DETAIL
+        Traceback (most recent call last):
+        ...
+        lbudget.SizeBudgetError: The term of step 0 has 3 nodes, more than 2.
+        """
+        if self.maxSize is not None and size > self.maxSize:
+            raise SizeBudgetError("The term of step " + str(self.steps)\
+                                  + " has " + str(size)\
+                                  + " nodes, more than "\
+                                  + str(self.maxSize) + ".")
+
+
+    def check(self, term):
+        """
+        Check the term reached after the steps charged so far.
+
+        :param term: the term reached
+        :type term: any hash-consed term with a size attribute
+        :Examples:
+
+        >>> from lib.ldebruijn import DBFree, DBApp
+        >>> budget = Budget(maxSize=2, detectCycles=True)
+        >>> budget.check(DBFree("x"))
+        >>> budget.tick(); budget.check(DBFree("x")) # doctest: +IGNORE_EXCEPTION_DETAIL
+        Traceback (most recent call last):
+        ...
+        lbudget.DivergenceError: The term of step 1 is the one of step 0.
+        >>> budget.check(DBApp(DBFree("x"), DBFree("y"))) # doctest: +IGNORE_EXCEPTION_DETAIL
+        Traceback (most recent call last):
+        ...
+        lbudget.SizeBudgetError: The term of step 1 has 3 nodes, more than 2.
+        """
+        self.checkSize(term.size)
+        self.checkTime()
+        if self.detectCycles:
+            # the terms are hash-consed: the lookup compares their identity
+            if term in self.seen:
+                raise DivergenceError("The term of step " + str(self.steps)\
+                                      + " is the one of step "\
+                                      + str(self.seen[term]) + ".")
+            self.seen[term] = self.steps
+
+
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+:module name: lbytecode
+:module author: Nicolas Osborne <nicolas.osborne@etudiant.univ-lille1.fr>
+:date: 2018
+
+:synopsis: Bytecode compiler and virtual machine for lambda terms.
+
+A de Bruijn term is compiled into a flat array of integers, in the style of
+the Krivine machine and of the ZAM. Every instruction takes two words, an
+opcode and an operand:
+
+- ACCESS n: go on with the value (or the suspended code) of the index n;
+- GRAB h: pop an argument into the environment, the binder had the hint h;
+  with no argument left, the abstraction is the value;
+- PUSH a: push the code at address a, suspended in the current environment,
+  as an argument (normal order, call by name);
+- PUSHVAL a: run the code at address a to its value, and push the value as an
+  argument (applicative order, call by value);
+- FREE k: the free variable k is the head of the value.
+
+The code of a term is its spine: the arguments pushed from the outermost
+application inwards, then the abstractions grabbed, then the head. The code
+of the arguments follows in the same array; the hash-consed subterms are
+compiled once and their code shared.
+
+The virtual machine runs the code with an environment (a linked list of
+pairs) and a stack of arguments; PUSHVAL saves the current frame on a stack
+of frames. Neither the compiler nor the machine use the Python stack.
+
+Bytecode can be written as bytes and read back, so that the compiled
+definitions can be stored and reloaded without compiling them again. The
+code is written as 64 bits little endian words, so that the bytes load on
+any platform.
+
+:Tests:
+
+>>> from lib.lread import read
+>>> term = read("((/x.(xx))((/z.(tz))r))").toDeBruijn()
+>>> bytecode = compileBytecode(term)
+>>> print(bytecode)
+0: PUSH 10
+2: GRAB x
+4: PUSH 8
+6: ACCESS 0
+8: ACCESS 0
+10: PUSH 18
+12: GRAB z
+14: PUSH 8
+16: FREE t
+18: FREE r
+>>> print(fromDeBruijn(bytecode.normalForm()))
+((tr)(tr))
+>>> print(fromDeBruijn(compileBytecode(term, "applicative").normalForm()))
+((tr)(tr))
+>>> print(fromDeBruijn(fromBytes(bytecode.toBytes()).normalForm()))
+((tr)(tr))
+"""
+
+import struct
+import sys
+from array import array
+from lib.ldebruijn import *
+from lib.lreadback import *
+
+ACCESS = 0
+GRAB = 1
+PUSH = 2
+PUSHVAL = 3
+FREE = 4
+OPCODES = ("ACCESS", "GRAB", "PUSH", "PUSHVAL", "FREE")
+STRATEGIES = ("normal", "applicative")
+
+# header of the serialized bytecode
+MAGIC = b"FWLC"
+VERSION = 1
+# the code is written as 64 bits words, little endian whatever the platform
+WORD = 'q'
+
+
+
+class BytecodeError(Exception):
+    """
+    Exception for bytecode which can not be compiled or loaded.
+    """
+    def __init__(self, msg):
+        self.message = msg
+
+
+
+class Bytecode():
+    """
+    Compiled lambda term.
+
+    :param code: the instructions, two words each, starting at address 0
+    :type code: array
+    :param names: the free variables, indexed by the operands of FREE
+    :type names: tuple
+    :param hints: the hints of the binders, indexed by the operands of GRAB
+    :type hints: tuple
+    :param strategy: the strategy the code has been compiled for
+    :type strategy: str
+
+    :methods:
+
+    - __init__(self, code, names, hints, strategy)
+    - __repr__(self)
+    - run(self, address, environment, budget)
+    - normalForm(self, budget)
+    - toBytes(self)
+    """
+    __slots__ = ('code', 'names', 'hints', 'strategy')
+
+    def __init__(self, code, names, hints, strategy):
+        self.code = code
+        self.names = names
+        self.hints = hints
+        self.strategy = strategy
+
+
+    def __repr__(self):
+        lines = []
+        for address in range(0, len(self.code), 2):
+            opcode, operand = self.code[address], self.code[address + 1]
+            if opcode == GRAB:
+                operand = self.hints[operand]
+            elif opcode == FREE:
+                operand = self.names[operand]
+            lines.append(str(address) + ": " + OPCODES[opcode] + " "\
+                         + str(operand))
+        return "\n".join(lines)
+
+
+    def run(self, address, environment, budget=None):
+        """
+        Run the code at some address up to its value.
+
+        .. note::
+
+           A value is either an abstraction ("abs", address of its GRAB,
+           environment) or a neutral term ("neutral", head, arguments), whose
+           head is a free name or the level of a variable introduced by the
+           read-back. The environments hold values, and the suspended code
+           ("code", address, environment) of the normal order.
+
+        :param address: the address of the code to run
+        :type address: int
+        :param environment: the environment of the code
+        :type environment: tuple or NoneType
+        :param budget: the budget charged a step for each transition, if any
+        :type budget: Budget or NoneType
+        :return: the value
+        :rtype: tuple
+        """
+        code = self.code
+        arguments = []
+        frames = []
+        while True:
+            if budget is not None:
+                budget.tick()
+            opcode, operand = code[address], code[address + 1]
+            if opcode == ACCESS:
+                for _ in range(operand):
+                    environment = environment[1]
+                entry = environment[0]
+                if entry[0] != "neutral":
+                    _, address, environment = entry
+                    continue
+                value = ("neutral", entry[1],\
+                         entry[2] + tuple(reversed(arguments)))
+            elif opcode == GRAB:
+                if arguments:
+                    environment = (arguments.pop(), environment)
+                    address += 2
+                    continue
+                value = ("abs", address, environment)
+            elif opcode == PUSH:
+                arguments.append(("code", operand, environment))
+                if budget is not None:
+                    budget.checkSize(len(arguments) + len(frames))
+                address += 2
+                continue
+            elif opcode == PUSHVAL:
+                frames.append((address + 2, environment, arguments))
+                if budget is not None:
+                    budget.checkSize(len(arguments) + len(frames))
+                address, arguments = operand, []
+                continue
+            else:
+                value = ("neutral", self.names[operand],\
+                         tuple(reversed(arguments)))
+            if not frames:
+                return value
+            address, environment, arguments = frames.pop()
+            arguments.append(value)
+
+
+    def normalForm(self, budget=None):
+        """
+        Compute the beta normal form of the compiled term.
+
+        .. note::
+
+           The read-back is the one of lib.lreadback: the suspended code of
+           the arguments is only run when their turn comes.
+
+        :param budget: the budget charged a step for each transition, if any
+        :type budget: Budget or NoneType
+        :return: the beta normal form
+        :rtype: DBVar, DBFree, DBApp or DBAbs
+        """
+        def expand(value, depth):
+            if value[0] == "code":
+                value = self.run(value[1], value[2], budget)
+            if value[0] == "abs":
+                _, address, environment = value
+                level = ("neutral", depth, ())
+                body = self.run(address + 2, (level, environment), budget)
+                return ("abs", self.hints[self.code[address + 1]], body)
+            _, head, rest = value
+            if type(head) != int:
+                head = DBFree(head)
+            return ("neutral", head, rest)
+        return readBack(self.run(0, None, budget), expand, budget)
+
+
+    def toBytes(self):
+        """
+        Serialize the bytecode.
+
+        :return: the serialized bytecode, to load with fromBytes
+        :rtype: bytes
+        """
+        code = array(WORD, self.code)
+        if sys.byteorder == "big":
+            code.byteswap()
+        names = "\n".join(self.names).encode()
+        hints = "\n".join(hint or "" for hint in self.hints).encode()
+        header = struct.pack("<4sBBBIII", MAGIC, VERSION, code.itemsize,\
+                             STRATEGIES.index(self.strategy), len(code),\
+                             len(names), len(hints))
+        return header + code.tobytes() + names + hints
+
+
+
+def fromBytes(data):
+    """
+    Load serialized bytecode.
+
+    :param data: the bytecode serialized by Bytecode.toBytes
+    :type data: bytes
+    :return: the bytecode
+    :rtype: Bytecode
+    :Examples:
+
+    >>> fromBytes(b"FWLC") # doctest: +IGNORE_EXCEPTION_DETAIL
+    Traceback (most recent call last):
+    ...
+    lbytecode.BytecodeError: This is not bytecode of this version.
+    """
+    header = struct.Struct("<4sBBBIII")
+    try:
+        magic, version, itemsize, strategy, size, namesSize, hintsSize =\
+            header.unpack_from(data)
+        assert magic == MAGIC and version == VERSION
+        code = array(WORD)
+        assert itemsize == code.itemsize
+        start = header.size
+        code.frombytes(data[start:start + size * itemsize])
+        start += size * itemsize
+        names = data[start:start + namesSize].decode()
+        start += namesSize
+        hints = data[start:start + hintsSize].decode()
+        assert start + hintsSize == len(data)
+    except (struct.error, AssertionError, ValueError):
+        raise BytecodeError("This is not bytecode of this version.")
+    if sys.byteorder == "big":
+        code.byteswap()
+    names = tuple(names.split("\n")) if names else ()
+    hints = tuple(hint or None for hint in hints.split("\n"))
+    return Bytecode(code, names, hints, STRATEGIES[strategy])
+
+
+
+def compileBytecode(term, strategy="normal"):
+    """
+    Compile a term into bytecode.
+
+    :param term: the term to compile
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :param strategy: order of evaluation, either normal (default) or
+       applicative
+    :type strategy: str
+    :return: the bytecode
+    :rtype: Bytecode
+    :UC: term is closed by its free names (it has no dangling index)
+    :Examples:
+
+    >>> print(compileBytecode(DBApp(DBAbs(DBVar(0), "x"), DBFree("y")), "applicative"))
+    0: PUSHVAL 6
+    2: GRAB x
+    4: ACCESS 0
+    6: FREE y
+    """
+    if strategy not in STRATEGIES:
+        raise BytecodeError("Unknown strategy: " + str(strategy))
+    push = PUSH if strategy == "normal" else PUSHVAL
+    code = array(WORD)
+    # the index of each free name and of each hint in their table
+    names = dict()
+    hints = dict()
+    # the address of the code of each compiled term, and the places where
+    # the address of the code of an argument is expected (None for the code
+    # which goes on right there)
+    addresses = dict()
+    pending = [(term, None)]
+    while pending:
+        current, place = pending.pop()
+        if place is not None and current in addresses:
+            code[place] = addresses[current]
+            continue
+        if place is not None:
+            code[place] = len(code)
+        addresses[current] = len(code)
+        while type(current) == DBApp:
+            code.extend((push, 0))
+            pending.append((current.argument, len(code) - 1))
+            current = current.function
+        while type(current) == DBAbs:
+            hints.setdefault(current.hint, len(hints))
+            code.extend((GRAB, hints[current.hint]))
+            current = current.body
+        if type(current) == DBVar:
+            code.extend((ACCESS, current.index))
+        elif type(current) == DBFree:
+            names.setdefault(current.name, len(names))
+            code.extend((FREE, names[current.name]))
+        else:
+            # an application below the abstractions: its code starts here
+            pending.append((current, None))
+            continue
+    return Bytecode(code, tuple(names), tuple(hints), strategy)
+
+
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+:module name: lcek
+:module author: Nicolas Osborne <nicolas.osborne@etudiant.univ-lille1.fr>
+:date: 2018
+
+:synopsis: CEK machine for call-by-value evaluation.
+
+The state of the machine is made of a control (the term being evaluated),
+an environment (the values of its indices) and a continuation (the stack of
+what remains to be done with the value of the control). The arguments are
+evaluated before the function is applied to them, as in applicative order,
+but a beta step only pushes the value of the argument on the environment of
+the body: no term is ever rewritten nor walked to find the next redex.
+
+A value is either a closure (DBAbs, environment) or a neutral term (head,
+arguments), whose head is a DBFree or the level of a variable introduced by
+the read-back, and whose arguments are values. Environments are the linked
+lists of lib.lkrivine, holding values.
+
+The read-back evaluates the bodies of the closures and the arguments of the
+neutral terms, so that the result is the full beta normal form. Since normal
+forms are unique, it is the one of the applicative order whenever the latter
+terminates.
+
+:Tests:
+
+>>> from lib.lread import read
+>>> expr = read("((/x.(xx))((/z.(tz))r))")
+>>> print(fromDeBruijn(cekNormalForm(expr.toDeBruijn())))
+((tr)(tr))
+"""
+
+from lib.lkrivine import *
+
+
+
+def evaluate(term, environment, budget=None):
+    """
+    Run the machine up to the value of a term.
+
+    :param term: the term to evaluate
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :param environment: the environment of term
+    :type environment: tuple or NoneType
+    :param budget: the budget charged a step for each transition, if any
+    :type budget: Budget or NoneType
+    :return: the value of term
+    :rtype: tuple
+    :Examples:
+
+    >>> identity = DBAbs(DBVar(0), "x")
+    >>> head, arguments = evaluate(DBApp(identity, DBFree("y")), None)
+    >>> print(head, arguments)
+    y ()
+    """
+    continuation = []
+    while True:
+        if budget is not None:
+            budget.tick()
+        # evaluate the control down to a value
+        kind = type(term)
+        if kind == DBApp:
+            continuation.append(("function", term.function, environment))
+            if budget is not None:
+                budget.checkSize(len(continuation))
+            term = term.argument
+            continue
+        elif kind == DBAbs:
+            value = (term, environment)
+        elif kind == DBVar:
+            value = lookup(environment, term.index)
+        else:
+            value = (term, ())
+        # give the value to the continuation
+        while continuation:
+            frame = continuation.pop()
+            if frame[0] == "function":
+                continuation.append(("apply", value))
+                term, environment = frame[1], frame[2]
+                break
+            argument = frame[1]
+            if type(value[0]) == DBAbs:
+                term = value[0].body
+                environment = (argument, value[1])
+                break
+            value = (value[0], value[1] + (argument,))
+        else:
+            return value
+
+
+
+def cekNormalForm(term, budget=None):
+    """
+    Compute the beta normal form of a term with the CEK machine.
+
+    .. note::
+
+       The read-back is the one of lib.lreadback.
+
+    :param term: the term to evaluate
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :param budget: the budget charged a step for each transition, if any
+    :type budget: Budget or NoneType
+    :return: the beta normal form of term
+    :rtype: DBVar, DBFree, DBApp or DBAbs
+    :UC: term is closed by its free names (it has no dangling index)
+    :Examples:
+
+    >>> two = DBAbs(DBAbs(DBApp(DBVar(1), DBApp(DBVar(1), DBVar(0))), "x"), "f")
+    >>> print(cekNormalForm(DBApp(DBApp(two, two), DBFree("g"))))
+    (λ.(g (g (g (g 0)))))
+    """
+    def expand(value, depth):
+        head, rest = value
+        if type(head) == DBAbs:
+            body = evaluate(head.body, ((depth, ()), rest), budget)
+            return ("abs", head.hint, body)
+        return ("neutral", head, rest)
+    return readBack(evaluate(term, None, budget), expand, budget)
+
+
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
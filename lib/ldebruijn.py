@@ -0,0 +1,1561 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+:module name: ldebruijn
+:module author: Nicolas Osborne <nicolas.osborne@etudiant.univ-lille1.fr>
+:date: 2018
+
+:synopsis: Provide a nameless (de Bruijn indexed) modelisation for lambda
+expressions, used as the core representation by the reducers.
+
+In a de Bruijn term, a bound variable is replaced by the number of binders
+between its occurrence and its own binder. Free variables keep their name.
+Each abstraction remembers the name of its binder as a hint, so that the
+conversion back to named lambda expressions is lossless.
+
+Like the named nodes, de Bruijn nodes are hash-consed: equality is an
+identity check. Each node also records, when it is built, its free names,
+the mask of its dangling indices and whether it contains a beta or an eta
+redex: testing for the normal forms is then constant time, and finding the
+next redex only descends along the path that leads to it. The hint is part
+of a node, so two terms are equal if and only if the named expressions they
+come from are written exactly the same.
+
+:Tests:
+
+>>> double = LambdaAbs("x", LambdaApp(LambdaVar("x"), LambdaVar("x")))
+>>> print(toDeBruijn(double))
+(λ.(0 0))
+>>> k = LambdaAbs("x", LambdaAbs("y", LambdaApp(LambdaVar("x"), LambdaVar("z"))))
+>>> print(toDeBruijn(k))
+(λ.(λ.(1 z)))
+>>> fromDeBruijn(toDeBruijn(k)) == k
+True
+"""
+
+from lib.alphabet_def import *
+from lib.lvar import *
+from lib.lapp import *
+from lib.labs import *
+from lib.lintern import NODES
+import weakref
+
+# named expressions already built from closed abstractions, see fromDeBruijn
+READBACK = weakref.WeakKeyDictionary()
+# canonical terms of the named expressions already seen, see toCanonical
+CANONICAL = weakref.WeakKeyDictionary()
+
+
+
+class DeBruijnError(Exception):
+    """
+    Exception for badly formed de Bruijn terms.
+    """
+    def __init__(self, msg):
+        self.message = msg
+
+
+
+
+class DBVar():
+    """
+    Class for bound variables of de Bruijn terms.
+
+    :param index: the number of binders between the variable and its binder
+    :type index: int
+
+    :attributes:
+
+    - index
+
+    :methods:
+
+    - __new__(cls, index)
+    - __repr__(self)
+    - getParts(self)
+    - __setattr__(self, name, value)
+    - __reduce__(self)
+    - freeVar(self)
+    - freeIndices(self)
+    - shift(self, offset, cutoff)
+    - substitute(self, index, expression)
+    - isBetaNormal(self)
+    """
+
+
+
+    __slots__ = ('index', 'freeNames', 'indexMask', 'betaNormal',
+                 'etaNormal', 'size', 'hashValue', '__weakref__')
+
+
+
+    def __new__(cls, index):
+        """
+        Constructor for DBVar class.
+
+        :param index: the de Bruijn index of the variable
+        :type index: int
+        :UC: index >= 0
+        :Examples:
+
+        >>> print(DBVar(2).index)
+        2
+        >>> error = DBVar(-1) # doctest: +IGNORE_EXCEPTION_DETAIL
+        Traceback (most recent call last):
+        ...
+        ldebruijn.DeBruijnError: This is not a de Bruijn index.
+        """
+        try:
+            assert type(index) == int and index >= 0
+        except AssertionError:
+            raise DeBruijnError("This is not a de Bruijn index.")
+        key = (cls, index)
+        node = NODES.get(key)
+        if node is None:
+            node = object.__new__(cls)
+            object.__setattr__(node, "index", index)
+            object.__setattr__(node, "freeNames", frozenset())
+            object.__setattr__(node, "indexMask", 1 << index)
+            object.__setattr__(node, "betaNormal", True)
+            object.__setattr__(node, "etaNormal", True)
+            object.__setattr__(node, "size", 1)
+            object.__setattr__(node, "hashValue", hash(key))
+            NODES[key] = node
+        return node
+
+
+
+    def __repr__(self):
+        """
+        Provide a readable representation of DBVar.
+        """
+        return str(self.index)
+
+
+
+    def getParts(self):
+        """
+        Get the parts of the representation, see lvar.represent.
+
+        :rtype: list
+        """
+        return [str(self.index)]
+
+
+
+    def __eq__(self, other):
+        """
+        Structural equality, which is an identity check.
+        """
+        return self is other
+
+
+
+    def __hash__(self):
+        """
+        Get the structural hash, computed once when the node is built.
+        """
+        return self.hashValue
+
+
+
+    def __setattr__(self, name, value):
+        """
+        De Bruijn terms are immutable.
+        """
+        raise DeBruijnError("De Bruijn terms are immutable.")
+
+
+
+    def __reduce__(self):
+        """
+        Pickle the term as its table of nodes, see toTable: unpickling
+        interns it again, and deep terms do not hit the recursion limit.
+        """
+        return (fromTable, (toTable(self),))
+
+
+
+    def freeVar(self):
+        """
+        Get the names of the free variables of the term.
+
+        :return: the empty set
+        :rtype: frozenset
+        """
+        return self.freeNames
+
+
+
+    def freeIndices(self):
+        """
+        Get the indices that refer to a binder outside of the term.
+
+        :return: the indices of the dangling variables
+        :rtype: set
+        """
+        return maskIndices(self.indexMask)
+
+
+
+    def shift(self, offset, cutoff=0):
+        """
+        Add offset to the indices which are not bound inside the term.
+
+        :param offset: the value to add to the dangling indices
+        :type offset: int
+        :param cutoff: the number of binders already crossed
+        :type cutoff: int
+        :return: the shifted term
+        :rtype: DBVar
+        :Examples:
+
+        >>> print(DBVar(0).shift(2))
+        2
+        >>> print(DBVar(0).shift(2, 1))
+        0
+        """
+        if self.index >= cutoff:
+            return DBVar(self.index + offset)
+        else:
+            return self
+
+
+
+    def substitute(self, index, expression):
+        """
+        Substitute the variable of the given index by an expression and
+        decrement the indices of the variables bound above it.
+
+        :param index: the index of the variable to substitute
+        :type index: int
+        :param expression: the expression to substitute, as seen from outside
+           the index binders
+        :type expression: DBVar, DBFree, DBApp or DBAbs
+        :return: the new term
+        :rtype: DBVar, DBFree, DBApp or DBAbs
+        :Examples:
+
+        >>> print(DBVar(1).substitute(1, DBVar(0)))
+        1
+        >>> print(DBVar(2).substitute(1, DBFree("y")))
+        1
+        >>> print(DBVar(0).substitute(1, DBFree("y")))
+        0
+        """
+        if self.index == index:
+            return expression.shift(index)
+        elif self.index > index:
+            return DBVar(self.index - 1)
+        else:
+            return self
+
+
+
+    def isBetaNormal(self):
+        """
+        Test whether the term is in its beta normal form.
+
+        :return: True
+        :rtype: bool
+        """
+        return self.betaNormal
+
+
+
+
+class DBFree():
+    """
+    Class for free variables of de Bruijn terms.
+
+    :param name: the name of the variable
+    :type name: str
+
+    :attributes:
+
+    - name
+
+    :methods:
+
+    - __new__(cls, name)
+    - __repr__(self)
+    - getParts(self)
+    - __setattr__(self, name, value)
+    - __reduce__(self)
+    - freeVar(self)
+    - freeIndices(self)
+    - shift(self, offset, cutoff)
+    - substitute(self, index, expression)
+    - isBetaNormal(self)
+    """
+
+
+
+    __slots__ = ('name', 'freeNames', 'indexMask', 'betaNormal',
+                 'etaNormal', 'size', 'hashValue', '__weakref__')
+
+
+
+    def __new__(cls, name):
+        """
+        Constructor for DBFree class.
+
+        :param name: the name of the free variable
+        :type name: str
+        :UC: name must be in the alphabet of variable
+        :Examples:
+
+        >>> print(DBFree("y"))
+        y
+        >>> error = DBFree(3) # doctest: +IGNORE_EXCEPTION_DETAIL
+        Traceback (most recent call last):
+        ...
+        ldebruijn.DeBruijnError: This is not a lambda variable.
+        """
+        try:
+            assert isVarName(name)
+        except AssertionError:
+            raise DeBruijnError("This is not a lambda variable.")
+        key = (cls, name)
+        node = NODES.get(key)
+        if node is None:
+            node = object.__new__(cls)
+            object.__setattr__(node, "name", name)
+            object.__setattr__(node, "freeNames", frozenset((name,)))
+            object.__setattr__(node, "indexMask", 0)
+            object.__setattr__(node, "betaNormal", True)
+            object.__setattr__(node, "etaNormal", True)
+            object.__setattr__(node, "size", 1)
+            object.__setattr__(node, "hashValue", hash(key))
+            NODES[key] = node
+        return node
+
+
+
+    def __repr__(self):
+        """
+        Provide a readable representation of DBFree.
+        """
+        return self.name
+
+
+
+    def getParts(self):
+        """
+        Get the parts of the representation, see lvar.represent.
+
+        :rtype: list
+        """
+        return [self.name]
+
+
+
+    def __eq__(self, other):
+        """
+        Structural equality, which is an identity check.
+        """
+        return self is other
+
+
+
+    def __hash__(self):
+        """
+        Get the structural hash, computed once when the node is built.
+        """
+        return self.hashValue
+
+
+
+    def __setattr__(self, name, value):
+        """
+        De Bruijn terms are immutable.
+        """
+        raise DeBruijnError("De Bruijn terms are immutable.")
+
+
+
+    def __reduce__(self):
+        """
+        Pickle the term as its table of nodes, see toTable: unpickling
+        interns it again, and deep terms do not hit the recursion limit.
+        """
+        return (fromTable, (toTable(self),))
+
+
+
+    def freeVar(self):
+        """
+        Get the names of the free variables of the term.
+
+        :return: the name of the variable
+        :rtype: frozenset
+        """
+        return self.freeNames
+
+
+
+    def freeIndices(self):
+        """
+        Get the indices that refer to a binder outside of the term.
+
+        :return: the empty set
+        :rtype: set
+        """
+        return maskIndices(self.indexMask)
+
+
+
+    def shift(self, offset, cutoff=0):
+        """
+        Free variables have no index to shift.
+        """
+        return self
+
+
+
+    def substitute(self, index, expression):
+        """
+        Free variables are never substituted.
+        """
+        return self
+
+
+
+    def isBetaNormal(self):
+        """
+        Test whether the term is in its beta normal form.
+
+        :return: True
+        :rtype: bool
+        """
+        return self.betaNormal
+
+
+
+
+class DBApp():
+    """
+    Class for applications of de Bruijn terms.
+
+    :param function: the term taken as the function of the application
+    :type function: DBVar, DBFree, DBApp or DBAbs
+    :param argument: the term taken as the argument of the application
+    :type argument: DBVar, DBFree, DBApp or DBAbs
+
+    :attributes:
+
+    - function
+    - argument
+
+    :methods:
+
+    - __new__(cls, function, argument)
+    - __repr__(self)
+    - getParts(self)
+    - __setattr__(self, name, value)
+    - __reduce__(self)
+    - freeVar(self)
+    - freeIndices(self)
+    - shift(self, offset, cutoff)
+    - substitute(self, index, expression)
+    - isRedex(self)
+    - isBetaNormal(self)
+    - betaReduction(self)
+    - oneStepNOBetaEval(self)
+    - oneStepAOBetaEval(self)
+    """
+
+
+
+    __slots__ = ('function', 'argument', 'freeNames', 'indexMask',
+                 'betaNormal', 'etaNormal', 'size', 'hashValue', '__weakref__')
+
+
+
+    def __new__(cls, function, argument):
+        """
+        Constructor for DBApp class.
+
+        :param function: the function of the application
+        :type function: DBVar, DBFree, DBApp or DBAbs
+        :param argument: the argument of the application
+        :type argument: DBVar, DBFree, DBApp or DBAbs
+        :Examples:
+
+        >>> print(DBApp(DBFree("x"), DBFree("y")))
+        (x y)
+        >>> DBApp(DBFree("x"), DBVar(0)) is DBApp(DBFree("x"), DBVar(0))
+        True
+        >>> DBApp(DBFree("x"), DBVar(0)).size
+        3
+        """
+        key = (cls, function, argument)
+        node = NODES.get(key)
+        if node is None:
+            node = object.__new__(cls)
+            object.__setattr__(node, "function", function)
+            object.__setattr__(node, "argument", argument)
+            object.__setattr__(node, "freeNames",\
+                               function.freeNames | argument.freeNames)
+            object.__setattr__(node, "indexMask",\
+                               function.indexMask | argument.indexMask)
+            object.__setattr__(node, "betaNormal",\
+                               type(function) != DBAbs\
+                               and function.betaNormal\
+                               and argument.betaNormal)
+            object.__setattr__(node, "etaNormal",\
+                               function.etaNormal and argument.etaNormal)
+            object.__setattr__(node, "size", 1 + function.size + argument.size)
+            object.__setattr__(node, "hashValue", hash(key))
+            NODES[key] = node
+        return node
+
+
+
+    def __repr__(self):
+        """
+        Provide a readable representation of DBApp.
+        """
+        return represent(self)
+
+
+
+    def getParts(self):
+        """
+        Get the parts of the representation, see lvar.represent.
+
+        :rtype: list
+        """
+        return ["(", self.function, " ", self.argument, ")"]
+
+
+
+    def __eq__(self, other):
+        """
+        Structural equality, which is an identity check.
+        """
+        return self is other
+
+
+
+    def __hash__(self):
+        """
+        Get the structural hash, computed once when the node is built.
+        """
+        return self.hashValue
+
+
+
+    def __setattr__(self, name, value):
+        """
+        De Bruijn terms are immutable.
+        """
+        raise DeBruijnError("De Bruijn terms are immutable.")
+
+
+
+    def __reduce__(self):
+        """
+        Pickle the term as its table of nodes, see toTable: unpickling
+        interns it again, and deep terms do not hit the recursion limit.
+        """
+        return (fromTable, (toTable(self),))
+
+
+
+    def freeVar(self):
+        """
+        Get the names of the free variables of the term.
+
+        :return: the names of the free variables
+        :rtype: frozenset
+        """
+        return self.freeNames
+
+
+
+    def freeIndices(self):
+        """
+        Get the indices that refer to a binder outside of the term.
+
+        :return: the indices of the dangling variables
+        :rtype: set
+        """
+        return maskIndices(self.indexMask)
+
+
+
+    def shift(self, offset, cutoff=0):
+        """
+        Add offset to the indices which are not bound inside the term.
+
+        :param offset: the value to add to the dangling indices
+        :type offset: int
+        :param cutoff: the number of binders already crossed
+        :type cutoff: int
+        :return: the shifted term
+        :rtype: DBApp
+        """
+        return shiftTerm(self, offset, cutoff)
+
+
+
+    def substitute(self, index, expression):
+        """
+        Substitute the variable of the given index by an expression.
+
+        :param index: the index of the variable to substitute
+        :type index: int
+        :param expression: the expression to substitute
+        :type expression: DBVar, DBFree, DBApp or DBAbs
+        :return: the new term
+        :rtype: DBApp
+        """
+        return substituteTerm(self, index, expression)
+
+
+
+    def isRedex(self):
+        """
+        Test whether the application is a redex.
+
+        :rtype: bool
+        """
+        return type(self.function) == DBAbs
+
+
+
+    def isBetaNormal(self):
+        """
+        Test whether the term is in its beta normal form.
+
+        :rtype: bool
+        :Examples:
+
+        >>> DBApp(DBAbs(DBVar(0)), DBFree("y")).isBetaNormal()
+        False
+        >>> DBApp(DBFree("x"), DBFree("y")).isBetaNormal()
+        True
+        """
+        return self.betaNormal
+
+
+
+    def betaReduction(self):
+        """
+        Operate a beta-reduction on the term.
+
+        .. note::
+
+           Since there are no names, there is no name clash to avoid: the
+           substitution only shifts indices.
+
+        :return: the beta-reduct of the term
+        :rtype: DBVar, DBFree, DBApp or DBAbs
+        :UC: the term must be a redex
+        :Examples:
+
+        >>> # (λx.(λy.(xy)))y  ->  (λy1.(yy1))
+        ... redex = DBApp(DBAbs(DBAbs(DBApp(DBVar(1), DBVar(0)))), DBFree("y"))
+        >>> print(redex.betaReduction())
+        (λ.(y 0))
+        """
+        return self.function.body.substitute(0, self.argument)
+
+
+
+    def oneStepNOBetaEval(self):
+        """
+        Perform one step of a normal order Beta-evaluation.
+
+        .. note::
+
+           Same order as LambdaApp.oneStepNOBetaEval: the redex itself,
+           then the function, then the argument.
+
+        :return: the one step Beta-evaluation of the term
+        :rtype: DBVar, DBFree, DBApp or DBAbs
+        :UC: the term must not be in beta normal form
+        """
+        return oneStep(self, "normal")
+
+
+
+    def oneStepAOBetaEval(self):
+        """
+        Perform one step of an applicative order Beta-evaluation.
+
+        .. note::
+
+           Same order as LambdaApp.oneStepAOBetaEval: the argument, then the
+           function, then the redex itself.
+
+        :return: the one step Beta-evaluation of the term
+        :rtype: DBVar, DBFree, DBApp or DBAbs
+        :UC: the term must not be in beta normal form
+        """
+        return oneStep(self, "applicative")
+
+
+
+
+class DBAbs():
+    """
+    Class for abstractions of de Bruijn terms.
+
+    :param body: the body of the abstraction
+    :type body: DBVar, DBFree, DBApp or DBAbs
+    :param hint: the name of the binder in the named expression, if any
+    :type hint: str or None
+
+    :attributes:
+
+    - body
+    - hint
+
+    :methods:
+
+    - __new__(cls, body, hint)
+    - __repr__(self)
+    - getParts(self)
+    - __setattr__(self, name, value)
+    - __reduce__(self)
+    - freeVar(self)
+    - freeIndices(self)
+    - shift(self, offset, cutoff)
+    - substitute(self, index, expression)
+    - isBetaNormal(self)
+    - isEtaRedex(self)
+    - etaReduction(self)
+    - oneStepNOBetaEval(self)
+    - oneStepAOBetaEval(self)
+    """
+
+
+
+    __slots__ = ('body', 'hint', 'freeNames', 'indexMask', 'betaNormal',
+                 'etaNormal', 'size', 'hashValue', '__weakref__')
+
+
+
+    def __new__(cls, body, hint=None):
+        """
+        Constructor for DBAbs class.
+
+        :param body: the body of the abstraction
+        :type body: DBVar, DBFree, DBApp or DBAbs
+        :param hint: the name to give back to the binder
+        :type hint: str or None
+        :Examples:
+
+        >>> print(DBAbs(DBVar(0), "x"))
+        (λ.0)
+        >>> DBAbs(DBVar(0), "x") is DBAbs(DBVar(0), "y")
+        False
+        >>> error = DBAbs(DBVar(0), "?") # doctest: +IGNORE_EXCEPTION_DETAIL
+        Traceback (most recent call last):
+        ...
+        ldebruijn.DeBruijnError: This is not a lambda variable.
+        """
+        try:
+            assert hint is None or isVarName(hint)
+        except AssertionError:
+            raise DeBruijnError("This is not a lambda variable.")
+        key = (cls, body, hint)
+        node = NODES.get(key)
+        if node is None:
+            node = object.__new__(cls)
+            object.__setattr__(node, "body", body)
+            object.__setattr__(node, "hint", hint)
+            object.__setattr__(node, "freeNames", body.freeNames)
+            object.__setattr__(node, "indexMask", body.indexMask >> 1)
+            object.__setattr__(node, "betaNormal", body.betaNormal)
+            object.__setattr__(node, "etaNormal", body.etaNormal\
+                               and not (type(body) == DBApp\
+                                        and body.argument is DBVar(0)\
+                                        and not body.function.indexMask & 1))
+            object.__setattr__(node, "size", 1 + body.size)
+            object.__setattr__(node, "hashValue", hash(key))
+            NODES[key] = node
+        return node
+
+
+
+    def __repr__(self):
+        """
+        Provide a readable representation of DBAbs.
+        """
+        return represent(self)
+
+
+
+    def getParts(self):
+        """
+        Get the parts of the representation, see lvar.represent.
+
+        :rtype: list
+        """
+        return ["(" + LAMBDA_OP + LAMBDA_DOT, self.body, ")"]
+
+
+
+    def __eq__(self, other):
+        """
+        Structural equality, which is an identity check: the hints are part
+        of the structure.
+        """
+        return self is other
+
+
+
+    def __hash__(self):
+        """
+        Get the structural hash, computed once when the node is built.
+        """
+        return self.hashValue
+
+
+
+    def __setattr__(self, name, value):
+        """
+        De Bruijn terms are immutable.
+        """
+        raise DeBruijnError("De Bruijn terms are immutable.")
+
+
+
+    def __reduce__(self):
+        """
+        Pickle the term as its table of nodes, see toTable: unpickling
+        interns it again, and deep terms do not hit the recursion limit.
+        """
+        return (fromTable, (toTable(self),))
+
+
+
+    def freeVar(self):
+        """
+        Get the names of the free variables of the term.
+
+        :return: the names of the free variables
+        :rtype: frozenset
+        """
+        return self.freeNames
+
+
+
+    def freeIndices(self):
+        """
+        Get the indices that refer to a binder outside of the term.
+
+        :return: the indices of the dangling variables
+        :rtype: set
+        """
+        return maskIndices(self.indexMask)
+
+
+
+    def shift(self, offset, cutoff=0):
+        """
+        Add offset to the indices which are not bound inside the term.
+
+        :param offset: the value to add to the dangling indices
+        :type offset: int
+        :param cutoff: the number of binders already crossed
+        :type cutoff: int
+        :return: the shifted term
+        :rtype: DBAbs
+        """
+        return shiftTerm(self, offset, cutoff)
+
+
+
+    def substitute(self, index, expression):
+        """
+        Substitute the variable of the given index by an expression.
+
+        :param index: the index of the variable to substitute
+        :type index: int
+        :param expression: the expression to substitute
+        :type expression: DBVar, DBFree, DBApp or DBAbs
+        :return: the new term
+        :rtype: DBAbs
+        """
+        return substituteTerm(self, index, expression)
+
+
+
+    def isBetaNormal(self):
+        """
+        Test whether the term is in its beta normal form.
+
+        :rtype: bool
+        """
+        return self.betaNormal
+
+
+
+    def isEtaRedex(self):
+        """
+        Test whether the abstraction is an eta redex, that is the
+        abstraction of a function applied to the bound variable, which does
+        not occur in the function.
+
+        :rtype: bool
+        :Examples:
+
+        >>> DBAbs(DBApp(DBFree("f"), DBVar(0))).isEtaRedex()
+        True
+        >>> DBAbs(DBApp(DBVar(0), DBVar(0))).isEtaRedex()
+        False
+        """
+        return type(self.body) == DBApp and self.body.argument is DBVar(0)\
+            and not self.body.function.indexMask & 1
+
+
+
+    def etaReduction(self):
+        """
+        Operate an eta-reduction on the term.
+
+        :return: the eta-reduct of the term, the function with its indices
+           shifted down across the removed binder
+        :rtype: DBVar, DBFree, DBApp or DBAbs
+        :UC: the term must be an eta redex
+        :Examples:
+
+        >>> # (λx.((λy.(xy))x))  ->  (λx.(λy.(xy)))
+        ... inner = DBAbs(DBApp(DBVar(1), DBVar(0)))
+        >>> print(DBAbs(DBApp(DBAbs(inner), DBVar(0))).etaReduction())
+        (λ.(λ.(1 0)))
+        """
+        return shiftTerm(self.body.function, -1)
+
+
+
+    def oneStepNOBetaEval(self):
+        """
+        Perform one step of a normal order Beta-evaluation.
+
+        :return: the one step Beta-evaluation of the term
+        :rtype: DBAbs
+        :UC: the term must not be in beta normal form
+        """
+        return oneStep(self, "normal")
+
+
+
+    def oneStepAOBetaEval(self):
+        """
+        Perform one step of an applicative order Beta-evaluation.
+
+        :return: the one step Beta-evaluation of the term
+        :rtype: DBAbs
+        :UC: the term must not be in beta normal form
+        """
+        return oneStep(self, "applicative")
+
+
+
+
+def maskIndices(mask):
+    """
+    Get the indices of the bits set in a mask of dangling indices.
+
+    .. note::
+
+       Each de Bruijn node computes, once, the mask of the indices that
+       refer to a binder outside of it: bit i is set when index i occurs
+       free. Shifting and substitution skip the subterms whose mask shows
+       they are not concerned.
+
+    :param mask: the mask of dangling indices
+    :type mask: int
+    :return: the dangling indices
+    :rtype: set
+    :Examples:
+
+    >>> maskIndices(0b101) == {0, 2}
+    True
+    >>> maskIndices(DBAbs(DBApp(DBVar(0), DBVar(3))).indexMask) == {2}
+    True
+    """
+    indices = set()
+    index = 0
+    while mask:
+        if mask & 1:
+            indices.add(index)
+        mask >>= 1
+        index += 1
+    return indices
+
+
+
+def rebuild(term, depth, onVar):
+    """
+    Rebuild a term, replacing its variables of index at least depth
+    (counted from the root of the term).
+
+    .. note::
+
+       The term is walked with an explicit stack, and the subterms whose
+       mask shows they have no such variable are kept as they are.
+
+    :param term: the term to rebuild
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :param depth: the lowest index to replace
+    :type depth: int
+    :param onVar: build the replacement of a variable, given the number of
+       binders crossed from the root of the term
+    :type onVar: function
+    :return: the rebuilt term
+    :rtype: DBVar, DBFree, DBApp or DBAbs
+    """
+    results = []
+    stack = [(term, 0, False)]
+    while stack:
+        current, crossed, built = stack.pop()
+        if built:
+            if type(current) == DBApp:
+                argument = results.pop()
+                function = results.pop()
+                results.append(DBApp(function, argument))
+            else:
+                results.append(DBAbs(results.pop(), current.hint))
+        elif current.indexMask >> (depth + crossed) == 0:
+            results.append(current)
+        elif type(current) == DBVar:
+            results.append(onVar(current, crossed))
+        elif type(current) == DBApp:
+            stack.append((current, crossed, True))
+            stack.append((current.argument, crossed, False))
+            stack.append((current.function, crossed, False))
+        else:
+            stack.append((current, crossed, True))
+            stack.append((current.body, crossed + 1, False))
+    return results[0]
+
+
+
+def shiftTerm(term, offset, cutoff=0):
+    """
+    Add offset to the indices of a term which are at least cutoff.
+
+    :param term: the term to shift
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :param offset: the value to add to the dangling indices
+    :type offset: int
+    :param cutoff: the number of binders already crossed
+    :type cutoff: int
+    :return: the shifted term
+    :rtype: DBVar, DBFree, DBApp or DBAbs
+    :Examples:
+
+    >>> print(shiftTerm(DBAbs(DBApp(DBVar(0), DBVar(1))), 2))
+    (λ.(0 3))
+    """
+    if offset == 0:
+        return term
+    return rebuild(term, cutoff, lambda var, crossed: DBVar(var.index + offset))
+
+
+
+def substituteTerm(term, index, expression):
+    """
+    Substitute the variable of the given index by an expression and
+    decrement the indices of the variables bound above it.
+
+    :param term: the term in which to substitute
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :param index: the index of the variable to substitute
+    :type index: int
+    :param expression: the expression to substitute, as seen from outside
+       the index binders
+    :type expression: DBVar, DBFree, DBApp or DBAbs
+    :return: the new term
+    :rtype: DBVar, DBFree, DBApp or DBAbs
+    :Examples:
+
+    >>> print(substituteTerm(DBAbs(DBApp(DBVar(1), DBVar(2))), 0, DBVar(0)))
+    (λ.(1 1))
+    """
+    def onVar(var, crossed):
+        if var.index == index + crossed:
+            return shiftTerm(expression, index + crossed)
+        else:
+            return DBVar(var.index - 1)
+    return rebuild(term, index, onVar)
+
+
+
+def oneStep(term, evalMode="normal"):
+    """
+    Perform one step of a Beta-evaluation.
+
+    .. note::
+
+       The path to the redex is followed with the beta normal flags of the
+       nodes, then the spine is rebuilt from a stack: no recursion is
+       involved. The orders are the ones of LambdaApp.oneStepNOBetaEval and
+       LambdaApp.oneStepAOBetaEval.
+
+    :param term: the term to evaluate
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :param evalMode: order of evaluation, either normal (default) or
+       applicative
+    :type evalMode: str
+    :return: the one step Beta-evaluation of the term
+    :rtype: DBVar, DBFree, DBApp or DBAbs
+    :UC: the term must not be in beta normal form
+    :Examples:
+
+    >>> double = DBAbs(DBApp(DBVar(0), DBVar(0)), "x")
+    >>> redex = DBApp(DBAbs(DBApp(DBFree("t"), DBVar(0)), "z"), DBFree("r"))
+    >>> print(oneStep(DBApp(double, redex)))
+    (((λ.(t 0)) r) ((λ.(t 0)) r))
+    >>> print(oneStep(DBApp(double, redex), "applicative"))
+    ((λ.(0 0)) (t r))
+    """
+    path, redex = redexPath(term, evalMode)
+    return plug(path, redex.betaReduction())
+
+
+
+def redexPath(term, evalMode="normal"):
+    """
+    Find the next redex of a Beta-evaluation.
+
+    :param term: the term to evaluate
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :param evalMode: order of evaluation, either normal (default) or
+       applicative
+    :type evalMode: str
+    :return: the path from the root to the redex, as the list of the nodes
+       crossed with the side taken (None for the body of an abstraction,
+       function or argument for an application), and the redex
+    :rtype: tuple
+    :UC: the term must not be in beta normal form
+    :Examples:
+
+    >>> redex = DBApp(DBAbs(DBVar(0), "x"), DBFree("y"))
+    >>> path, found = redexPath(DBAbs(DBApp(DBFree("f"), redex), "z"))
+    >>> [side for node, side in path], found is redex
+    ([None, 'argument'], True)
+    """
+    try:
+        assert not term.isBetaNormal()
+    except AssertionError:
+        raise DeBruijnError(\
+            "Can not carry on beta evaluation on a beta normal form.")
+    path = []
+    current = term
+    while True:
+        if type(current) == DBAbs:
+            path.append((current, None))
+            current = current.body
+        elif evalMode == "normal":
+            if current.isRedex():
+                break
+            elif not current.function.isBetaNormal():
+                path.append((current, "function"))
+                current = current.function
+            else:
+                path.append((current, "argument"))
+                current = current.argument
+        else:
+            if not current.argument.isBetaNormal():
+                path.append((current, "argument"))
+                current = current.argument
+            elif not current.function.isBetaNormal():
+                path.append((current, "function"))
+                current = current.function
+            else:
+                break
+    return (path, current)
+
+
+
+def plug(path, result):
+    """
+    Rebuild a term from a path to one of its subterms, given by redexPath,
+    with result in place of the subterm.
+
+    :param path: the nodes crossed from the root, with the side taken; it
+       is consumed
+    :type path: list
+    :param result: the new subterm
+    :type result: DBVar, DBFree, DBApp or DBAbs
+    :return: the new term
+    :rtype: DBVar, DBFree, DBApp or DBAbs
+    """
+    while path:
+        parent, side = path.pop()
+        if side is None:
+            result = DBAbs(result, parent.hint)
+        elif side == "function":
+            result = DBApp(result, parent.argument)
+        else:
+            result = DBApp(parent.function, result)
+    return result
+
+
+
+
+def etaNormalForm(term):
+    """
+    Compute the eta normal form of a term.
+
+    .. note::
+
+       The term is rebuilt from the leaves, so that the body of an
+       abstraction is already in eta normal form when the abstraction is
+       checked: one pass is enough, since a contraction only shifts the
+       indices of a term which is already normal. The subterms in eta
+       normal form are kept as they are.
+
+    :param term: the term to reduce
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :return: the eta normal form of term
+    :rtype: DBVar, DBFree, DBApp or DBAbs
+    :Examples:
+
+    >>> # (λx.(λy.((fx)y)))  ->  f
+    ... term = DBAbs(DBAbs(DBApp(DBApp(DBFree("f"), DBVar(1)), DBVar(0))))
+    >>> print(etaNormalForm(term))
+    f
+    """
+    results = []
+    stack = [(term, False)]
+    while stack:
+        current, built = stack.pop()
+        if built:
+            if type(current) == DBApp:
+                argument = results.pop()
+                function = results.pop()
+                results.append(DBApp(function, argument))
+            else:
+                result = DBAbs(results.pop(), current.hint)
+                if result.isEtaRedex():
+                    result = result.etaReduction()
+                results.append(result)
+        elif current.etaNormal:
+            results.append(current)
+        elif type(current) == DBApp:
+            stack.append((current, True))
+            stack.append((current.argument, False))
+            stack.append((current.function, False))
+        else:
+            stack.append((current, True))
+            stack.append((current.body, False))
+    return results[0]
+
+
+
+def toTable(term):
+    """
+    Flatten a term into a table of its distinct nodes, children first.
+
+    .. note::
+
+       A node of the table is either ("var", index), ("free", name),
+       ("app", function, argument) or ("abs", body, hint), where the
+       children are given by their position in the table. The shared
+       subterms appear once.
+
+    :param term: the term to flatten
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :return: the table, whose last node is term
+    :rtype: tuple
+    :Examples:
+
+    >>> toTable(DBApp(DBAbs(DBVar(0), "x"), DBAbs(DBVar(0), "x")))
+    (('var', 0), ('abs', 0, 'x'), ('app', 1, 1))
+    """
+    positions = dict()
+    table = []
+    stack = [term]
+    while stack:
+        current = stack[-1]
+        if current in positions:
+            stack.pop()
+            continue
+        kind = type(current)
+        if kind == DBVar:
+            node = ("var", current.index)
+        elif kind == DBFree:
+            node = ("free", current.name)
+        elif kind == DBAbs:
+            if current.body not in positions:
+                stack.append(current.body)
+                continue
+            node = ("abs", positions[current.body], current.hint)
+        else:
+            if current.function not in positions:
+                stack.append(current.function)
+                continue
+            if current.argument not in positions:
+                stack.append(current.argument)
+                continue
+            node = ("app", positions[current.function],\
+                    positions[current.argument])
+        stack.pop()
+        positions[current] = len(table)
+        table.append(node)
+    return tuple(table)
+
+
+
+def fromTable(table):
+    """
+    Build back the term flattened by toTable.
+
+    :param table: the table of the nodes of the term
+    :type table: tuple
+    :return: the term
+    :rtype: DBVar, DBFree, DBApp or DBAbs
+    :Examples:
+
+    >>> import pickle
+    >>> term = DBAbs(DBApp(DBVar(0), DBFree("y")), "x")
+    >>> fromTable(toTable(term)) is term
+    True
+    >>> pickle.loads(pickle.dumps(term)) is term
+    True
+    """
+    nodes = []
+    for node in table:
+        if node[0] == "var":
+            nodes.append(DBVar(node[1]))
+        elif node[0] == "free":
+            nodes.append(DBFree(node[1]))
+        elif node[0] == "abs":
+            nodes.append(DBAbs(nodes[node[1]], node[2]))
+        else:
+            nodes.append(DBApp(nodes[node[1]], nodes[node[2]]))
+    return nodes[-1]
+
+
+
+def toDeBruijn(expression, context=None):
+    """
+    Build the de Bruijn term corresponding to a named lambda expression.
+
+    :param expression: the named lambda expression
+    :type expression: LambdaVar, LambdaApp or LambdaAbs
+    :param context: the binders crossed so far, the innermost last
+    :type context: list
+    :return: the corresponding de Bruijn term
+    :rtype: DBVar, DBFree, DBApp or DBAbs
+    :Examples:
+
+    >>> print(toDeBruijn(LambdaAbs("x", LambdaApp(LambdaVar("x"), LambdaVar("y")))))
+    (λ.(0 y))
+    >>> print(toDeBruijn(LambdaAbs("x", LambdaAbs("x", LambdaVar("x")))))
+    (λ.(λ.0))
+    """
+    # levels[name] lists the depths of the binders of name, innermost last
+    levels = dict()
+    depth = 0
+    for binder in context or []:
+        levels.setdefault(binder, []).append(depth)
+        depth += 1
+    results = []
+    stack = [(expression, False)]
+    while stack:
+        current, built = stack.pop()
+        if type(current) == LambdaVar:
+            if levels.get(current.name):
+                results.append(DBVar(depth - 1 - levels[current.name][-1]))
+            else:
+                results.append(DBFree(current.name))
+        elif type(current) == LambdaAbs:
+            if built:
+                depth -= 1
+                levels[current.binder].pop()
+                results.append(DBAbs(results.pop(), current.binder))
+            else:
+                levels.setdefault(current.binder, []).append(depth)
+                depth += 1
+                stack.append((current, True))
+                stack.append((current.body, False))
+        elif built:
+            argument = results.pop()
+            function = results.pop()
+            results.append(DBApp(function, argument))
+        else:
+            stack.append((current, True))
+            stack.append((current.argument, False))
+            stack.append((current.function, False))
+    return results[0]
+
+
+
+def eraseHints(term):
+    """
+    Build the same de Bruijn term without the hints of its abstractions.
+
+    .. note::
+
+       The result only depends on the term up to alpha equivalence: it is
+       the canonical term of the named expressions the term stands for.
+
+    :param term: the de Bruijn term
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :return: the term without hints
+    :rtype: DBVar, DBFree, DBApp or DBAbs
+    :Examples:
+
+    >>> eraseHints(DBAbs(DBVar(0), "x")) is eraseHints(DBAbs(DBVar(0), "y"))
+    True
+    """
+    erased = dict()
+    stack = [term]
+    while stack:
+        current = stack[-1]
+        if current in erased:
+            stack.pop()
+        elif type(current) == DBAbs:
+            if current.body in erased:
+                erased[current] = DBAbs(erased[current.body])
+                stack.pop()
+            else:
+                stack.append(current.body)
+        elif type(current) == DBApp:
+            if current.function not in erased:
+                stack.append(current.function)
+            elif current.argument not in erased:
+                stack.append(current.argument)
+            else:
+                erased[current] = DBApp(erased[current.function],\
+                                        erased[current.argument])
+                stack.pop()
+        else:
+            erased[current] = current
+            stack.pop()
+    return erased[term]
+
+
+
+def toCanonical(expression):
+    """
+    Get the canonical term of a named lambda expression, which is the same
+    for all the expressions alpha equivalent to it.
+
+    .. note::
+
+       Since the canonical terms are hash-consed, two expressions are alpha
+       equivalent if and only if their canonical terms are the very same
+       object, and the hash of the canonical term is an alpha invariant hash
+       of the expression. The term is computed in linear time and
+       remembered for the (hash-consed) expression.
+
+    :param expression: the named lambda expression
+    :type expression: LambdaVar, LambdaApp or LambdaAbs
+    :return: the canonical de Bruijn term
+    :rtype: DBVar, DBFree, DBApp or DBAbs
+    :Examples:
+
+    >>> identity_x = LambdaAbs("x", LambdaVar("x"))
+    >>> identity_y = LambdaAbs("y", LambdaVar("y"))
+    >>> toCanonical(identity_x) is toCanonical(identity_y)
+    True
+    >>> toCanonical(identity_x) is toCanonical(LambdaAbs("x", LambdaVar("y")))
+    False
+    """
+    if expression not in CANONICAL:
+        CANONICAL[expression] = eraseHints(toDeBruijn(expression))
+    return CANONICAL[expression]
+
+
+
+def fromDeBruijn(term, context=None, budget=None):
+    """
+    Build the named lambda expression corresponding to a de Bruijn term.
+
+    .. note::
+
+       The hint of each abstraction is used as the name of its binder,
+       unless it would capture a variable of the body: a fresh name is then
+       chosen.
+
+       The named expression of a closed abstraction does not depend on its
+       context, so it is remembered: the consecutive steps of a trace share
+       the subterms that the reduction left untouched, without reading them
+       back again.
+
+    :param term: the de Bruijn term
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :param context: the names given to the binders crossed so far, the
+       innermost last
+    :type context: list
+    :param budget: the budget whose clock is checked at each node, if any:
+       a hash-consed term may share its subterms, and be much smaller than
+       its named expression
+    :type budget: Budget or NoneType
+    :return: the corresponding named lambda expression
+    :rtype: LambdaVar, LambdaApp or LambdaAbs
+    :UC: the indices of term are bound in context
+    :Examples:
+
+    >>> print(fromDeBruijn(DBAbs(DBApp(DBVar(0), DBFree("y")), "x")))
+    (λx.(xy))
+    >>> # the hint y would capture the free y
+    ... print(fromDeBruijn(DBAbs(DBApp(DBVar(0), DBFree("y")), "y")))
+    (λy1.(y1y))
+    >>> print(fromDeBruijn(DBAbs(DBAbs(DBVar(1), "x"), "x")))
+    (λx.(λx1.x))
+    >>> identity = DBAbs(DBVar(0), "x")
+    >>> fromDeBruijn(identity) is fromDeBruijn(DBApp(identity, DBFree("y"))).function
+    True
+    """
+    context = list(context or [])
+    results = []
+    stack = [(term, False)]
+    while stack:
+        current, built = stack.pop()
+        if budget is not None:
+            budget.checkTime()
+        if type(current) == DBVar:
+            results.append(LambdaVar(context[len(context) - 1 - current.index]))
+        elif type(current) == DBFree:
+            results.append(LambdaVar(current.name))
+        elif type(current) == DBApp:
+            if built:
+                argument = results.pop()
+                function = results.pop()
+                results.append(LambdaApp(function, argument))
+            else:
+                stack.append((current, True))
+                stack.append((current.argument, False))
+                stack.append((current.function, False))
+        elif built:
+            expression = LambdaAbs(context.pop(), results.pop())
+            if current.indexMask == 0:
+                READBACK[current] = expression
+            results.append(expression)
+        elif current in READBACK:
+            results.append(READBACK[current])
+        else:
+            avoid = set(current.body.freeNames)
+            for index in current.body.freeIndices():
+                if index > 0:
+                    avoid.add(context[len(context) - index])
+            if current.hint is None:
+                binder = freshVar("x", avoid)
+            elif current.hint not in avoid:
+                binder = current.hint
+            else:
+                binder = freshVar(current.hint, avoid)
+            context.append(binder)
+            stack.append((current, True))
+            stack.append((current.body, False))
+    return results[0]
+
+
+
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
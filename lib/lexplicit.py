@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+:module name: lexplicit
+:module author: Nicolas Osborne <nicolas.osborne@etudiant.univ-lille1.fr>
+:date: 2018
+
+:synopsis: Normal order reduction with explicit substitutions.
+
+A beta step does not substitute the argument in the body: it suspends the
+substitution in a Closure node, the body together with the substitution to
+apply to it. A closure is only pushed one level down when its term has to be
+inspected, and two closures which meet are merged into one, by composing
+their substitutions. The parts of a term which are discarded by the
+reduction are thus never substituted, and the substitutions are not walked
+once per beta step but once for all.
+
+The substitutions are those of the lambda sigma calculus:
+
+- Shift(k) maps the index i to the index i + k, Shift(0) is the identity;
+- Cons(term, rest) maps 0 to term and i + 1 to what rest maps i to;
+- Compose(first, then) applies first, then then.
+
+The terms handled by the reducer are the de Bruijn terms, the closures, and
+the applications and abstractions (ExApp and ExAbs) whose children may be
+closures. A closure on a term without dangling index is the term itself: the
+masks of the de Bruijn terms make the substitutions stop at the closed
+subterms.
+
+:Tests:
+
+>>> from lib.lread import read
+>>> expr = read("((/x.(xx))((/z.(tz))r))")
+>>> term, steps = explicitNormalForm(expr.toDeBruijn())
+>>> print(fromDeBruijn(term), steps)
+((tr)(tr)) 3
+"""
+
+from lib.ldebruijn import *
+from lib.lreadback import *
+
+# lookup is left out, it would hide the one of lib.lkrivine
+__all__ = ["Shift", "Cons", "Compose", "IDENTITY", "SHIFT", "Closure", "ExApp",\
+           "ExAbs", "close", "expose", "explicitNormalForm"]
+
+
+
+class Shift():
+    """
+    Substitution adding an offset to all the indices.
+
+    :param offset: the offset
+    :type offset: int
+    """
+    __slots__ = ('offset',)
+
+    def __init__(self, offset):
+        self.offset = offset
+
+
+
+class Cons():
+    """
+    Substitution of a term for the index 0, and of rest for the others.
+
+    :param term: the term substituted for 0
+    :type term: DBVar, DBFree, DBApp, DBAbs, Closure, ExApp or ExAbs
+    :param rest: the substitution of the indices 1 and greater
+    :type rest: Shift, Cons or Compose
+    """
+    __slots__ = ('term', 'rest')
+
+    def __init__(self, term, rest):
+        self.term = term
+        self.rest = rest
+
+
+
+class Compose():
+    """
+    Substitution applying first then then.
+
+    :param first: the substitution to apply first
+    :type first: Shift, Cons or Compose
+    :param then: the substitution to apply next
+    :type then: Shift, Cons or Compose
+    """
+    __slots__ = ('first', 'then')
+
+    def __init__(self, first, then):
+        self.first = first
+        self.then = then
+
+
+
+IDENTITY = Shift(0)
+SHIFT = Shift(1)
+
+
+
+class Closure():
+    """
+    Suspended substitution.
+
+    :param term: the term
+    :type term: DBVar, DBFree, DBApp, DBAbs, ExApp or ExAbs
+    :param substitution: the substitution to apply to term
+    :type substitution: Shift, Cons or Compose
+    """
+    __slots__ = ('term', 'substitution')
+
+    def __init__(self, term, substitution):
+        self.term = term
+        self.substitution = substitution
+
+
+
+class ExApp():
+    """
+    Application whose children may hold closures.
+
+    :param function: the function
+    :type function: DBVar, DBFree, DBApp, DBAbs, Closure, ExApp or ExAbs
+    :param argument: the argument
+    :type argument: DBVar, DBFree, DBApp, DBAbs, Closure, ExApp or ExAbs
+    """
+    __slots__ = ('function', 'argument')
+
+    def __init__(self, function, argument):
+        self.function = function
+        self.argument = argument
+
+
+
+class ExAbs():
+    """
+    Abstraction whose body may hold closures.
+
+    :param body: the body
+    :type body: DBVar, DBFree, DBApp, DBAbs, Closure, ExApp or ExAbs
+    :param hint: the name the binder had
+    :type hint: str or NoneType
+    """
+    __slots__ = ('body', 'hint')
+
+    def __init__(self, body, hint=None):
+        self.body = body
+        self.hint = hint
+
+
+
+def close(term, substitution):
+    """
+    Suspend a substitution on a term, merging it with the closure the term
+    may already be.
+
+    :param term: the term
+    :type term: DBVar, DBFree, DBApp, DBAbs, Closure, ExApp or ExAbs
+    :param substitution: the substitution
+    :type substitution: Shift, Cons or Compose
+    :return: the closure, or term itself if the substitution does not
+       change it
+    :rtype: DBVar, DBFree, DBApp, DBAbs, Closure, ExApp or ExAbs
+    """
+    kind = type(term)
+    if substitution is IDENTITY or kind == DBFree:
+        return term
+    elif kind == Closure:
+        return Closure(term.term, Compose(term.substitution, substitution))
+    elif kind in (DBVar, DBApp, DBAbs) and term.indexMask == 0:
+        return term
+    elif kind == DBVar and type(substitution) == Shift:
+        return DBVar(term.index + substitution.offset)
+    else:
+        return Closure(term, substitution)
+
+
+
+def lookup(index, substitution):
+    """
+    Get the term a substitution maps an index to.
+
+    :param index: the index
+    :type index: int
+    :param substitution: the substitution
+    :type substitution: Shift, Cons or Compose
+    :return: the term index is mapped to
+    :rtype: DBVar, DBFree, DBApp, DBAbs, Closure, ExApp or ExAbs
+    :Examples:
+
+    >>> substitution = Compose(Cons(DBFree("a"), IDENTITY), SHIFT)
+    >>> print(lookup(0, substitution), lookup(1, substitution))
+    a 1
+    """
+    # the substitutions to apply to the result, the last one first
+    pending = []
+    while True:
+        kind = type(substitution)
+        if kind == Compose:
+            pending.append(substitution.then)
+            substitution = substitution.first
+        elif kind == Cons:
+            if index == 0:
+                term = substitution.term
+                break
+            index -= 1
+            substitution = substitution.rest
+        else:
+            term = DBVar(index + substitution.offset)
+            break
+    while pending:
+        term = close(term, pending.pop())
+    return term
+
+
+
+def expose(term):
+    """
+    Push the closures down until the head constructor of a term shows.
+
+    :param term: the term
+    :type term: DBVar, DBFree, DBApp, DBAbs, Closure, ExApp or ExAbs
+    :return: the same term, which is not a closure
+    :rtype: DBVar, DBFree, DBApp, DBAbs, ExApp or ExAbs
+    """
+    while type(term) == Closure:
+        inner, substitution = term.term, term.substitution
+        kind = type(inner)
+        if kind == DBVar:
+            term = lookup(inner.index, substitution)
+        elif kind == DBApp or kind == ExApp:
+            term = ExApp(close(inner.function, substitution),\
+                         close(inner.argument, substitution))
+        elif kind == DBAbs or kind == ExAbs:
+            lifted = Cons(DBVar(0), Compose(substitution, SHIFT))
+            term = ExAbs(close(inner.body, lifted), inner.hint)
+        else:
+            term = close(inner, substitution)
+    return term
+
+
+
+def explicitNormalForm(term, budget=None):
+    """
+    Compute the beta normal form of a term by normal order reduction with
+    explicit substitutions.
+
+    .. note::
+
+       The head of the term is reduced first, then the arguments of its
+       head variable and the bodies of its abstractions, by the read-back of
+       lib.lreadback.
+
+    :param term: the term to reduce
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :param budget: the budget charged a step for each transition, if any
+    :type budget: Budget or NoneType
+    :return: the beta normal form of term and the number of beta steps
+       performed
+    :rtype: tuple
+    :Examples:
+
+    >>> two = DBAbs(DBAbs(DBApp(DBVar(1), DBApp(DBVar(1), DBVar(0))), "x"), "f")
+    >>> term, steps = explicitNormalForm(DBApp(DBApp(two, two), DBFree("g")))
+    >>> print(term)
+    (λ.(g (g (g (g 0)))))
+    """
+    steps = 0
+    def expand(current, depth):
+        nonlocal steps
+        if type(current) in (DBVar, DBFree, DBApp, DBAbs)\
+           and current.isBetaNormal():
+            return ("term", current)
+        # reduce to weak head normal form
+        arguments = []
+        while True:
+            if budget is not None:
+                budget.tick()
+            current = expose(current)
+            kind = type(current)
+            if kind == DBApp or kind == ExApp:
+                arguments.append(current.argument)
+                if budget is not None:
+                    budget.checkSize(len(arguments))
+                current = current.function
+            elif (kind == DBAbs or kind == ExAbs) and arguments:
+                steps += 1
+                current = close(current.body, Cons(arguments.pop(), IDENTITY))
+            else:
+                break
+        if kind == DBAbs or kind == ExAbs:
+            return ("abs", current.hint, current.body)
+        return ("neutral", current, arguments[::-1])
+    term = readBack(term, expand, budget)
+    return (term, steps)
+
+
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
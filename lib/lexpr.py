@@ -9,10 +9,33 @@
 :synopsis: Provide a general modelisation for lambda expressions.
 """
 
+import hashlib
+import json
+import sqlite3
+import weakref
+from collections import OrderedDict
 from lib.alphabet_def import *
 from lib.lvar import *
 from lib.lapp import *
 from lib.labs import *
+from lib.ldebruijn import *
+from lib.lkrivine import *
+from lib.lcek import *
+from lib.lnbe import *
+from lib.lneed import *
+from lib.lnet import *
+from lib.lexplicit import *
+from lib.lhoas import *
+from lib.lbytecode import *
+from lib.lparallel import *
+from lib.ltrace import *
+from lib.lzipper import *
+from lib.lbudget import *
+# lib.larena builds LambdaExp: its names are looked up when they are used
+import lib.larena
+
+# de Bruijn terms of the expressions, which keep their compiled code alive
+DEBRUIJN = weakref.WeakKeyDictionary()
 
 class LambdaExpError(Exception):
     """
@@ -23,6 +46,182 @@ class LambdaExpError(Exception):
 
 
 
+class NormalFormCache():
+    """
+    Cache of the normal forms, shared by the alpha equivalent expressions.
+
+    .. note::
+
+       The entries are indexed by the canonical term of the expression (see
+       ldebruijn.toCanonical) and the strategy: a normal form computed for
+       an expression is given back, up to alpha equivalence, for all the
+       expressions alpha equivalent to it.
+
+       The memory tier keeps the most recently used normal forms, up to a
+       total size (in nodes) of the normal forms and of the canonical terms
+       they are indexed by; the least recently used ones are evicted
+       first. The optional disk tier is a sqlite database, so that the
+       normal forms survive the session: its keys are digests of the
+       canonical terms, which do not depend on the process.
+
+    :param maxSize: the total size of the entries kept in memory
+    :type maxSize: int
+    :param path: the file of the disk tier, None for no disk tier
+    :type path: str or NoneType
+
+    :attributes:
+
+    - maxSize
+    - size, the total size of the entries in memory, canonical terms and
+      normal forms
+    - hits, the number of normal forms found
+    - misses, the number of normal forms not found
+
+    :methods:
+
+    - __init__(self, maxSize, path)
+    - get(self, expression, strategy)
+    - put(self, expression, strategy, normal)
+    - remember(self, key, normal)
+    - close(self)
+    """
+    __slots__ = ('maxSize', 'size', 'hits', 'misses', 'memory', 'database')
+
+    def __init__(self, maxSize=1000000, path=None):
+        self.maxSize = maxSize
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        # normal forms by (canonical term, strategy), least recent first
+        self.memory = OrderedDict()
+        self.database = None
+        if path is not None:
+            self.database = sqlite3.connect(path)
+            self.database.execute("CREATE TABLE IF NOT EXISTS normal_forms\
+                                  (digest TEXT, strategy TEXT, term TEXT,\
+                                  PRIMARY KEY (digest, strategy))")
+            self.database.commit()
+
+
+    def get(self, expression, strategy):
+        """
+        Get the normal form of an expression, if it is known.
+
+        :param expression: the expression
+        :type expression: LambdaVar, LambdaApp or LambdaAbs
+        :param strategy: the strategy
+        :type strategy: str
+        :return: the de Bruijn normal form, or None
+        :rtype: DBVar, DBFree, DBApp, DBAbs or NoneType
+        :Examples:
+
+        >>> import os, tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), "cache.sqlite")
+        >>> identity = LambdaAbs("x", LambdaVar("x"))
+        >>> cache = NormalFormCache(path=path)
+        >>> cache.put(identity, "nbe", DBAbs(DBVar(0), "x"))
+        >>> cache.close()
+        >>> print(NormalFormCache(path=path).get(identity, "nbe"))
+        (λ.0)
+        """
+        key = (toCanonical(expression), strategy)
+        normal = self.memory.get(key)
+        if normal is not None:
+            self.memory.move_to_end(key)
+        elif self.database is not None:
+            row = self.database.execute("SELECT term FROM normal_forms\
+                                        WHERE digest = ? AND strategy = ?",\
+                                        (digest(key[0]), strategy)).fetchone()
+            if row is not None:
+                normal = fromTable(json.loads(row[0]))
+                self.remember(key, normal)
+        if normal is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return normal
+
+
+    def put(self, expression, strategy, normal):
+        """
+        Record the normal form of an expression.
+
+        :param expression: the expression
+        :type expression: LambdaVar, LambdaApp or LambdaAbs
+        :param strategy: the strategy
+        :type strategy: str
+        :param normal: the de Bruijn normal form
+        :type normal: DBVar, DBFree, DBApp or DBAbs
+        """
+        key = (toCanonical(expression), strategy)
+        self.remember(key, normal)
+        if self.database is not None:
+            self.database.execute("INSERT OR REPLACE INTO normal_forms\
+                                  VALUES (?, ?, ?)", (digest(key[0]),\
+                                  strategy, json.dumps(toTable(normal))))
+            self.database.commit()
+
+
+    def remember(self, key, normal):
+        """
+        Keep a normal form in the memory tier, evicting the least recently
+        used ones to make room for it.
+
+        :param key: the canonical term and the strategy
+        :type key: tuple
+        :param normal: the de Bruijn normal form
+        :type normal: DBVar, DBFree, DBApp or DBAbs
+        :Examples:
+
+        >>> cache = NormalFormCache(maxSize=6)
+        >>> cache.put(LambdaVar("a"), "nbe", DBAbs(DBVar(0)))
+        >>> cache.put(LambdaVar("b"), "nbe", DBAbs(DBVar(0)))
+        >>> cache.put(LambdaVar("c"), "nbe", DBAbs(DBVar(0)))
+        >>> cache.get(LambdaVar("a"), "nbe") is None, cache.size
+        (True, 6)
+        """
+        # the canonical term of the key is held as well as the normal form
+        size = key[0].size + normal.size
+        if size > self.maxSize:
+            return
+        old = self.memory.pop(key, None)
+        if old is not None:
+            self.size -= key[0].size + old.size
+        while self.memory and self.size + size > self.maxSize:
+            (term, _), evicted = self.memory.popitem(last=False)
+            self.size -= term.size + evicted.size
+        self.memory[key] = normal
+        self.size += size
+
+
+    def close(self):
+        """
+        Close the disk tier, if any.
+        """
+        if self.database is not None:
+            self.database.close()
+            self.database = None
+
+
+
+def digest(term):
+    """
+    Get a digest of a de Bruijn term which is the same in every process.
+
+    :param term: the term
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :return: the hexadecimal digest
+    :rtype: str
+    :Examples:
+
+    >>> digest(DBAbs(DBVar(0)))[:16]
+    '58760e132d03be39'
+    """
+    table = json.dumps(toTable(term), ensure_ascii=False)
+    return hashlib.sha256(table.encode()).hexdigest()
+
+
+
         
 class LambdaExp():
     """
@@ -39,20 +238,35 @@ class LambdaExp():
 
     - __init__(self, expression : LambdaVar, LambdaApp or LambdaAbs)
     - __repr__(self)
+    - __eq__(self, other : Expression)
+    - __hash__(self)
     - applyTo(self, other : Expression)
     - absractVar(self, var : str)
     - getContent(self)
     - getFreeVar(self)
+    - toDeBruijn(self)
+    - compile(self)
+    - toBytecode(self, strategy : str)
     - rename(self)
     - betaReduction(self)
+    - betaEvalWithTraces(self, evalMode : str, budget : Budget)
+    - iterBetaEval(self, evalMode : str, budget : Budget)
+    - writeTrace(self, stream : file, evalMode : str, period : int,
+                 budget : Budget)
     - etaReduction(self)
     - isBetaNormal(self)
+    - normalize(self, evalMode : str, budget : Budget,
+                cache : NormalFormCache, eta : bool)
+    - countBetaSteps(self, evalMode : str)
     - isAlphaEq(self, other : Expression)
+    - alphaHash(self)
     - isBetaEq(self, other : Expression)
     - isEtaEq(self, other : Expression)
 
     """
 
+    __slots__ = ('expression',)
+
     def __init__(self, expression):
         """
         Constructor for LambdaExpr class.
@@ -109,7 +323,8 @@ class LambdaExp():
     def __eq__(self, other):
         """
         This is used for strict equivalence, that is for two lambda expressions
-        that are written exactly the same.
+        that are written exactly the same. Since the nodes are hash-consed,
+        this is an identity check on the contained expressions.
 
         :return:
 
@@ -129,7 +344,15 @@ class LambdaExp():
         >>> x == z
         False
         """
-        return self.__repr__() == other.__repr__()
+        return type(other) == LambdaExp and self.expression is other.expression
+
+
+
+    def __hash__(self):
+        """
+        Get the structural hash of the contained expression.
+        """
+        return hash(self.expression)
 
 
 
@@ -160,6 +383,170 @@ class LambdaExp():
         """
         return self.expression.freeVar()
 
+    def toDeBruijn(self):
+        """
+        Get the nameless (de Bruijn indexed) term of the expression.
+
+        :return: the de Bruijn term
+        :rtype: DBVar, DBFree, DBApp or DBAbs
+        :Examples:
+
+        >>> expr = LambdaExp(LambdaAbs("x", LambdaApp(LambdaVar("x"), LambdaVar("y"))))
+        >>> print(expr.toDeBruijn())
+        (λ.(0 y))
+        >>> LambdaExp(fromDeBruijn(expr.toDeBruijn())) == expr
+        True
+        """
+        if self.expression not in DEBRUIJN:
+            DEBRUIJN[self.expression] = toDeBruijn(self.expression)
+        return DEBRUIJN[self.expression]
+
+
+
+    def compile(self):
+        """
+        Compile the expression into Python closures.
+
+        .. note::
+
+           The code is remembered with the de Bruijn term of the expression,
+           for as long as the expression is alive: an expression equal to
+           this one, built meanwhile, does not need to be compiled again.
+
+        :return: the code of the expression, a function from environments to
+           values (see lib.lhoas)
+        :rtype: function
+        :Examples:
+
+        >>> from lib.lread import read
+        >>> identity = read("(/x.x)")
+        >>> identity.compile() is read("(/x.x)").compile()
+        True
+        """
+        return compileTerm(self.toDeBruijn())
+
+
+
+    def toBytecode(self, strategy="normal"):
+        """
+        Compile the expression into bytecode for the virtual machine.
+
+        :param strategy: order of evaluation, either normal (default) or
+           applicative
+        :type strategy: str
+        :return: the bytecode, which can be run or serialized
+        :rtype: Bytecode
+        :Examples:
+
+        >>> from lib.lread import read
+        >>> bytecode = read("((/x.(xx))((/z.(tz))r))").toBytecode("applicative")
+        >>> print(LambdaExp(fromDeBruijn(bytecode.normalForm())))
+        ((tr)(tr))
+        """
+        return compileBytecode(self.toDeBruijn(), strategy)
+
+
+
+    def isAlphaEq(self, other):
+        """
+        Test whether two lambda expressions are alpha equivalent, that is
+        equal up to the names of their bound variables.
+
+        .. note::
+
+           This compares the canonical terms of the expressions, which are
+           built in linear time (see ldebruijn.toCanonical).
+
+        :param other: the expression to compare with
+        :type other: LambdaExp
+        :return:
+
+           - True if the expressions are alpha equivalent
+           - False otherwise
+
+        :rtype: bool
+        :Examples:
+
+        >>> k_xy = LambdaExp(LambdaAbs("x", LambdaAbs("y", LambdaVar("x"))))
+        >>> k_yx = LambdaExp(LambdaAbs("y", LambdaAbs("x", LambdaVar("y"))))
+        >>> false = LambdaExp(LambdaAbs("x", LambdaAbs("y", LambdaVar("y"))))
+        >>> k_xy.isAlphaEq(k_yx)
+        True
+        >>> k_xy.isAlphaEq(false)
+        False
+        >>> LambdaExp(LambdaVar("x")).isAlphaEq(LambdaExp(LambdaVar("y")))
+        False
+        """
+        return toCanonical(self.expression) is toCanonical(other.expression)
+
+
+
+    def alphaHash(self):
+        """
+        Get a hash of the expression which is the same for all the alpha
+        equivalent expressions, for instance to index expressions by meaning
+        rather than by spelling.
+
+        :return: the alpha invariant hash
+        :rtype: int
+        :Examples:
+
+        >>> identity_x = LambdaExp(LambdaAbs("x", LambdaVar("x")))
+        >>> identity_y = LambdaExp(LambdaAbs("y", LambdaVar("y")))
+        >>> identity_x.alphaHash() == identity_y.alphaHash()
+        True
+        """
+        return hash(toCanonical(self.expression))
+
+
+
+    def etaReduction(self):
+        """
+        Contract all the eta redexes of the expression, that is compute its
+        eta normal form.
+
+        :return: the eta normal form
+        :rtype: LambdaExp
+        :Examples:
+
+        >>> from lib.lread import read
+        >>> print(read("(/x.(/y.((fx)y)))").etaReduction())
+        f
+        >>> print(read("(/x.(xx))").etaReduction())
+        (λx.(xx))
+        """
+        term = self.toDeBruijn()
+        if term.etaNormal:
+            return self
+        return LambdaExp(fromDeBruijn(etaNormalForm(term)))
+
+
+
+    def isEtaEq(self, other):
+        """
+        Test whether two lambda expressions are eta equivalent, that is
+        whether their eta normal forms are alpha equivalent.
+
+        :param other: the expression to compare with
+        :type other: LambdaExp
+        :return:
+
+           - True if the expressions are eta equivalent
+           - False otherwise
+
+        :rtype: bool
+        :Examples:
+
+        >>> from lib.lread import read
+        >>> read("(/x.(fx))").isEtaEq(read("(/y.((/z.(fz))y))"))
+        True
+        >>> read("(/x.(xx))").isEtaEq(read("(/x.x)"))
+        False
+        """
+        return self.etaReduction().isAlphaEq(other.etaReduction())
+
+
+
     def isBetaNormal(self):
         """
         Test whether a Lambda expression is in its beta normal form.
@@ -209,7 +596,7 @@ class LambdaExp():
 
         >>> arg = LambdaExp(LambdaVar("y"))
         >>> fun = LambdaExp(LambdaVar("x"))
-        >>> expr = LambdaExp(LambdaApp(arg, fun))
+        >>> expr = LambdaExp(LambdaApp(arg.expression, fun.expression))
         >>> abs = expr.abstractVar("x")
         >>> type(abs.expression) == LambdaAbs
         True
@@ -222,12 +609,20 @@ class LambdaExp():
 
 
 
-    def betaEvalWithTraces(self, evalMode="normal"):
+    def betaEvalWithTraces(self, evalMode="normal", budget=None):
         """
         Perform a complete beta evaluation.
         
-        :param evalMode: order of evaluation, either normal (default) or applicative
+        .. note::
+
+           The steps are the ones of iterBetaEval, which yields them one at
+           a time instead of keeping them all.
+
+        :param evalMode: order of evaluation, either normal (default),
+           applicative, krivine or cek
         :type evalMode: str
+        :param budget: the bounds on the evaluation, if any
+        :type budget: Budget or NoneType
         :return: the list of all the steps
         :rtype: list
         :Examples:
@@ -246,23 +641,298 @@ class LambdaExp():
         ... result_2 = expr.betaEvalWithTraces("applicative")
         >>> print(result_2)
         [((λx.(xx))((λz.(tz))r)), ((λx.(xx))(tr)), ((tr)(tr))]
+        >>> # Third test - Krivine machine
+        ... print(expr.betaEvalWithTraces("krivine"))
+        [((λx.(xx))((λz.(tz))r)), ((tr)(tr))]
+        >>> # Fourth test - CEK machine
+        ... print(expr.betaEvalWithTraces("cek"))
+        [((λx.(xx))((λz.(tz))r)), ((tr)(tr))]
         """
         # DONE: docstring
         # DONE: doctests
         # DONE: function avoiding name clash in betaReduction - TODO: to test
         # DONE: implementation
-        trace = [self]
-        expr = self.expression
-        if evalMode == "normal":
-            while not expr.isBetaNormal():
-                expr = expr.oneStepNOBetaEval()
-                trace.append(LambdaExp(expr))
-            return trace
-        elif evalMode == "applicative":
-            while not expr.isBetaNormal():
-                expr = expr.oneStepAOBetaEval()
-                trace.append(LambdaExp(expr))
-            return trace
+        return list(self.iterBetaEval(evalMode, budget))
+
+
+
+    def iterBetaEval(self, evalMode="normal", budget=None):
+        """
+        Perform a complete beta evaluation, yielding the steps as soon as
+        they are reached.
+
+        .. note::
+
+           Only the current step is kept: the memory does not grow with the
+           length of the trace, and the first steps of a long (or endless)
+           evaluation show at once.
+
+           The normal and applicative modes find the steps with a zipper
+           (see lib.lzipper), which resumes the search of each redex from
+           the last one.
+
+           The krivine mode computes the normal form of the normal order
+           with the Krivine machine, and the cek mode computes it by call by
+           value with the CEK machine: the intermediate steps are never
+           built, so the trace only holds the expression and its normal form.
+
+           The budget is charged a step for each beta step in normal and
+           applicative modes, where the size and the cycles are checked on
+           each term of the trace, and for each transition of the machine
+           and each node read back in krivine and cek modes.
+
+        :param evalMode: order of evaluation, either normal (default),
+           applicative, krivine or cek
+        :type evalMode: str
+        :param budget: the bounds on the evaluation, if any
+        :type budget: Budget or NoneType
+        :return: the steps, the expression first
+        :rtype: generator
+        :Examples:
+
+        >>> from lib.lread import read
+        >>> omega = read("((/x.(xx))(/x.(xx)))")
+        >>> steps = omega.iterBetaEval()
+        >>> print(next(steps), next(steps))
+        ((λx.(xx))(λx.(xx))) ((λx.(xx))(λx.(xx)))
+        >>> list(omega.iterBetaEval("lazy")) # doctest: +IGNORE_EXCEPTION_DETAIL
+        Traceback (most recent call last):
+        ...
+        lexpr.LambdaExpError: Unknown evaluation mode: lazy
+        """
+        if evalMode not in ("normal", "applicative", "krivine", "cek"):
+            raise LambdaExpError("Unknown evaluation mode: " + str(evalMode))
+        yield self
+        # the reduction runs on the de Bruijn core, so that substitution never
+        # has to rename anything
+        term = self.toDeBruijn()
+        if budget is not None:
+            budget.start()
+            budget.check(term)
+        if term.isBetaNormal():
+            return
+        if evalMode == "krivine":
+            yield LambdaExp(fromDeBruijn(krivineNormalForm(term, budget)))
+        elif evalMode == "cek":
+            yield LambdaExp(fromDeBruijn(cekNormalForm(term, budget)))
+        else:
+            zipper = Zipper(term, evalMode)
+            while zipper.step():
+                term = zipper.term()
+                if budget is not None:
+                    budget.tick()
+                    budget.check(term)
+                yield LambdaExp(fromDeBruijn(term))
+
+
+
+    def writeTrace(self, stream, evalMode="normal", period=CHECKPOINT_PERIOD,\
+                   budget=None):
+        """
+        Perform a complete beta evaluation and write its compact trace, see
+        lib.ltrace.
+
+        :param stream: the text stream to write the trace to
+        :type stream: file
+        :param evalMode: order of evaluation, either normal (default) or
+           applicative
+        :type evalMode: str
+        :param period: the number of steps between two full terms, at least 1
+        :type period: int
+        :param budget: the bounds on the evaluation, if any
+        :type budget: Budget or NoneType
+        :return: the number of steps
+        :rtype: int
+        :Examples:
+
+        >>> import io
+        >>> from lib.lread import read
+        >>> expr = read("((/x.(xx))((/z.(tz))r))")
+        >>> stream = io.StringIO()
+        >>> expr.writeTrace(stream, "applicative")
+        2
+        >>> trace = TraceReader(stream)
+        >>> for term in trace:
+        ...     print(fromDeBruijn(term))
+        ((λx.(xx))((λz.(tz))r))
+        ((λx.(xx))(tr))
+        ((tr)(tr))
+        """
+        return writeTrace(self.toDeBruijn(), stream, evalMode, period, budget)
+
+
+
+    def normalize(self, evalMode="nbe", budget=None, cache=None, eta=False):
+        """
+        Compute the beta normal form, or the beta-eta normal form with eta,
+        without building the trace.
+
+        .. note::
+
+           The budget is charged a step for each beta step in normal,
+           applicative and arena modes, for each redex contracted by the
+           complete developments in parallel mode, the pool included, for
+           each move of the walk of the sharing graph in optimal mode, and
+           for each transition of the machine and each node read back in
+           the other modes. The cycles are only checked by
+           the normal, applicative and parallel modes, which build the
+           intermediate terms; the arena mode checks the nodes it holds, and
+           the other modes the size of their stacks and of the normal form
+           they read back.
+
+           The parallel mode develops the large subterms in a pool of
+           processes, see lib.lparallel. The arena mode reduces in normal
+           order in the arrays of a LambdaArena, see lib.larena.
+           The optimal mode reduces the sharing graph of the term, see
+           lib.lnet, and countBetaSteps gives its beta interactions.
+
+           With a cache, the normal form of an alpha equivalent expression
+           already normalized with the same strategy is given back at once,
+           with the names of the bound variables of the normal form first
+           computed.
+
+           With eta, the normal and applicative modes contract the eta
+           redexes as they meet them, which keeps the terms small (see
+           lib.lzipper); the other engines contract them in the beta normal
+           form. The beta-eta normal forms are cached apart from the beta
+           normal forms.
+
+        :param evalMode: the engine to use, either nbe (default), hoas,
+           bytecode, krivine, cek, need, optimal, explicit, parallel,
+           arena, normal or applicative
+        :type evalMode: str
+        :param budget: the bounds on the evaluation, if any
+        :type budget: Budget or NoneType
+        :param cache: the cache of the normal forms, if any
+        :type cache: NormalFormCache or NoneType
+        :param eta: whether to compute the beta-eta normal form
+        :type eta: bool
+        :return: the beta normal form, or the beta-eta normal form
+        :rtype: LambdaExp
+        :Examples:
+
+        >>> from lib.lread import read
+        >>> expr = read("((/x.(xx))((/z.(tz))r))")
+        >>> print(expr.normalize())
+        ((tr)(tr))
+        >>> cache = NormalFormCache()
+        >>> print(expr.normalize("need", cache=cache))
+        ((tr)(tr))
+        >>> print(read("((/y.(yy))((/z.(tz))r))").normalize("need", cache=cache))
+        ((tr)(tr))
+        >>> cache.hits, cache.misses
+        (1, 1)
+        >>> expr.normalize() == expr.normalize("applicative")
+        True
+        >>> print(read("(/x.((/y.(fy))x))").normalize("normal", eta=True))
+        f
+        >>> expr.normalize("lazy") # doctest: +IGNORE_EXCEPTION_DETAIL
+        Traceback (most recent call last):
+        ...
+        lexpr.LambdaExpError: Unknown evaluation mode: lazy
+        """
+        if self.isBetaNormal():
+            return self.etaReduction() if eta else self
+        strategy = evalMode + "+eta" if eta else evalMode
+        if cache is not None:
+            term = cache.get(self.expression, strategy)
+            if term is not None:
+                return LambdaExp(fromDeBruijn(term))
+        term = self.toDeBruijn()
+        if budget is not None:
+            budget.start()
+            budget.check(term)
+        if evalMode == "nbe":
+            term = nbeNormalForm(term, budget)
+        elif evalMode == "hoas":
+            term = hoasNormalForm(term, budget)
+        elif evalMode == "bytecode":
+            term = compileBytecode(term).normalForm(budget)
+        elif evalMode == "krivine":
+            term = krivineNormalForm(term, budget)
+        elif evalMode == "cek":
+            term = cekNormalForm(term, budget)
+        elif evalMode == "need":
+            term = needNormalForm(term, budget)[0]
+        elif evalMode == "explicit":
+            term = explicitNormalForm(term, budget)[0]
+        elif evalMode == "optimal":
+            term = optimalNormalForm(term, budget)[0]
+        elif evalMode == "parallel":
+            term = parallelNormalForm(term, budget=budget)[0]
+        elif evalMode == "arena":
+            arena = lib.larena.LambdaArena()
+            node = arena.normalize(arena.addDeBruijn(term), budget=budget)[0]
+            term = arena.getDeBruijn(node)
+        elif evalMode in ("normal", "applicative"):
+            term = zipperNormalForm(term, evalMode, budget, eta)[0]
+        else:
+            raise LambdaExpError("Unknown evaluation mode: " + str(evalMode))
+        if eta:
+            term = etaNormalForm(term)
+        if budget is not None:
+            # the normal form may be too big to be named, even if it has
+            # been built in time, its subterms being shared
+            budget.checkSize(term.size)
+            budget.checkTime()
+            expression = fromDeBruijn(term, budget=budget)
+        else:
+            expression = fromDeBruijn(term)
+        if cache is not None:
+            cache.put(self.expression, strategy, term)
+        return LambdaExp(expression)
+
+
+    def countBetaSteps(self, evalMode="normal", budget=None):
+        """
+        Count the beta steps needed to reach the beta normal form.
+
+        .. note::
+
+           In optimal mode, the steps are the beta interactions of the
+           sharing graph; lib.lnet.optimalNormalForm also gives the number
+           of the other interactions.
+
+        :param evalMode: order of evaluation, either normal (default),
+           applicative, need, optimal or explicit
+        :type evalMode: str
+        :param budget: the bounds on the evaluation, if any
+        :type budget: Budget or NoneType
+        :return: the number of beta steps
+        :rtype: int
+        :Examples:
+
+        >>> from lib.lread import read
+        >>> expr = read("((/x.(xx))((/z.(tz))r))")
+        >>> expr.countBetaSteps()
+        3
+        >>> # the argument is reduced once and shared
+        ... expr.countBetaSteps("need")
+        2
+        >>> expr.countBetaSteps("optimal")
+        2
+        >>> # the redexes duplicated by the normal order are shared
+        ... expr = read("((/x.(x(x(xx))))(/y.(/z.(y(yz)))))")
+        >>> expr.countBetaSteps(), expr.countBetaSteps("optimal")
+        (715, 16)
+        """
+        term = self.toDeBruijn()
+        steps = 0
+        if budget is not None:
+            budget.start()
+            budget.check(term)
+        if evalMode == "need":
+            if not term.isBetaNormal():
+                steps = needNormalForm(term, budget)[1]
+        elif evalMode == "optimal":
+            steps = optimalNormalForm(term, budget)[1]["beta"]
+        elif evalMode == "explicit":
+            steps = explicitNormalForm(term, budget)[1]
+        elif evalMode in ("normal", "applicative"):
+            steps = zipperNormalForm(term, evalMode, budget)[1]
+        else:
+            raise LambdaExpError("Unknown evaluation mode: " + str(evalMode))
+        return steps
 
 
 
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+:module name: lhoas
+:module author: Nicolas Osborne <nicolas.osborne@etudiant.univ-lille1.fr>
+:date: 2018
+
+:synopsis: Compilation of lambda terms to Python closures.
+
+A de Bruijn term is compiled once into a tree of Python closures, one per
+subterm, and an abstraction evaluates to a Python function (higher order
+abstract syntax). Running the compiled term does not look at the term any
+more: the dispatch on the kind of each node is done once, at compile time.
+
+The compiled closures do not call each other: each one does its part of the
+work and hands the next closure to run back to a driver loop, together with
+its environment, or gives it a value. The arguments waiting for a function
+are kept on an explicit stack, so that long reductions do not exhaust the
+Python stack.
+
+The arguments are passed as thunks, evaluated the first time they are
+needed. The closed arguments do not depend on the environment: their thunk
+does not keep it alive. The thunks are built as the code runs, so that no
+value outlives the evaluation it belongs to.
+
+The compiled terms are remembered for the (hash-consed) terms they come
+from, as long as these are alive: compiling the same term again costs
+nothing.
+
+:Tests:
+
+>>> from lib.lread import read
+>>> term = read("((/x.(xx))((/z.(tz))r))").toDeBruijn()
+>>> print(fromDeBruijn(hoasNormalForm(term)))
+((tr)(tr))
+>>> compileTerm(term) is compileTerm(term)
+True
+"""
+
+import weakref
+from lib.ldebruijn import *
+from lib.lreadback import *
+
+# compiled code of the de Bruijn terms
+COMPILED = weakref.WeakKeyDictionary()
+
+
+
+class Suspension():
+    """
+    Thunk of a compiled term.
+
+    :param code: the compiled term
+    :type code: function
+    :param environment: the environment to run code in
+    :type environment: tuple or NoneType
+    :param value: the value, if it is already known
+    :type value: function, tuple or NoneType
+
+    :attributes:
+
+    - code, None once evaluated
+    - environment
+    - value, None as long as the thunk has not been evaluated
+    """
+    __slots__ = ('code', 'environment', 'value')
+
+    def __init__(self, code, environment, value=None):
+        self.code = code
+        self.environment = environment
+        self.value = value
+
+
+    def force(self, budget=None):
+        """
+        Get the value of the thunk, evaluating it if need be.
+
+        :param budget: the budget charged a step for each transition, if any
+        :type budget: Budget or NoneType
+        :return: the value
+        :rtype: function or tuple
+        """
+        if self.value is None:
+            self.value = run(self.code, self.environment, budget)
+            self.code = self.environment = None
+        return self.value
+
+
+
+def run(code, environment, budget=None):
+    """
+    Run a compiled term up to its value.
+
+    .. note::
+
+       A compiled term, given its environment and the stack of the machine,
+       returns either the next code to run and its environment, or None and
+       its value. The stack holds the arguments (Suspension) and the thunks
+       to update (Update).
+
+    :param code: the compiled term
+    :type code: function
+    :param environment: the environment to run code in
+    :type environment: tuple or NoneType
+    :param budget: the budget charged a step for each transition, if any
+    :type budget: Budget or NoneType
+    :return: either a function or a neutral value
+    :rtype: function or tuple
+    """
+    # the arguments waiting for a function, and the thunks waiting for their
+    # value, in an Update
+    stack = []
+    while True:
+        if budget is not None:
+            budget.tick()
+            budget.checkSize(len(stack))
+        code, result = code(environment, stack)
+        if code is not None:
+            environment = result
+            continue
+        value = result
+        while stack:
+            frame = stack.pop()
+            if type(frame) == Suspension:
+                if callable(value):
+                    code, environment = value(frame)
+                    break
+                value = (value[0], value[1] + (frame,))
+            else:
+                suspension = frame.suspension
+                suspension.value = value
+                suspension.code = suspension.environment = None
+        else:
+            return value
+
+
+
+class Update():
+    """
+    Frame of the stack of run, waiting for the value of a thunk.
+
+    :param suspension: the thunk
+    :type suspension: Suspension
+    """
+    __slots__ = ('suspension',)
+
+    def __init__(self, suspension):
+        self.suspension = suspension
+
+
+
+def compileVar(index):
+    """
+    Compile a variable.
+
+    :param index: the index of the variable
+    :type index: int
+    :return: the code of the variable
+    :rtype: function
+    """
+    if index == 0:
+        def code(environment, stack):
+            suspension = environment[0]
+            if suspension.value is None:
+                stack.append(Update(suspension))
+                return (suspension.code, suspension.environment)
+            return (None, suspension.value)
+    else:
+        def code(environment, stack):
+            for _ in range(index):
+                environment = environment[1]
+            suspension = environment[0]
+            if suspension.value is None:
+                stack.append(Update(suspension))
+                return (suspension.code, suspension.environment)
+            return (None, suspension.value)
+    return code
+
+
+
+def compileFree(term):
+    """
+    Compile a free variable.
+
+    :param term: the free variable
+    :type term: DBFree
+    :return: the code of the variable
+    :rtype: function
+    """
+    # the code only keeps the name: holding term would keep its entry in
+    # COMPILED alive forever
+    name = term.name
+    def code(environment, stack):
+        return (None, (DBFree(name), ()))
+    return code
+
+
+
+def compileAbs(body, hint):
+    """
+    Compile an abstraction.
+
+    :param body: the code of the body
+    :type body: function
+    :param hint: the name the binder had
+    :type hint: str or NoneType
+    :return: the code of the abstraction
+    :rtype: function
+    """
+    def code(environment, stack):
+        if stack and type(stack[-1]) == Suspension:
+            # the argument is there: no need to build the function
+            return (body, (stack.pop(), environment))
+        def function(argument):
+            return (body, (argument, environment))
+        function.hint = hint
+        return (None, function)
+    return code
+
+
+
+def compileApp(function, argument, closed):
+    """
+    Compile an application.
+
+    :param function: the code of the function
+    :type function: function
+    :param argument: the code of the argument
+    :type argument: function
+    :param closed: whether the argument has no dangling index
+    :type closed: bool
+    :return: the code of the application
+    :rtype: function
+    """
+    if closed:
+        def code(environment, stack):
+            stack.append(Suspension(argument, None))
+            return (function, environment)
+    else:
+        def code(environment, stack):
+            stack.append(Suspension(argument, environment))
+            return (function, environment)
+    return code
+
+
+
+def compileTerm(term):
+    """
+    Compile a term into Python closures.
+
+    :param term: the term to compile
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :return: the code of term, to run with run
+    :rtype: function
+    :Examples:
+
+    >>> code = compileTerm(DBApp(DBAbs(DBVar(0), "x"), DBFree("y")))
+    >>> head, arguments = run(code, None)
+    >>> print(head, arguments)
+    y ()
+    """
+    # the terms are compiled after their children, from an explicit stack
+    stack = [term]
+    while stack:
+        current = stack[-1]
+        if current in COMPILED:
+            stack.pop()
+            continue
+        kind = type(current)
+        if kind == DBVar:
+            COMPILED[current] = compileVar(current.index)
+        elif kind == DBFree:
+            COMPILED[current] = compileFree(current)
+        elif kind == DBAbs:
+            if current.body not in COMPILED:
+                stack.append(current.body)
+                continue
+            COMPILED[current] = compileAbs(COMPILED[current.body],\
+                                           current.hint)
+        else:
+            if current.function not in COMPILED:
+                stack.append(current.function)
+                continue
+            if current.argument not in COMPILED:
+                stack.append(current.argument)
+                continue
+            COMPILED[current] = compileApp(COMPILED[current.function],\
+                                           COMPILED[current.argument],\
+                                           current.argument.indexMask == 0)
+        stack.pop()
+    return COMPILED[term]
+
+
+
+def hoasNormalForm(term, budget=None):
+    """
+    Compute the beta normal form of a term by running its compiled code.
+
+    .. note::
+
+       The read-back is the one of lib.lreadback: the arguments are only
+       forced when their turn comes.
+
+    :param term: the term to normalize
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :param budget: the budget charged a step for each transition, if any
+    :type budget: Budget or NoneType
+    :return: the beta normal form of term
+    :rtype: DBVar, DBFree, DBApp or DBAbs
+    :UC: term is closed by its free names (it has no dangling index)
+    :Examples:
+
+    >>> two = DBAbs(DBAbs(DBApp(DBVar(1), DBApp(DBVar(1), DBVar(0))), "x"), "f")
+    >>> print(hoasNormalForm(DBApp(DBApp(two, two), DBFree("g"))))
+    (λ.(g (g (g (g 0)))))
+    """
+    def expand(item, depth):
+        value = item.force(budget) if type(item) == Suspension else item
+        if callable(value):
+            level = Suspension(None, None, (depth, ()))
+            return ("abs", value.hint, run(*value(level), budget))
+        return ("neutral", value[0], value[1])
+    return readBack(run(compileTerm(term), None, budget), expand, budget)
+
+
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
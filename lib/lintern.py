@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+:module name: lintern
+:module author: Nicolas Osborne <nicolas.osborne@etudiant.univ-lille1.fr>
+:date: 2018
+
+:synopsis: Hash-consing table shared by the nodes of lambda expressions.
+
+Every node (LambdaVar, LambdaApp, LambdaAbs and the de Bruijn nodes) is built
+through this table: two structurally identical nodes are the very same
+object. The key of a node is its class followed by its fields, children
+included; since the children are themselves interned, looking a key up only
+costs their precomputed hashes and identity checks.
+
+The table only holds weak references to the nodes, so a node that is no
+longer used anywhere is evicted.
+
+:Tests:
+
+>>> import gc
+>>> class Node():
+...     pass
+>>> key = ("test", 1)
+>>> node = Node()
+>>> NODES[key] = node
+>>> NODES.get(key) is node
+True
+>>> del node
+>>> _ = gc.collect()
+>>> NODES.get(key) is None
+True
+"""
+
+import weakref
+
+NODES = weakref.WeakValueDictionary()
+
+
+
+def internedCount():
+    """
+    Get the number of nodes currently alive in the table.
+
+    :return: the number of interned nodes
+    :rtype: int
+    """
+    return len(NODES)
+
+
+
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
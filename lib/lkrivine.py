@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+:module name: lkrivine
+:module author: Nicolas Osborne <nicolas.osborne@etudiant.univ-lille1.fr>
+:date: 2018
+
+:synopsis: Krivine abstract machine for call-by-name evaluation.
+
+The machine never rewrites a term: it walks the de Bruijn term with a
+closure (a subterm together with the environment giving the value of its
+indices) and a stack of the arguments still to be consumed. An abstraction
+pops an argument and pushes it on its environment, a variable jumps to the
+closure bound to it. The beta steps are thus performed in constant time,
+whatever the size of the argument.
+
+The machine stops on a weak head normal form. The read-back phase then
+carries on under the abstractions (binding their variable to a neutral
+level) and in the arguments of the head variables, so that the result is
+the full normal form, the one that normal order evaluation reaches.
+
+An environment is a linked list of pairs (entry, rest), None being the empty
+environment. An entry is either a closure (term, environment) or an integer,
+the level of a neutral variable introduced by the read-back.
+
+:Tests:
+
+>>> from lib.lread import read
+>>> expr = read("((/x.(xx))((/z.(tz))r))")
+>>> print(fromDeBruijn(krivineNormalForm(expr.toDeBruijn())))
+((tr)(tr))
+>>> # the argument is never evaluated since it is not needed
+... omega = "((/x.(xx))(/x.(xx)))"
+>>> expr = read("((/x.(/y.y))" + omega + ")")
+>>> print(fromDeBruijn(krivineNormalForm(expr.toDeBruijn())))
+(λy.y)
+"""
+
+from lib.ldebruijn import *
+from lib.lreadback import *
+
+
+
+def lookup(environment, index):
+    """
+    Get the entry bound to an index in an environment.
+
+    :param environment: the environment
+    :type environment: tuple or NoneType
+    :param index: the de Bruijn index
+    :type index: int
+    :return: the entry bound to the index
+    :rtype: tuple or int
+    :UC: the index is bound in environment
+    """
+    for _ in range(index):
+        environment = environment[1]
+    return environment[0]
+
+
+
+def weakHeadNormalForm(term, environment, stack, budget=None):
+    """
+    Run the machine up to a weak head normal form.
+
+    :param term: the term to evaluate
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :param environment: the environment of term
+    :type environment: tuple or NoneType
+    :param stack: the closures term is applied to, the first one last; it is
+       consumed by the machine
+    :type stack: list
+    :param budget: the budget charged a step for each transition, if any
+    :type budget: Budget or NoneType
+    :return: either the abstraction reached with its environment, or the
+       head of a neutral term (a DBFree or a level) with the stack of its
+       arguments
+    :rtype: tuple
+    :Examples:
+
+    >>> identity = DBAbs(DBVar(0), "x")
+    >>> head, arguments = weakHeadNormalForm(DBApp(identity, DBFree("y")), None, [])
+    >>> print(head, arguments)
+    y []
+    """
+    while True:
+        if budget is not None:
+            budget.tick()
+        kind = type(term)
+        if kind == DBApp:
+            stack.append((term.argument, environment))
+            if budget is not None:
+                budget.checkSize(len(stack))
+            term = term.function
+        elif kind == DBAbs:
+            if not stack:
+                return (term, environment)
+            environment = (stack.pop(), environment)
+            term = term.body
+        elif kind == DBVar:
+            entry = lookup(environment, term.index)
+            if type(entry) == int:
+                return (entry, stack)
+            term, environment = entry
+        else:
+            return (term, stack)
+
+
+
+def krivineNormalForm(term, budget=None):
+    """
+    Compute the beta normal form of a term with the Krivine machine.
+
+    .. note::
+
+       The read-back is the one of lib.lreadback. Like normal order
+       evaluation, it does not terminate if the term has no normal form.
+
+    :param term: the term to evaluate
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :param budget: the budget charged a step for each transition, if any
+    :type budget: Budget or NoneType
+    :return: the beta normal form of term
+    :rtype: DBVar, DBFree, DBApp or DBAbs
+    :UC: term is closed by its free names (it has no dangling index)
+    :Examples:
+
+    >>> two = DBAbs(DBAbs(DBApp(DBVar(1), DBApp(DBVar(1), DBVar(0))), "x"), "f")
+    >>> print(krivineNormalForm(DBApp(DBApp(two, two), DBFree("g"))))
+    (λ.(g (g (g (g 0)))))
+    """
+    def expand(closure, depth):
+        head, rest = weakHeadNormalForm(closure[0], closure[1], [], budget)
+        if type(head) == DBAbs:
+            return ("abs", head.hint, (head.body, (depth, rest)))
+        return ("neutral", head, rest[::-1])
+    return readBack((term, None), expand, budget)
+
+
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
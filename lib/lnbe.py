@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+:module name: lnbe
+:module author: Nicolas Osborne <nicolas.osborne@etudiant.univ-lille1.fr>
+:date: 2018
+
+:synopsis: Normalization by evaluation.
+
+A de Bruijn term is evaluated into a semantic domain, where an abstraction
+is a Python function and where the terms stuck on a variable are neutral
+values (head, arguments). The beta steps are thus performed by Python
+function calls. The normal form is then read back from the value, by the
+read-back of lib.lreadback: the body of a function is evaluated by applying
+it to the neutral value of a fresh variable.
+
+The semantic functions do not call the evaluator themselves: they return the
+body to evaluate next with its environment, and the evaluator loop carries
+on. Long chains of beta steps thus do not exhaust the Python stack.
+
+The arguments are passed as thunks, which are evaluated the first time they
+are needed and then keep their value: an argument which is never used is
+never evaluated, so the normal form is found whenever the normal order finds
+it. Environments are the linked lists of lib.lkrivine, holding thunks and the
+neutral values of the variables introduced by the read-back.
+
+:Tests:
+
+>>> from lib.lread import read
+>>> expr = read("((/x.(xx))((/z.(tz))r))")
+>>> print(fromDeBruijn(nbeNormalForm(expr.toDeBruijn())))
+((tr)(tr))
+>>> omega = "((/x.(xx))(/x.(xx)))"
+>>> expr = read("((/x.(/y.y))" + omega + ")")
+>>> print(fromDeBruijn(nbeNormalForm(expr.toDeBruijn())))
+(λy.y)
+"""
+
+from lib.lkrivine import *
+
+# evaluate and force are left out, evaluate would hide the one of lib.lcek
+__all__ = ["Thunk", "semanticFunction", "nbeNormalForm"]
+
+
+
+class Thunk():
+    """
+    Suspended evaluation of a term in an environment.
+
+    :param term: the suspended term
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :param environment: the environment of term
+    :type environment: tuple or NoneType
+
+    :attributes:
+
+    - term
+    - environment
+    - value, None as long as the thunk has not been evaluated
+    """
+    __slots__ = ('term', 'environment', 'value')
+
+    def __init__(self, term, environment):
+        self.term = term
+        self.environment = environment
+        self.value = None
+
+
+
+def semanticFunction(abstraction, environment):
+    """
+    Interpret an abstraction as a Python function.
+
+    :param abstraction: the abstraction
+    :type abstraction: DBAbs
+    :param environment: the environment of abstraction
+    :type environment: tuple or NoneType
+    :return: the function, mapping its argument to the body to evaluate
+       next with its environment; its hint attribute is the one of
+       abstraction
+    :rtype: function
+    """
+    body = abstraction.body
+    def function(argument):
+        return (body, (argument, environment))
+    function.hint = abstraction.hint
+    return function
+
+
+
+def evaluate(term, environment, budget=None):
+    """
+    Evaluate a term into the semantic domain.
+
+    :param term: the term to evaluate
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :param environment: the environment of term
+    :type environment: tuple or NoneType
+    :param budget: the budget charged a step for each transition, if any
+    :type budget: Budget or NoneType
+    :return: either a function or a neutral value
+    :rtype: function or tuple
+    :Examples:
+
+    >>> identity = DBAbs(DBVar(0), "x")
+    >>> head, arguments = evaluate(DBApp(identity, DBFree("y")), None)
+    >>> print(head, arguments)
+    y ()
+    >>> evaluate(identity, None).hint
+    'x'
+    """
+    # the arguments waiting for a function and the thunks waiting for
+    # their value
+    stack = []
+    while True:
+        if budget is not None:
+            budget.tick()
+        kind = type(term)
+        if kind == DBApp:
+            stack.append(("argument", Thunk(term.argument, environment)))
+            if budget is not None:
+                budget.checkSize(len(stack))
+            term = term.function
+            continue
+        elif kind == DBAbs:
+            value = semanticFunction(term, environment)
+        elif kind == DBVar:
+            value = lookup(environment, term.index)
+            if type(value) == Thunk:
+                if value.value is None:
+                    stack.append(("update", value))
+                    term, environment = value.term, value.environment
+                    continue
+                value = value.value
+        else:
+            value = (term, ())
+        while stack:
+            frame, thunk = stack.pop()
+            if frame == "argument":
+                if callable(value):
+                    term, environment = value(thunk)
+                    break
+                value = (value[0], value[1] + (thunk,))
+            else:
+                thunk.value = value
+                thunk.term = thunk.environment = None
+        else:
+            return value
+
+
+
+def force(thunk, budget=None):
+    """
+    Get the value of a thunk, evaluating it if need be.
+
+    :param thunk: the thunk
+    :type thunk: Thunk
+    :param budget: the budget charged a step for each transition, if any
+    :type budget: Budget or NoneType
+    :return: the value of the thunk
+    :rtype: function or tuple
+    """
+    if thunk.value is None:
+        thunk.value = evaluate(thunk.term, thunk.environment, budget)
+        thunk.term = thunk.environment = None
+    return thunk.value
+
+
+
+def nbeNormalForm(term, budget=None):
+    """
+    Compute the beta normal form of a term by normalization by evaluation.
+
+    :param term: the term to normalize
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :param budget: the budget charged a step for each transition, if any
+    :type budget: Budget or NoneType
+    :return: the beta normal form of term
+    :rtype: DBVar, DBFree, DBApp or DBAbs
+    :UC: term is closed by its free names (it has no dangling index)
+    :Examples:
+
+    >>> two = DBAbs(DBAbs(DBApp(DBVar(1), DBApp(DBVar(1), DBVar(0))), "x"), "f")
+    >>> print(nbeNormalForm(DBApp(DBApp(two, two), DBFree("g"))))
+    (λ.(g (g (g (g 0)))))
+    """
+    def expand(item, depth):
+        value = force(item, budget) if type(item) == Thunk else item
+        if callable(value):
+            # the body, with its variable bound to the level depth
+            body = evaluate(*value((depth, ())), budget)
+            return ("abs", value.hint, body)
+        return ("neutral", value[0], value[1])
+    return readBack(evaluate(term, None, budget), expand, budget)
+
+
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+:module name: lneed
+:module author: Nicolas Osborne <nicolas.osborne@etudiant.univ-lille1.fr>
+:date: 2018
+
+:synopsis: Call-by-need evaluation by graph reduction.
+
+Under normal order, a beta step copies the argument into every occurrence
+of the variable, so that an argument used twice is reduced twice. Here, the
+argument of a beta step is allocated once in a heap cell, and all the
+occurrences of the variable point to that same cell. The first time the
+cell is needed, its term is reduced to weak head normal form and the cell is
+updated with the result: the other occurrences find the value already
+there. Each argument is thus evaluated at most once, and only if it is
+needed.
+
+The machine counts the beta steps it performs, so that the cost of the call
+by need can be compared with the number of steps of the normal order.
+
+A value is either a closure (DBAbs, environment) or a neutral term (head,
+arguments), whose head is a DBFree or the level of a variable introduced by
+the read-back, and whose arguments are cells. Environments are the linked
+lists of lib.lkrivine, holding cells and neutral values.
+
+:Tests:
+
+>>> from lib.lread import read
+>>> expr = read("((/x.(xx))((/z.(tz))r))")
+>>> term, steps = needNormalForm(expr.toDeBruijn())
+>>> print(fromDeBruijn(term), steps)
+((tr)(tr)) 2
+>>> len(expr.betaEvalWithTraces()) - 1
+3
+"""
+
+from lib.lkrivine import *
+
+
+
+class Cell():
+    """
+    Updatable heap cell, shared by all the occurrences of a variable.
+
+    :param term: the term of the cell
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :param environment: the environment of term
+    :type environment: tuple or NoneType
+
+    :attributes:
+
+    - term
+    - environment
+    - value, None as long as the cell has not been evaluated
+    """
+    __slots__ = ('term', 'environment', 'value')
+
+    def __init__(self, term, environment):
+        self.term = term
+        self.environment = environment
+        self.value = None
+
+
+
+class NeedMachine():
+    """
+    Call-by-need machine, counting the beta steps it performs.
+
+    :param budget: the budget charged a step for each transition, if any
+    :type budget: Budget or NoneType
+
+    :attributes:
+
+    - steps, the number of beta steps performed so far
+    - budget
+
+    :methods:
+
+    - __init__(self, budget)
+    - evaluate(self, term, environment)
+    - force(self, cell)
+    - normalForm(self, term)
+    """
+    __slots__ = ('steps', 'budget')
+
+    def __init__(self, budget=None):
+        self.steps = 0
+        self.budget = budget
+
+
+    def evaluate(self, term, environment):
+        """
+        Reduce a term to its weak head normal form.
+
+        :param term: the term to evaluate
+        :type term: DBVar, DBFree, DBApp or DBAbs
+        :param environment: the environment of term
+        :type environment: tuple or NoneType
+        :return: the value of term
+        :rtype: tuple
+        :Examples:
+
+        >>> machine = NeedMachine()
+        >>> identity = DBAbs(DBVar(0), "x")
+        >>> head, arguments = machine.evaluate(DBApp(identity, DBFree("y")), None)
+        >>> print(head, arguments, machine.steps)
+        y () 1
+        """
+        # the cells given as arguments and the cells to update
+        stack = []
+        while True:
+            if self.budget is not None:
+                self.budget.tick()
+            kind = type(term)
+            if kind == DBApp:
+                stack.append(("argument", Cell(term.argument, environment)))
+                if self.budget is not None:
+                    self.budget.checkSize(len(stack))
+                term = term.function
+                continue
+            elif kind == DBAbs:
+                value = (term, environment)
+            elif kind == DBVar:
+                value = lookup(environment, term.index)
+                if type(value) == Cell:
+                    if value.value is None:
+                        stack.append(("update", value))
+                        term, environment = value.term, value.environment
+                        continue
+                    value = value.value
+            else:
+                value = (term, ())
+            while stack:
+                frame, cell = stack.pop()
+                if frame == "update":
+                    cell.value = value
+                    cell.term = cell.environment = None
+                elif type(value[0]) == DBAbs:
+                    self.steps += 1
+                    term = value[0].body
+                    environment = (cell, value[1])
+                    break
+                else:
+                    value = (value[0], value[1] + (cell,))
+            else:
+                return value
+
+
+    def force(self, cell):
+        """
+        Get the value of a cell, evaluating it if need be.
+
+        :param cell: the cell
+        :type cell: Cell
+        :return: the value of the cell
+        :rtype: tuple
+        """
+        if cell.value is None:
+            cell.value = self.evaluate(cell.term, cell.environment)
+            cell.term = cell.environment = None
+        return cell.value
+
+
+    def normalForm(self, term):
+        """
+        Compute the beta normal form of a term.
+
+        .. note::
+
+           The read-back is the one of lib.lreadback: the cells are only
+           forced when their turn comes.
+
+        :param term: the term to evaluate
+        :type term: DBVar, DBFree, DBApp or DBAbs
+        :return: the beta normal form of term
+        :rtype: DBVar, DBFree, DBApp or DBAbs
+        :UC: term is closed by its free names (it has no dangling index)
+        """
+        def expand(item, depth):
+            head, rest = self.force(item) if type(item) == Cell else item
+            if type(head) == DBAbs:
+                body = self.evaluate(head.body, ((depth, ()), rest))
+                return ("abs", head.hint, body)
+            return ("neutral", head, rest)
+        return readBack(self.evaluate(term, None), expand, self.budget)
+
+
+
+def needNormalForm(term, budget=None):
+    """
+    Compute the beta normal form of a term by call by need.
+
+    :param term: the term to evaluate
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :param budget: the budget charged a step for each transition, if any
+    :type budget: Budget or NoneType
+    :return: the beta normal form of term and the number of beta steps
+       performed
+    :rtype: tuple
+    :UC: term is closed by its free names (it has no dangling index)
+    :Examples:
+
+    >>> two = DBAbs(DBAbs(DBApp(DBVar(1), DBApp(DBVar(1), DBVar(0))), "x"), "f")
+    >>> term, steps = needNormalForm(DBApp(DBApp(two, two), DBFree("g")))
+    >>> print(term, steps)
+    (λ.(g (g (g (g 0))))) 6
+    """
+    machine = NeedMachine(budget)
+    term = machine.normalForm(term)
+    return (term, machine.steps)
+
+
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,526 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+:module name: lnet
+:module author: Nicolas Osborne <nicolas.osborne@etudiant.univ-lille1.fr>
+:date: 2018
+
+:synopsis: Optimal reduction with sharing graphs (Lamping's algorithm, with
+its oracle).
+
+A term is translated into a sharing graph: an interaction net of nodes with
+a principal port (slot 0) and one or two auxiliary ports (slots 1 and 2):
+
+- an abstraction has its principal port towards its parent, its variable on
+  slot 1 and its body on slot 2;
+- an application has its principal port towards its function, its argument
+  on slot 1 and its parent on slot 2;
+- a fan shares the term on its principal port between its two auxiliary
+  ports;
+- a croissant and a bracket, the oracle of the algorithm, have a single
+  auxiliary port;
+- an eraser has no auxiliary port.
+
+Every node but the eraser has a level, the number of arguments it is nested
+in. An argument is translated one level deeper than its application, and the
+occurrences of a variable are joined to their binder, the level of the
+binder, by a fan for each additional occurrence, a bracket for each argument
+they are nested in, and a croissant. The free names of the term are bound by
+abstractions added on top of it, and set free again when the normal form is
+read back.
+
+Two nodes connected by their principal ports interact:
+
+- an abstraction and an application are a beta redex and annihilate;
+- two fans, two croissants or two brackets of the same level annihilate;
+- otherwise, the node of the higher level goes through the fan, croissant or
+  bracket of the lower level: a fan duplicates it, a croissant lowers its
+  level, and a bracket raises it;
+- an eraser destroys the node it meets.
+
+The levels tell a fan which fans it pairs with, so that the algorithm is
+sound on any term, and a redex is never duplicated: the number of beta
+interactions can be much lower than the number of steps of any strategy
+rewriting terms.
+
+The net is reduced lazily, by its read-back: the read-back walks the net
+from the root and performs the interactions it meets, so that only the
+interactions needed by the normal form are performed. The nodes destroyed
+by the interactions are reused by the next ones, so that the net only grows
+with the nodes alive.
+
+:Tests:
+
+>>> from lib.lread import read
+>>> expr = read("((/x.(xx))((/z.(tz))r))")
+>>> term, counters = optimalNormalForm(expr.toDeBruijn())
+>>> print(fromDeBruijn(term), counters["beta"])
+((tr)(tr)) 2
+>>> # not typable in elementary affine logic
+... expr = read("((/x.(xx))(/y.(/z.(y(yz)))))")
+>>> term, counters = optimalNormalForm(expr.toDeBruijn())
+>>> print(fromDeBruijn(term), counters["beta"])
+(λz.(λz1.(z(z(z(zz1)))))) 6
+"""
+
+from lib.ldebruijn import *
+
+# kinds of the nodes
+ROOT = 0
+LAM = 1
+APP = 2
+ERA = 3
+FAN = 4
+CRO = 5
+BRA = 6
+
+# the number of auxiliary ports of each kind
+ARITY = (1, 2, 2, 0, 2, 1, 1)
+
+
+
+class InteractionNetError(Exception):
+    """
+    Exception for nets which can not be read back.
+    """
+    def __init__(self, msg):
+        self.message = msg
+
+
+
+class InteractionNet():
+    """
+    Sharing graph of a lambda term.
+
+    .. note::
+
+       The ports of node n are the integers 3n, 3n + 1 and 3n + 2, and
+       ports[p] is the port p is connected to. Node 0 is the root: its slot 1
+       is connected to the top of the term.
+
+    :param term: the term to translate
+    :type term: DBVar, DBFree, DBApp or DBAbs
+
+    :attributes:
+
+    - ports, the wiring of the net
+    - kinds, the kind of each node
+    - levels, the level of each node
+    - hints, the hint of each abstraction
+    - counters, the number of interactions performed, by rule: beta,
+      annihilation and duplication of the fans, oracle for the croissants
+      and brackets, and erasure
+    - free, the free names of the term
+    - dead, the nodes destroyed by the interactions, reused by newNode
+
+    :methods:
+
+    - __init__(self, term)
+    - newNode(self, kind, level, hint)
+    - size(self)
+    - link(self, port, other)
+    - build(self, term)
+    - rewrite(self, node, other)
+    - readBack(self, budget)
+    - prefix(self, node, context)
+    - cross(self, node, slot, context)
+    """
+    __slots__ = ('ports', 'kinds', 'levels', 'hints', 'counters', 'free',\
+                 'dead')
+
+    def __init__(self, term):
+        self.ports = []
+        self.kinds = []
+        self.levels = []
+        self.hints = []
+        self.dead = []
+        self.counters = {"beta": 0, "annihilation": 0, "duplication": 0,\
+                         "oracle": 0, "erasure": 0}
+        root = self.newNode(ROOT)
+        self.link(3 * root, 3 * root)
+        self.link(3 * root + 2, 3 * root + 2)
+        self.build(term)
+
+
+    def newNode(self, kind, level=0, hint=None):
+        """
+        Add a node to the net, with all its ports connected to nothing.
+
+        :param kind: the kind of the node
+        :type kind: int
+        :param level: the level of the node
+        :type level: int
+        :param hint: the hint of an abstraction
+        :type hint: str or NoneType
+        :return: the node
+        :rtype: int
+        """
+        if self.dead:
+            node = self.dead.pop()
+            self.ports[3 * node:3 * node + 3] = (None, None, None)
+            self.kinds[node] = kind
+            self.levels[node] = level
+            self.hints[node] = hint
+            return node
+        self.ports.extend((None, None, None))
+        self.kinds.append(kind)
+        self.levels.append(level)
+        self.hints.append(hint)
+        return len(self.kinds) - 1
+
+
+    def size(self):
+        """
+        Get the number of nodes alive in the net.
+
+        :rtype: int
+        """
+        return len(self.kinds) - len(self.dead)
+
+
+    def link(self, port, other):
+        """
+        Connect two ports.
+
+        :param port: a port
+        :type port: int
+        :param other: the other port
+        :type other: int
+        """
+        self.ports[port] = other
+        self.ports[other] = port
+
+
+    def build(self, term):
+        """
+        Translate a term into the net, below the root.
+
+        :param term: the term to translate
+        :type term: DBVar, DBFree, DBApp or DBAbs
+        """
+        # the free names are bound by abstractions above the term
+        self.free = sorted(term.freeVar())
+        destination = 1
+        occurrences = dict()
+        names = dict()
+        for name in self.free:
+            node = self.newNode(LAM, 0, name)
+            self.link(3 * node, destination)
+            occurrences[node] = []
+            names[name] = node
+            destination = 3 * node + 2
+        # the abstractions binding each depth of the current path
+        scope = []
+        stack = [(term, destination, 0, 0)]
+        while stack:
+            current, destination, level, depth = stack.pop()
+            kind = type(current)
+            if kind == DBApp:
+                node = self.newNode(APP, level)
+                self.link(3 * node + 2, destination)
+                stack.append((current.argument, 3 * node + 1, level + 1,\
+                              depth))
+                stack.append((current.function, 3 * node, level, depth))
+            elif kind == DBAbs:
+                node = self.newNode(LAM, level, current.hint)
+                self.link(3 * node, destination)
+                occurrences[node] = []
+                del scope[depth:]
+                scope.append(node)
+                stack.append((current.body, 3 * node + 2, level, depth + 1))
+            elif kind == DBVar:
+                binder = scope[depth - 1 - current.index]
+                occurrences[binder].append((destination, level))
+            else:
+                occurrences[names[current.name]].append((destination, level))
+        # plug the variables into their occurrences
+        for node, places in occurrences.items():
+            destination = 3 * node + 1
+            level = self.levels[node]
+            if not places:
+                eraser = self.newNode(ERA)
+                self.link(destination, 3 * eraser)
+                continue
+            for index, (place, occurrence) in enumerate(places):
+                if index < len(places) - 1:
+                    fan = self.newNode(FAN, level)
+                    self.link(destination, 3 * fan)
+                    destination, port = 3 * fan + 2, 3 * fan + 1
+                else:
+                    port = destination
+                # the brackets of the arguments the occurrence is nested in,
+                # outermost first, and the croissant of the occurrence
+                muxes = [(BRA, l) for l in range(level, occurrence)]
+                for kind, muxLevel in muxes + [(CRO, occurrence)]:
+                    mux = self.newNode(kind, muxLevel)
+                    self.link(port, 3 * mux)
+                    port = 3 * mux + 1
+                self.link(port, place)
+
+
+    def rewrite(self, node, other):
+        """
+        Perform the interaction of two nodes connected by their principal
+        ports. Both nodes are destroyed, their slots are reused by the next
+        nodes.
+
+        :param node: a node
+        :type node: int
+        :param other: the other node
+        :type other: int
+        :raise InteractionNetError: if the nodes can not interact, which
+           would be a bug of the translation
+        """
+        ports, kinds, levels = self.ports, self.kinds, self.levels
+        kind, otherKind = kinds[node], kinds[other]
+        if kind == ERA or otherKind == ERA:
+            self.counters["erasure"] += 1
+            if kind == ERA:
+                node, kind = other, otherKind
+            for slot in range(1, ARITY[kind] + 1):
+                eraser = self.newNode(ERA)
+                self.link(3 * eraser, ports[3 * node + slot])
+        elif {kind, otherKind} == {LAM, APP} or \
+             (kind == otherKind and levels[node] == levels[other]):
+            if levels[node] != levels[other]:
+                raise InteractionNetError("The levels of a redex differ.")
+            if kind == LAM or kind == APP:
+                self.counters["beta"] += 1
+            elif kind == FAN:
+                self.counters["annihilation"] += 1
+            else:
+                self.counters["oracle"] += 1
+            for slot in range(1, ARITY[kind] + 1):
+                self.link(ports[3 * node + slot], ports[3 * other + slot])
+        else:
+            # the node of the lower level is the one the other goes through
+            if kind in (LAM, APP) or \
+               (otherKind not in (LAM, APP) and levels[other] < levels[node]):
+                node, other, kind, otherKind = other, node, otherKind, kind
+            level = levels[other]
+            if level <= levels[node]:
+                raise InteractionNetError("Two nodes of level %d meet."\
+                                          % level)
+            if kind == FAN:
+                self.counters["duplication"] += 1
+            else:
+                self.counters["oracle"] += 1
+                level += 1 if kind == BRA else -1
+            arity, otherArity = ARITY[kind], ARITY[otherKind]
+            copies = [self.newNode(kind, levels[node])\
+                      for _ in range(otherArity)]
+            others = [self.newNode(otherKind, level, self.hints[other])\
+                      for _ in range(arity)]
+            for slot in range(1, arity + 1):
+                self.link(3 * others[slot - 1], ports[3 * node + slot])
+            for slot in range(1, otherArity + 1):
+                self.link(3 * copies[slot - 1], ports[3 * other + slot])
+            for slot in range(1, arity + 1):
+                for otherSlot in range(1, otherArity + 1):
+                    self.link(3 * copies[otherSlot - 1] + slot,\
+                              3 * others[slot - 1] + otherSlot)
+        kinds[node] = kinds[other] = None
+        self.dead.append(node)
+        self.dead.append(other)
+
+
+    def readBack(self, budget=None):
+        """
+        Reduce the net and read back its term.
+
+        .. note::
+
+           The read-back walks from the root down to the head of each
+           subterm, and performs the interactions of the active pairs it
+           meets on the way, after which it walks again from the last node
+           read. A path through the fans, croissants and brackets carries a
+           context: a stack of fan ports for each level. A fan is entered by
+           an auxiliary port on the way to the shared term, which pushes the
+           port on the stack of the level of the fan, and left by the same
+           port, which pops it. A croissant entered by its auxiliary port
+           inserts an empty level at its level, and a bracket pairs its level
+           with the next one, the other way round removing the level or
+           splitting the pair.
+
+        :param budget: the budget charged a step for each move of the walk,
+           and checked against the number of nodes alive in the net and the
+           size of the term built, if any
+        :type budget: Budget or NoneType
+        :return: the normal form of the term of the net
+        :rtype: DBVar, DBFree, DBApp or DBAbs
+        :raise InteractionNetError: if the net can not be read back
+        """
+        ports, kinds, levels = self.ports, self.kinds, self.levels
+        results = []
+        # the abstractions above a port are a linked list of their node and
+        # their depth
+        tasks = [("read", 1, (), 0, None)]
+        while tasks:
+            task = tasks.pop()
+            if task[0] == "abs":
+                results.append(DBAbs(results.pop(), task[1]))
+                if budget is not None:
+                    budget.checkSize(results[-1].size)
+                continue
+            elif task[0] == "apply":
+                head, count = task[1], task[2]
+                if count:
+                    arguments = results[-count:]
+                    del results[-count:]
+                    for argument in arguments:
+                        head = DBApp(head, argument)
+                    if budget is not None:
+                        budget.checkSize(head.size)
+                results.append(head)
+                continue
+            _, start, context, depth, binders = task
+            port, arguments = start, []
+            while True:
+                if budget is not None:
+                    budget.tick()
+                node, slot = divmod(ports[port], 3)
+                kind = kinds[node]
+                if slot == 0 and port % 3 == 0:
+                    self.rewrite(port // 3, node)
+                    if budget is not None:
+                        budget.checkSize(self.size())
+                    port, context, arguments = start, task[2], []
+                elif kind == APP and slot == 2:
+                    arguments.append((3 * node + 1, context))
+                    port = 3 * node
+                elif kind == LAM and slot == 0 and not arguments:
+                    tasks.append(("abs", self.hints[node]))
+                    tasks.append(("read", 3 * node + 2, context, depth + 1,\
+                                  ((node, self.prefix(node, context)),\
+                                   depth, binders)))
+                    break
+                elif kind == LAM and slot == 1:
+                    scope = binders
+                    prefix = self.prefix(node, context)
+                    while scope is not None and scope[0] != (node, prefix):
+                        scope = scope[2]
+                    if scope is None:
+                        raise InteractionNetError("A variable is not bound.")
+                    tasks.append(("apply", DBVar(depth - 1 - scope[1]),\
+                                  len(arguments)))
+                    # the arguments are found outermost first
+                    for argument, argumentContext in arguments:
+                        tasks.append(("read", argument, argumentContext,\
+                                      depth, binders))
+                    break
+                elif kind in (FAN, CRO, BRA):
+                    context, slot = self.cross(node, slot, context)
+                    port = 3 * node + slot
+                else:
+                    raise InteractionNetError("The net can not be read back.")
+        term = results[0]
+        # set the free names free again
+        for name in self.free:
+            term = substituteTerm(term.body, 0, DBFree(name))
+        return term
+
+
+    def prefix(self, node, context):
+        """
+        Get the levels of a context below the level of a node: the copies of
+        a node only differ by the fans of the lower levels, so that they
+        tell which copy of an abstraction a variable is bound by.
+
+        :param node: the node
+        :type node: int
+        :param context: the context of a path through node, see cross
+        :type context: tuple
+        :return: the levels of context below the level of node, without the
+           empty levels at the end
+        :rtype: tuple
+        """
+        level = self.levels[node]
+        context = context[:level]
+        while context and context[-1] is None:
+            context = context[:-1]
+        return context
+
+
+    def cross(self, node, slot, context):
+        """
+        Go through a fan, a croissant or a bracket.
+
+        :param node: the node
+        :type node: int
+        :param slot: the slot the node is entered by
+        :type slot: int
+        :param context: the context of the path, a tuple of levels, where a
+           level is either None (empty), a pair (port, level) for a port
+           pushed by a fan, or a triple (None, level, level) for two levels
+           paired by a bracket
+        :type context: tuple
+        :return: the context of the path after node, and the slot node is
+           left by
+        :rtype: tuple
+        :raise InteractionNetError: if the context does not match node
+        """
+        kind, level = self.kinds[node], self.levels[node]
+        context = context + (None,) * (level + 2 - len(context))
+        before, current, after = context[:level], context[level],\
+                                 context[level + 1:]
+        if kind == FAN and slot:
+            context, slot = before + ((slot, current),) + after, 0
+        elif kind == FAN:
+            if current is None or len(current) != 2:
+                raise InteractionNetError("The net can not be read back.")
+            slot, current = current
+            context = before + (current,) + after
+        elif kind == CRO and slot:
+            context, slot = before + (None, current) + after, 0
+        elif kind == CRO:
+            if current is not None:
+                raise InteractionNetError("The net can not be read back.")
+            context, slot = before + after, 1
+        elif slot:
+            if current is None and after[0] is None:
+                paired = None
+            else:
+                paired = (None, current, after[0])
+            context, slot = before + (paired,) + after[1:], 0
+        else:
+            if current is None:
+                current = (None, None, None)
+            elif len(current) != 3:
+                raise InteractionNetError("The net can not be read back.")
+            context, slot = before + current[1:] + after, 1
+        while context and context[-1] is None:
+            context = context[:-1]
+        return (context, slot)
+
+
+
+def optimalNormalForm(term, budget=None):
+    """
+    Compute the beta normal form of a term by optimal reduction.
+
+    :param term: the term to reduce
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :param budget: the budget charged a step for each move of the walk, if
+       any
+    :type budget: Budget or NoneType
+    :return: the beta normal form of term and the number of interactions
+       performed, by rule
+    :rtype: tuple
+    :UC: term is closed by its free names (it has no dangling index)
+    :Examples:
+
+    >>> two = DBAbs(DBAbs(DBApp(DBVar(1), DBApp(DBVar(1), DBVar(0))), "x"), "f")
+    >>> term, counters = optimalNormalForm(DBApp(DBApp(two, two), DBFree("g")))
+    >>> print(term)
+    (λ.(g (g (g (g 0)))))
+    """
+    net = InteractionNet(term)
+    return (net.readBack(budget), net.counters)
+
+
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
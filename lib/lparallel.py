@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+:module name: lparallel
+:module author: Nicolas Osborne <nicolas.osborne@etudiant.univ-lille1.fr>
+:date: 2018
+
+:synopsis: Parallel reduction by complete developments.
+
+A complete development contracts at once all the redexes of a term (the
+parallel reduction of Tait and Martin-Löf):
+
+- a variable is its own development;
+- the development of an abstraction is the abstraction of the development of
+  its body;
+- the development of a redex ((λ.M) N) is the development of M in which the
+  development of N is substituted;
+- the development of any other application applies the development of the
+  function to the development of the argument.
+
+Iterating complete developments (the Gross-Knuth strategy) reaches the
+normal form whenever there is one.
+
+The development of a subterm does not depend on where it stands, so the
+disjoint subterms can be developed independently: the large ones are sent
+to a pool of processes, and the small ones, below a size threshold, are
+developed on the spot, since sending them would cost more than developing
+them. The terms travel between the processes as their tables of nodes (see
+ldebruijn.toTable), and are interned again when they arrive. Each job gets
+the bounds left to the budget of the evaluation, and reports the steps it
+has taken, which are charged to the budget when the job comes back.
+
+:Tests:
+
+>>> from lib.lread import read
+>>> expr = read("((/x.(xx))((/z.(tz))r))")
+>>> print(fromDeBruijn(develop(expr.toDeBruijn())))
+((tr)(tr))
+>>> term, developments = parallelNormalForm(expr.toDeBruijn())
+>>> print(fromDeBruijn(term), developments)
+((tr)(tr)) 1
+"""
+
+import multiprocessing
+import os
+from lib.ldebruijn import *
+from lib.lbudget import *
+
+# the size under which a subterm is not worth sending to another process
+THRESHOLD = 2000
+
+
+
+def develop(term, developed=None, budget=None):
+    """
+    Compute the complete development of a term.
+
+    .. note::
+
+       The term is walked from an explicit stack of tasks: deep terms do not
+       hit the recursion limit.
+
+    :param term: the term to develop
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :param developed: the developments already known for some subterms
+    :type developed: dict or NoneType
+    :param budget: the budget charged a step for each redex contracted,
+       whose clock is checked at each node and whose size bound is checked
+       on the nodes built, if any
+    :type budget: Budget or NoneType
+    :return: the complete development of term
+    :rtype: DBVar, DBFree, DBApp or DBAbs
+    :Examples:
+
+    >>> identity = DBAbs(DBVar(0), "x")
+    >>> term = DBApp(identity, DBApp(identity, DBFree("y")))
+    >>> print(develop(term))
+    y
+    >>> # the redex created by the development is left for the next one
+    ... print(develop(DBApp(DBApp(identity, identity), DBFree("y"))))
+    ((λ.0) y)
+    """
+    developed = developed or dict()
+    results = []
+    # a task is either a term to develop, an abstraction to rebuild, an
+    # application to rebuild, or a redex to contract
+    tasks = [("develop", term)]
+    while tasks:
+        task = tasks.pop()
+        if budget is not None:
+            budget.checkTime()
+        if task[0] == "develop":
+            current = task[1]
+            if current.isBetaNormal():
+                results.append(current)
+            elif current in developed:
+                results.append(developed[current])
+            elif type(current) == DBAbs:
+                tasks.append(("abs", current.hint))
+                tasks.append(("develop", current.body))
+            elif type(current.function) == DBAbs:
+                tasks.append(("redex",))
+                tasks.append(("develop", current.argument))
+                tasks.append(("develop", current.function.body))
+            else:
+                tasks.append(("app",))
+                tasks.append(("develop", current.argument))
+                tasks.append(("develop", current.function))
+        elif task[0] == "abs":
+            results.append(DBAbs(results.pop(), task[1]))
+        else:
+            argument = results.pop()
+            function = results.pop()
+            if task[0] == "app":
+                results.append(DBApp(function, argument))
+            else:
+                if budget is not None:
+                    budget.tick()
+                results.append(substituteTerm(function, 0, argument))
+        if budget is not None and task[0] != "develop":
+            budget.checkSize(results[-1].size)
+    return results[0]
+
+
+
+def developJob(job):
+    """
+    Develop a subterm in a process of the pool, within the bounds left to
+    the budget of the evaluation.
+
+    :param job: the subterm, and the steps, the seconds and the size left
+       (see Budget.left)
+    :type job: tuple
+    :return: the development, or None if the budget is exhausted, the steps
+       taken, and the class and the message of the BudgetError, if any
+    :rtype: tuple
+    :Examples:
+
+    >>> redex = DBApp(DBAbs(DBVar(0), "x"), DBAbs(DBVar(0), "y"))
+    >>> term, steps, error, message = developJob((redex, None, None, None))
+    >>> print(term, steps, error)
+    (λ.0) 1 None
+    >>> term, steps, error, message = developJob((redex, 0, None, None))
+    >>> print(term, steps, error.__name__)
+    None 1 StepBudgetError
+    """
+    term, steps, seconds, size = job
+    budget = Budget(steps, seconds, size)
+    try:
+        return (develop(term, budget=budget), budget.steps, None, None)
+    except BudgetError as error:
+        # the exceptions do not travel back: their class and message do
+        return (None, budget.steps, type(error), error.message)
+
+
+
+def splitJobs(term, threshold, chunk):
+    """
+    Find the subterms of a term to develop in other processes.
+
+    .. note::
+
+       The term is split along the walk of develop, down to subterms of at
+       most chunk nodes; the subterms smaller than threshold, or in normal
+       form, are left to the walk itself.
+
+    :param term: the term to develop
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :param threshold: the smallest size of a subterm worth sending
+    :type threshold: int
+    :param chunk: the largest size of a subterm sent as one job
+    :type chunk: int
+    :return: the distinct subterms to send
+    :rtype: list
+    :Examples:
+
+    >>> identity = DBAbs(DBVar(0), "x")
+    >>> redex = DBApp(identity, DBFree("y"))
+    >>> splitJobs(DBApp(DBFree("f"), DBApp(redex, redex)), 3, 4) == [redex]
+    True
+    """
+    jobs = dict()
+    stack = [term]
+    while stack:
+        current = stack.pop()
+        if current.isBetaNormal() or current.size < threshold:
+            continue
+        if current.size <= chunk:
+            jobs[current] = None
+        elif type(current) == DBAbs:
+            stack.append(current.body)
+        elif type(current.function) == DBAbs:
+            stack.append(current.argument)
+            stack.append(current.function.body)
+        else:
+            stack.append(current.argument)
+            stack.append(current.function)
+    return list(jobs)
+
+
+
+def parallelNormalForm(term, processes=None, threshold=THRESHOLD,\
+                       budget=None):
+    """
+    Compute the beta normal form of a term by iterating complete
+    developments, the large subterms being developed by a pool of processes.
+
+    .. note::
+
+       The pool is only started once the term is large enough to be split.
+       Each development is cut into about four jobs per process, so that
+       the processes stay busy when the jobs are uneven.
+
+    :param term: the term to reduce
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :param processes: the number of processes, by default the number of
+       cores
+    :type processes: int or NoneType
+    :param threshold: the size under which a subterm is developed in the
+       current process
+    :type threshold: int
+    :param budget: the budget charged a step for each redex contracted, by
+       the current process or by the pool, if any
+    :type budget: Budget or NoneType
+    :return: the beta normal form of term and the number of developments
+    :rtype: tuple
+    :Examples:
+
+    >>> two = DBAbs(DBAbs(DBApp(DBVar(1), DBApp(DBVar(1), DBVar(0))), "x"), "f")
+    >>> term = DBApp(DBApp(two, two), DBFree("g"))
+    >>> print(parallelNormalForm(term, 2, threshold=4)[0])
+    (λ.(g (g (g (g 0)))))
+    """
+    processes = processes or os.cpu_count() or 1
+    developments = 0
+    pool = None
+    try:
+        while not term.isBetaNormal():
+            jobs = []
+            if term.size >= threshold:
+                chunk = max(threshold, term.size // (4 * processes))
+                jobs = splitJobs(term, threshold, chunk)
+            if len(jobs) > 1:
+                if pool is None:
+                    pool = multiprocessing.Pool(processes)
+                if budget is None:
+                    developed = dict(zip(jobs, pool.map(develop, jobs)))
+                else:
+                    left = budget.left()
+                    results = pool.map(developJob,\
+                                       [(job,) + left for job in jobs])
+                    developed = dict()
+                    for job, (result, steps, error, message)\
+                        in zip(jobs, results):
+                        budget.charge(steps)
+                        if error is not None:
+                            raise error(message)
+                        developed[job] = result
+                term = develop(term, developed, budget)
+            else:
+                term = develop(term, budget=budget)
+            developments += 1
+            if budget is not None:
+                budget.check(term)
+    finally:
+        if pool is not None:
+            pool.terminate()
+    return (term, developments)
+
+
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -36,6 +36,8 @@ True
 >>> exp3 = readTree(test3)
 >>> print(exp3)
 ((λx.(xy))z)
+>>> print(read("((/x1.(x1y2))x12)"))
+((λx1.(x1y2))x12)
 """
 
 
@@ -48,7 +50,7 @@ from lib.lvar import *
 import lib.testInput
 import lib.testTree
 
-var = lib.alphabet_def.VAR_SET
+isVar = lib.alphabet_def.isVarName
 op = lib.alphabet_def.POSSIBLE_OP
 dot = set(lib.alphabet_def.LAMBDA_DOT)
 closing = ')'
@@ -88,7 +90,7 @@ def readExp(string):
     :rtype: dict
     """
     if lib.testInput.initParsing(string):
-        return buildTree(iter(string))
+        return buildTree(lib.alphabet_def.tokenize(string))
     else:
         raise InputError("Badly formed string.")
         
@@ -102,8 +104,8 @@ def buildTree(iterator):
     Transform a string representing a lambda expression into a binary tree
     modeling this same lambda expression.
 
-    :param iterator: the representation of the lambda expression in an iterator
-    :type string: str_iterator
+    :param iterator: the tokens of the representation of the lambda expression
+    :type string: iterator
     :return: the tree modeling the lambda expression
     :rtype: dict
     :UC: iterator must represent a well formed lambda expression
@@ -118,20 +120,31 @@ def buildTree(iterator):
     >>> print(ex2["left"])
     {'root': 'f', 'left': None, 'right': None}
     """
+    # stack of the applications whose children are not all built yet
+    pending = []
+    tree = None
     try:
         while True:
             char = next(iterator)
-            if char in var:
-                return {'root': char, 'left': None, 'right': None}
+            if isVar(char):
+                tree = {'root': char, 'left': None, 'right': None}
             elif char in op:
-                return {'root': char + next(iterator),\
+                tree = {'root': char + next(iterator),\
                         'left': None ,'right': None}
             elif char == opening:
-                left = buildTree(iterator)
-                right = buildTree(iterator)
-                return {'root': None, 'left': left, 'right': right}
+                pending.append({'root': None, 'left': None, 'right': None})
+                continue
             else: # char is either dot or closing: do nothing
-                pass
+                continue
+            while pending:
+                node = pending[-1]
+                if node['left'] is None:
+                    node['left'] = tree
+                    break
+                node['right'] = tree
+                tree = pending.pop()
+            if not pending:
+                return tree
     except StopIteration:
         pass
 
@@ -195,13 +208,27 @@ def buildExpr(tree):
     >>> print(ex2)
     (λx.x)
     """
-    if tree['root'] in var:
-        return LambdaVar(tree['root'])
-    elif tree['left']['root'] != None and tree['left']['root'][0] in op:
-        return LambdaAbs(tree['left']['root'][1], buildExpr(tree['right']))
-    else: # node is None, dict, dict neither contains op
-        return LambdaApp(buildExpr(tree['left']),\
-                         buildExpr(tree['right']))
+    results = []
+    stack = [(tree, False)]
+    while stack:
+        node, built = stack.pop()
+        if node['root'] != None and isVar(node['root']):
+            results.append(LambdaVar(node['root']))
+        elif node['left']['root'] != None and node['left']['root'][0] in op:
+            if built:
+                results.append(LambdaAbs(node['left']['root'][1:],\
+                                         results.pop()))
+            else:
+                stack.append((node, True))
+                stack.append((node['right'], False))
+        elif built: # node is None, dict, dict neither contains op
+            argument = results.pop()
+            results.append(LambdaApp(results.pop(), argument))
+        else:
+            stack.append((node, True))
+            stack.append((node['right'], False))
+            stack.append((node['left'], False))
+    return results[0]
 
 
 
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+:module name: lreadback
+:module author: Nicolas Osborne <nicolas.osborne@etudiant.univ-lille1.fr>
+:date: 2018
+
+:synopsis: Read-back of the values of the abstract machines into beta normal
+forms.
+
+The machines (Krivine, CEK, call by need, compiled closures, bytecode and
+explicit substitutions) only evaluate a term to a weak head normal form: an
+abstraction, or a head applied to arguments. The read-back carries on under
+the abstractions, binding their variable to a neutral level, and in the
+arguments of the heads, so that the result is the full beta normal form.
+
+Each machine describes its values with an expand function, and the read-back
+rebuilds the term around them. It is driven by an explicit stack of tasks:
+deep terms do not hit the recursion limit. The read-back is charged to the
+budget of the evaluation: the normal form of a small term may be huge.
+
+:Tests:
+
+>>> # values which are already terms
+... def expand(item, depth):
+...     if type(item) == DBAbs:
+...         return ("abs", item.hint, item.body)
+...     return ("term", item)
+>>> print(readBack(DBAbs(DBApp(DBFree("f"), DBVar(0)), "x"), expand))
+(λ.(f 0))
+>>> from lib.lbudget import Budget
+>>> term = DBAbs(DBApp(DBFree("f"), DBVar(0)), "x")
+>>> readBack(term, expand, Budget(maxSize=2)) # doctest: +IGNORE_EXCEPTION_DETAIL
+Traceback (most recent call last):
+...
+lbudget.SizeBudgetError: The term of step 2 has 4 nodes, more than 2.
+"""
+
+from lib.ldebruijn import *
+
+
+
+def readBack(item, expand, budget=None):
+    """
+    Read back the beta normal form of the value of a machine.
+
+    .. note::
+
+       A neutral variable is the level of its binder, counted from the root:
+       it is turned into the index of the depth it is read at.
+
+    :param item: the value to read back, or whatever expand takes
+    :type item: any
+    :param expand: give, for an item read at some depth (the number of
+       abstractions above it), either ("abs", hint, body) for an
+       abstraction, body being the item of its body with its variable bound
+       to the level depth, ("neutral", head, arguments) for a head (a DBFree,
+       a DBVar or a level) applied to the items of its arguments, first one
+       first, or ("term", term) for a term already in beta normal form
+    :type expand: function
+    :param budget: the budget charged a step for each item read, and
+       checked against the size of the nodes built, if any
+    :type budget: Budget or NoneType
+    :return: the beta normal form
+    :rtype: DBVar, DBFree, DBApp or DBAbs
+    """
+    results = []
+    # a task is either an item to read back at some depth, an abstraction to
+    # rebuild, or a head to apply to the last read back arguments
+    tasks = [("read", item, 0)]
+    while tasks:
+        task = tasks.pop()
+        if task[0] == "read":
+            _, item, depth = task
+            if budget is not None:
+                budget.tick()
+            shape = expand(item, depth)
+            if shape[0] == "abs":
+                tasks.append(("abs", shape[1]))
+                tasks.append(("read", shape[2], depth + 1))
+            elif shape[0] == "neutral":
+                _, head, arguments = shape
+                if type(head) == int:
+                    head = DBVar(depth - 1 - head)
+                tasks.append(("apply", head, len(arguments)))
+                for argument in reversed(arguments):
+                    tasks.append(("read", argument, depth))
+            else:
+                results.append(shape[1])
+        elif task[0] == "abs":
+            results.append(DBAbs(results.pop(), task[1]))
+            if budget is not None:
+                budget.checkSize(results[-1].size)
+        else:
+            _, head, count = task
+            if count:
+                arguments = results[-count:]
+                del results[-count:]
+                for argument in arguments:
+                    head = DBApp(head, argument)
+                if budget is not None:
+                    budget.checkSize(head.size)
+            results.append(head)
+    return results[0]
+
+
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
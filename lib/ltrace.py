@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+:module name: ltrace
+:module author: Nicolas Osborne <nicolas.osborne@etudiant.univ-lille1.fr>
+:date: 2018
+
+:synopsis: Compact traces of Beta-evaluations, with random access.
+
+A step of a Beta-evaluation only changes the redex it contracts: a trace
+records the starting term, then for each step the path from the root to the
+redex and the contractum, the term the redex is replaced by. The full term
+is also recorded every so many steps, as a checkpoint: step n is rebuilt
+from the last checkpoint before it, by replaying at most that many steps.
+
+A trace is written as lines of JSON, one line per step, flushed as they are
+written, so that a trace can be read while another process writes it:
+
+- the first line is a header: the format, its version, the order of
+  evaluation and the period of the checkpoints;
+- each next line holds the number of the step, the path to the redex (one
+  letter per node crossed: b for the body of an abstraction, f and a for
+  the function and the argument of an application) and the contractum;
+- the lines of the checkpoints also hold the term reached.
+
+The terms are written as their tables of nodes, see ldebruijn.toTable.
+
+:Tests:
+
+>>> import io
+>>> from lib.lread import read
+>>> expr = read("((/x.(xx))((/z.(tz))r))")
+>>> stream = io.StringIO()
+>>> writeTrace(expr.toDeBruijn(), stream, period=2)
+3
+>>> trace = TraceReader(stream)
+>>> len(trace)
+4
+>>> print(fromDeBruijn(trace[3]))
+((tr)(tr))
+>>> print(trace.step(1))
+('', (((λ.(t 0)) r) ((λ.(t 0)) r)))
+"""
+
+import json
+from lib.ldebruijn import *
+from lib.lzipper import *
+
+FORMAT = "fwlc-trace"
+VERSION = 1
+# the number of steps between two checkpoints
+CHECKPOINT_PERIOD = 64
+SIDES = {None: "b", "function": "f", "argument": "a"}
+
+# the constants of the format stay here: VERSION would hide lbytecode.VERSION
+__all__ = ["CHECKPOINT_PERIOD", "TraceError", "writeTrace", "replay",\
+           "TraceReader"]
+
+
+
+class TraceError(Exception):
+    """
+    Exception for traces which can not be read.
+    """
+    def __init__(self, msg):
+        self.message = msg
+
+
+
+def writeTrace(term, stream, evalMode="normal", period=CHECKPOINT_PERIOD,\
+               budget=None):
+    """
+    Perform a complete Beta-evaluation and write its trace.
+
+    .. note::
+
+       The steps are found by a zipper (see lib.lzipper): the search of each
+       redex resumes from the last one, and the whole term is only rebuilt
+       for the checkpoints, or if the budget looks for cycles.
+
+    :param term: the term to evaluate
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :param stream: the text stream to write the trace to
+    :type stream: file
+    :param evalMode: order of evaluation, either normal (default) or
+       applicative
+    :type evalMode: str
+    :param period: the number of steps between two checkpoints, at least 1
+    :type period: int
+    :param budget: the bounds on the evaluation, if any
+    :type budget: Budget or NoneType
+    :return: the number of steps
+    :rtype: int
+    :Examples:
+
+    >>> import io
+    >>> writeTrace(DBFree("x"), io.StringIO(), period=0) # doctest: +IGNORE_EXCEPTION_DETAIL
+    Traceback (most recent call last):
+    ...
+    ltrace.TraceError: The period of the checkpoints must be at least 1: 0
+    """
+    if evalMode not in ("normal", "applicative"):
+        raise TraceError("Unknown evaluation mode: " + str(evalMode))
+    if type(period) != int or period < 1:
+        raise TraceError("The period of the checkpoints must be at least 1: "\
+                         + str(period))
+    header = {"format": FORMAT, "version": VERSION, "mode": evalMode,\
+              "period": period}
+    writeLine(stream, header)
+    writeLine(stream, {"step": 0, "term": toTable(term)})
+    if budget is not None:
+        budget.start()
+        budget.check(term)
+    zipper = Zipper(term, evalMode)
+    while zipper.step():
+        sides, contractum = zipper.lastRedex()
+        if budget is not None:
+            budget.tick()
+            if budget.detectCycles:
+                budget.check(zipper.term())
+            elif budget.maxSize is not None:
+                budget.checkSize(zipper.size())
+        line = {"step": zipper.steps,\
+                "path": "".join(SIDES[side] for side in sides),\
+                "contractum": toTable(contractum)}
+        if zipper.steps % period == 0:
+            line["term"] = toTable(zipper.term())
+        writeLine(stream, line)
+    return zipper.steps
+
+
+
+def writeLine(stream, data):
+    """
+    Write a line of a trace and flush it.
+
+    :param stream: the text stream of the trace
+    :type stream: file
+    :param data: the content of the line
+    :type data: dict
+    """
+    stream.write(json.dumps(data, ensure_ascii=False,\
+                            separators=(",", ":")) + "\n")
+    stream.flush()
+
+
+
+def replay(term, letters, contractum):
+    """
+    Replace the subterm of a term at the end of a path by a contractum.
+
+    :param term: the term
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :param letters: the path, as written in the trace
+    :type letters: str
+    :param contractum: the new subterm
+    :type contractum: DBVar, DBFree, DBApp or DBAbs
+    :return: the new term
+    :rtype: DBVar, DBFree, DBApp or DBAbs
+    :Examples:
+
+    >>> print(replay(DBAbs(DBApp(DBFree("f"), DBFree("x"))), "ba", DBFree("y")))
+    (λ.(f y))
+    """
+    path = []
+    for letter in letters:
+        if letter == "b":
+            path.append((term, None))
+            term = term.body
+        elif letter == "f":
+            path.append((term, "function"))
+            term = term.function
+        else:
+            path.append((term, "argument"))
+            term = term.argument
+    return plug(path, contractum)
+
+
+
+class TraceReader():
+    """
+    Random access to the steps of a written trace.
+
+    .. note::
+
+       The stream is scanned once to find where each step starts, without
+       decoding the terms; refresh goes on with the steps written since.
+       The last term built is kept, so that reading the steps in order
+       only replays one step each time.
+
+    :param stream: the text stream of the trace, which must be seekable
+    :type stream: file
+
+    :attributes:
+
+    - evalMode
+    - period
+
+    :methods:
+
+    - __init__(self, stream)
+    - refresh(self)
+    - __len__(self)
+    - line(self, index)
+    - __getitem__(self, index)
+    - __iter__(self)
+    - step(self, index)
+    """
+    __slots__ = ('stream', 'evalMode', 'period', 'offsets', 'end', 'last')
+
+    def __init__(self, stream):
+        self.stream = stream
+        stream.seek(0)
+        try:
+            header = json.loads(stream.readline())
+            assert header["format"] == FORMAT and header["version"] == VERSION
+            assert type(header["period"]) == int and header["period"] >= 1
+        except (ValueError, KeyError, TypeError, AssertionError):
+            raise TraceError("This is not a trace of this version.")
+        self.evalMode = header["mode"]
+        self.period = header["period"]
+        # where each step starts, where the complete lines end, and the last
+        # step built with its number
+        self.offsets = []
+        self.end = stream.tell()
+        self.last = None
+        self.refresh()
+
+
+    def refresh(self):
+        """
+        Take into account the steps written since the last scan.
+        """
+        self.stream.seek(self.end)
+        while True:
+            offset = self.stream.tell()
+            line = self.stream.readline()
+            if not line.endswith("\n"):
+                break
+            self.offsets.append(offset)
+            self.end = self.stream.tell()
+
+
+    def __len__(self):
+        return len(self.offsets)
+
+
+    def line(self, index):
+        """
+        Read the line of a step.
+
+        :param index: the number of the step
+        :type index: int
+        :return: the content of the line
+        :rtype: dict
+        """
+        self.stream.seek(self.offsets[index])
+        return json.loads(self.stream.readline())
+
+
+    def __getitem__(self, index):
+        """
+        Get the term of a step.
+
+        :param index: the number of the step
+        :type index: int
+        :return: the term reached by the step
+        :rtype: DBVar, DBFree, DBApp or DBAbs
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("There is no step " + str(index) + ".")
+        start = index - index % self.period
+        if self.last is not None and start <= self.last[0] <= index:
+            start, term = self.last
+        else:
+            term = fromTable(self.line(start)["term"])
+        for current in range(start + 1, index + 1):
+            line = self.line(current)
+            term = replay(term, line["path"], fromTable(line["contractum"]))
+        self.last = (index, term)
+        return term
+
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+    def step(self, index):
+        """
+        Get what a step did.
+
+        :param index: the number of the step, at least 1
+        :type index: int
+        :return: the path to the redex (see replay) and the contractum
+        :rtype: tuple
+        """
+        if index == 0:
+            raise TraceError("The step 0 is the starting term.")
+        line = self.line(index)
+        return (line["path"], fromTable(line["contractum"]))
+
+
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
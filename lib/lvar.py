@@ -10,6 +10,38 @@
 """
 
 from lib.alphabet_def import *
+from lib.lintern import NODES
+
+
+def represent(expression):
+    """
+    Build the readable representation of an expression.
+
+    .. note::
+
+       The expression is walked with an explicit stack, so its depth is not
+       limited by the recursion limit: each node only gives the list of its
+       parts (see getParts), strings being printed as they are.
+
+    :param expression: the expression to represent
+    :type expression: any node providing getParts
+    :return: the representation
+    :rtype: str
+    :Examples:
+
+    >>> represent(LambdaVar("x"))
+    'x'
+    """
+    pieces = []
+    stack = [expression]
+    while stack:
+        current = stack.pop()
+        if type(current) == str:
+            pieces.append(current)
+        else:
+            stack.extend(reversed(current.getParts()))
+    return "".join(pieces)
+
 
 
 class LambdaVarError(Exception):
@@ -36,8 +68,11 @@ class LambdaVar():
 
     :methods:
     
-    - __init__(self, name)
+    - __new__(cls, name)
+    - __hash__(self)
+    - __setattr__(self, name, value)
     - __repr__(self)
+    - getParts(self)
     - getName(self)
     - rename(self, newName)
     - substitute(self, var_name, expression)
@@ -47,10 +82,20 @@ class LambdaVar():
 
 
 
-    def __init__(self, name):
+    __slots__ = ('name', 'freeVars', 'boundVars', 'betaNormal', 'hashValue',
+                 '__weakref__')
+
+
+
+    def __new__(cls, name):
         """
         Constructor for LambdaVar class.
 
+        .. note::
+
+           Variables are hash-consed: building a variable that already exists
+           returns the existing node.
+
         :param name: the name of the variable
         :type name: str
         :UC: name must be in the alphabet of variable
@@ -63,16 +108,30 @@ class LambdaVar():
         True
         >>> type(x.name) == str
         True
+        >>> print(LambdaVar("x12"))
+        x12
+        >>> x is LambdaVar("x")
+        True
         >>> error = LambdaVar(3)
         Traceback (most recent call last):
         ...
         LambdaVarError: This is not a lambda variable.
         """
         try:
-            assert name in VAR_SET
-            self.name = name
+            assert isVarName(name)
         except AssertionError:
             raise LambdaVarError('This is not a lambda variable.')
+        key = (cls, name)
+        node = NODES.get(key)
+        if node is None:
+            node = object.__new__(cls)
+            object.__setattr__(node, "name", name)
+            object.__setattr__(node, "freeVars", frozenset((name,)))
+            object.__setattr__(node, "boundVars", frozenset())
+            object.__setattr__(node, "betaNormal", True)
+            object.__setattr__(node, "hashValue", hash(key))
+            NODES[key] = node
+        return node
 
 
 
@@ -89,10 +148,21 @@ class LambdaVar():
 
 
 
+    def getParts(self):
+        """
+        Get the parts of the representation, see represent.
+
+        :rtype: list
+        """
+        return [self.name]
+
+
+
     def __eq__(self, other):
         """
         This is used for strict equivalence, that is for two lambda expressions
-        that are written exactly the same.
+        that are written exactly the same. Since the nodes are hash-consed,
+        this is an identity check.
 
         :return:
 
@@ -110,7 +180,23 @@ class LambdaVar():
         >>> x1 == y
         False
         """
-        return self.__repr__() == other.__repr__()
+        return self is other
+
+
+
+    def __hash__(self):
+        """
+        Get the structural hash, computed once when the node is built.
+        """
+        return self.hashValue
+
+
+
+    def __setattr__(self, name, value):
+        """
+        Lambda variables are immutable: use rename to get a new variable.
+        """
+        raise LambdaVarError("Lambda variables are immutable.")
 
 
 
@@ -133,14 +219,15 @@ class LambdaVar():
         :type old_name: str
         :param new_name: the new name to give
         :type new_name: str
-        :UC: new_name in VAR_SET == True
+        :return: the renamed variable
+        :rtype: LambdaVar
+        :UC: isVarName(new_name) == True
         :Examples:
 
-        >>> x = LambdaVar("x")
-        >>> x.rename("x", "y")
+        >>> x = LambdaVar("x").rename("x", "y")
         >>> x.getName() == "y"
         True
-        >>> x.rename("x", "z")
+        >>> x = x.rename("x", "z")
         >>> x.getName() == "z"
         False
         >>> x.getName() == "y"
@@ -151,11 +238,13 @@ class LambdaVar():
         LambdaVarError: This is not the name of a lambda variable.
         """
         try:
-            assert new_name in VAR_SET
-            if self.name == old_name:
-                self.name = new_name
+            assert isVarName(new_name)
         except AssertionError:
             raise LambdaVarError("This is not the name of a lambda variable.")
+        if self.name == old_name:
+            return LambdaVar(new_name)
+        else:
+            return self
 
 
 
@@ -164,14 +253,14 @@ class LambdaVar():
         Get free variable in the expression.
 
         :return: the name of the variable
-        :rtype: str
+        :rtype: frozenset
         :Examples:
 
         >>> x = LambdaVar("x")
         >>> x.freeVar() == {"x"}
         True
         """
-        return set(self.name)
+        return self.freeVars
 
 
     def boundVar(self):
@@ -179,11 +268,13 @@ class LambdaVar():
         Get the set of bound variables in the expression.
 
         :return: the set of the bound variables
-        :rtype: set
+        :rtype: frozenset
         :Examples:
 
+        >>> LambdaVar("x").boundVar() == set()
+        True
         """
-        return set()
+        return self.boundVars
 
 
 
@@ -242,7 +333,7 @@ class LambdaVar():
         >>> LambdaVar("x").isBetaNormal()
         True
         """
-        return True
+        return self.betaNormal
 
 
 
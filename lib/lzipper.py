@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+:module name: lzipper
+:module author: Nicolas Osborne <nicolas.osborne@etudiant.univ-lille1.fr>
+:date: 2018
+
+:synopsis: Beta-evaluation with a zipper, resuming the search of the redexes
+where the last one was contracted.
+
+A zipper is a term seen from one of its subterms, the focus: it keeps the
+focus and the path from the root to it, the nodes crossed and the side taken
+at each one. Replacing the focus costs nothing, and the nodes above it are
+only rebuilt when the zipper moves up through them.
+
+After a contraction, the next redex is searched from the contractum rather
+than from the root:
+
+- the nodes on the left of the path are in normal form, since the redex was
+  the leftmost outermost one (in normal order), or the nodes on its right
+  are (in applicative order), so the next redex is either in the contractum
+  or on the other side of an ancestor, which the zipper reaches by moving up
+  until it finds a subterm which is not in normal form;
+- in normal order, a contraction also creates a redex above it when the
+  contractum is an abstraction applied to an argument: it is the only redex
+  which can be created above, and the zipper moves up to it at once.
+
+The steps are thus the very ones of oneStepNOBetaEval and oneStepAOBetaEval,
+but finding the next redex only costs the moves from the last one, instead of
+a walk from the root and a rebuilding of the whole path at each step.
+
+With eta, the zipper also contracts the eta redexes it meets, towards the
+beta-eta normal form: in normal order an abstraction is contracted before its
+body is searched, in applicative order once its body is normal. A contraction
+may make an eta redex of an ancestor, which is found when the zipper moves up
+through it, since the nodes are rebuilt with their flags on the way up.
+
+:Tests:
+
+>>> from lib.lread import read
+>>> expr = read("((/x.(xx))((/z.(tz))r))")
+>>> zipper = Zipper(expr.toDeBruijn())
+>>> while zipper.step():
+...     print(fromDeBruijn(zipper.term()))
+(((λz.(tz))r)((λz.(tz))r))
+((tr)((λz.(tz))r))
+((tr)(tr))
+"""
+
+from lib.ldebruijn import *
+
+
+
+class Zipper():
+    """
+    Term focused on one of its subterms, reduced step by step.
+
+    :param term: the term to reduce
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :param evalMode: order of evaluation, either normal (default) or
+       applicative
+    :type evalMode: str
+    :param eta: whether to contract the eta redexes too
+    :type eta: bool
+
+    :attributes:
+
+    - focus, the subterm in focus
+    - path, the nodes crossed from the root to the focus, with the side
+      taken (None for the body of an abstraction, function or argument for
+      an application)
+    - evalMode
+    - eta
+    - steps, the number of beta steps performed so far
+    - etaSteps, the number of eta steps performed so far
+    - redexDepth, the length of the path to the last beta redex contracted
+
+    :methods:
+
+    - __init__(self, term, evalMode, eta)
+    - up(self)
+    - term(self)
+    - size(self)
+    - step(self)
+    - lastRedex(self)
+    - raiseRedex(self)
+    """
+    __slots__ = ('focus', 'path', 'evalMode', 'eta', 'steps', 'etaSteps',\
+                 'redexDepth')
+
+    def __init__(self, term, evalMode="normal", eta=False):
+        if evalMode not in ("normal", "applicative"):
+            raise DeBruijnError("Unknown evaluation mode: " + str(evalMode))
+        self.focus = term
+        self.path = []
+        self.evalMode = evalMode
+        self.eta = eta
+        self.steps = 0
+        self.etaSteps = 0
+        self.redexDepth = None
+
+
+    def up(self):
+        """
+        Move the focus to its parent, rebuilding it.
+        """
+        parent, side = self.path.pop()
+        if side is None:
+            self.focus = DBAbs(self.focus, parent.hint)
+        elif side == "function":
+            self.focus = DBApp(self.focus, parent.argument)
+        else:
+            self.focus = DBApp(parent.function, self.focus)
+
+
+    def term(self):
+        """
+        Get the whole term, the zipper staying where it is.
+
+        :return: the term
+        :rtype: DBVar, DBFree, DBApp or DBAbs
+        """
+        return plug(list(self.path), self.focus)
+
+
+    def size(self):
+        """
+        Get the size of the whole term, without rebuilding it.
+
+        :return: the number of nodes of the term
+        :rtype: int
+        :Examples:
+
+        >>> identity = DBAbs(DBVar(0), "x")
+        >>> zipper = Zipper(DBApp(DBFree("f"), DBApp(identity, identity)))
+        >>> zipper.step(), zipper.size() == zipper.term().size
+        (True, True)
+        """
+        size = self.focus.size
+        for parent, side in self.path:
+            if side is None:
+                size += 1
+            elif side == "function":
+                size += 1 + parent.argument.size
+            else:
+                size += 1 + parent.function.size
+        return size
+
+
+    def step(self):
+        """
+        Perform one step of Beta-evaluation, or of Eta-evaluation with eta.
+
+        :return:
+
+           - True if a redex has been contracted
+           - False if the term is in normal form
+
+        :rtype: bool
+        :Examples:
+
+        >>> identity = DBAbs(DBVar(0), "x")
+        >>> zipper = Zipper(DBApp(DBApp(identity, identity), DBFree("y")))
+        >>> zipper.step(), zipper.step(), zipper.step()
+        (True, True, False)
+        >>> print(zipper.term(), zipper.steps)
+        y 2
+        >>> # (λx.((λy.y)fx))  ->  (λx.(fx))  ->  f
+        ... term = DBAbs(DBApp(DBApp(identity, DBFree("f")), DBVar(0)), "x")
+        >>> zipper = Zipper(term, eta=True)
+        >>> zipper.step(), zipper.step(), zipper.step()
+        (True, True, False)
+        >>> print(zipper.term(), zipper.steps, zipper.etaSteps)
+        f 1 1
+        """
+        path = self.path
+        normal = self.evalMode == "normal"
+        eta = self.eta
+        focus = self.focus
+        while True:
+            if focus.betaNormal and (focus.etaNormal or not eta):
+                if not path:
+                    self.focus = focus
+                    return False
+                self.focus = focus
+                self.up()
+                focus = self.focus
+            elif type(focus) == DBAbs:
+                body = focus.body
+                if eta and focus.isEtaRedex() and (normal or body.betaNormal\
+                                                   and body.etaNormal):
+                    self.focus = focus.etaReduction()
+                    self.etaSteps += 1
+                    self.raiseRedex()
+                    return True
+                path.append((focus, None))
+                focus = body
+            elif normal:
+                if type(focus.function) == DBAbs:
+                    break
+                elif not (focus.function.betaNormal\
+                          and (focus.function.etaNormal or not eta)):
+                    path.append((focus, "function"))
+                    focus = focus.function
+                else:
+                    path.append((focus, "argument"))
+                    focus = focus.argument
+            else:
+                if not (focus.argument.betaNormal\
+                        and (focus.argument.etaNormal or not eta)):
+                    path.append((focus, "argument"))
+                    focus = focus.argument
+                elif not (focus.function.betaNormal\
+                          and (focus.function.etaNormal or not eta)):
+                    path.append((focus, "function"))
+                    focus = focus.function
+                else:
+                    break
+        self.focus = focus.betaReduction()
+        self.steps += 1
+        self.redexDepth = len(path)
+        self.raiseRedex()
+        return True
+
+
+    def lastRedex(self):
+        """
+        Get where the last beta step took place, as redexPath gives it.
+
+        :return: the sides taken from the root to the redex (None for the
+           body of an abstraction, function or argument for an application)
+           and the contractum
+        :rtype: tuple
+        :UC: the last step is a beta step
+        :Examples:
+
+        >>> identity = DBAbs(DBVar(0), "x")
+        >>> zipper = Zipper(DBApp(DBFree("f"), DBApp(identity, DBFree("y"))))
+        >>> zipper.step()
+        True
+        >>> sides, contractum = zipper.lastRedex()
+        >>> print(sides, contractum)
+        ['argument'] y
+        """
+        sides = [side for _, side in self.path[:self.redexDepth]]
+        contractum = self.focus
+        if len(self.path) < self.redexDepth:
+            # raiseRedex moved up to the application of the contractum
+            sides.append("function")
+            contractum = contractum.function
+        return (sides, contractum)
+
+
+    def raiseRedex(self):
+        """
+        Move the focus up to its parent if the contractum in focus makes a
+        redex of it, which comes first in normal order.
+        """
+        path = self.path
+        if self.evalMode == "normal" and type(self.focus) == DBAbs and path\
+           and path[-1][1] == "function":
+            self.up()
+
+
+
+def zipperNormalForm(term, evalMode="normal", budget=None, eta=False):
+    """
+    Compute the beta normal form of a term with a zipper, or its beta-eta
+    normal form with eta.
+
+    .. note::
+
+       The whole term is only rebuilt at each step if the budget looks for
+       cycles; its size is computed from the path of the zipper.
+
+    :param term: the term to reduce
+    :type term: DBVar, DBFree, DBApp or DBAbs
+    :param evalMode: order of evaluation, either normal (default) or
+       applicative
+    :type evalMode: str
+    :param budget: the bounds on the evaluation, if any
+    :type budget: Budget or NoneType
+    :param eta: whether to contract the eta redexes too
+    :type eta: bool
+    :return: the normal form of term and the number of beta steps
+    :rtype: tuple
+    :Examples:
+
+    >>> two = DBAbs(DBAbs(DBApp(DBVar(1), DBApp(DBVar(1), DBVar(0))), "x"), "f")
+    >>> term, steps = zipperNormalForm(DBApp(DBApp(two, two), DBFree("g")))
+    >>> print(term, steps)
+    (λ.(g (g (g (g 0))))) 7
+    >>> g = DBAbs(DBApp(DBFree("g"), DBVar(0)), "x")
+    >>> print(zipperNormalForm(DBApp(two, g), eta=True)[0])
+    (λ.(g (g 0)))
+    """
+    zipper = Zipper(term, evalMode, eta)
+    while zipper.step():
+        if budget is not None:
+            budget.tick()
+            if budget.detectCycles:
+                budget.check(zipper.term())
+            elif budget.maxSize is not None:
+                budget.checkSize(zipper.size())
+    return (zipper.term(), zipper.steps)
+
+
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -35,12 +35,16 @@ False
 False
 >>> initParsing("(xy)(zt)")
 False
+>>> initParsing("((/x1.(x1y2))x12)")
+True
+>>> initParsing("(1y)")
+False
 """
 
 
 import lib.alphabet_def
 
-var = lib.alphabet_def.VAR_SET
+isVar = lib.alphabet_def.isVarName
 op = lib.alphabet_def.POSSIBLE_OP
 dot = lib.alphabet_def.LAMBDA_DOT
 opening = '('
@@ -61,15 +65,21 @@ def initParsing(candidate):
 
     if type(candidate) != str:
         return False
-    elif candidate in var:
+    elif isVar(candidate):
         return True
     else:
-        iteration = iter(candidate)
+        iteration = lib.alphabet_def.tokenize(candidate)
         char = next(iteration)
         if char != opening:
             return False
         else:
-            return anythingButClosing(iteration, 1)
+            state = (anythingButClosing, 1)
+            # each state gives the next one instead of calling it, so that
+            # the depth of the candidate is not bound by the Python stack
+            while type(state) == tuple:
+                nextState, cpt = state
+                state = nextState(iteration, cpt)
+            return state
 
 
 
@@ -84,17 +94,18 @@ def varOrOpening(iteration, cpt):
     :type iteration: iterator
     :param cpt: take count of the opening bracket that are not yet closed
     :type cpt: int
-    :return: true if iteration is well formed, false otherwise
-    :rtype: bool
+    :return: the next state and its count, or whether iteration is well
+       formed
+    :rtype: tuple or bool
     """
     try:
         char = next(iteration)
         if cpt == 0:
             return False
-        elif char in var:
-            return onlyClosing(iteration, cpt)
+        elif isVar(char):
+            return (onlyClosing, cpt)
         elif char == opening:
-            return anythingButClosing(iteration, cpt+1)
+            return (anythingButClosing, cpt+1)
         else: # char is op or closing or dot or not in the alphabet
             return False
 
@@ -116,22 +127,23 @@ def anythingButClosing(iteration, cpt):
     :type iteration: iterator
     :param cpt: take count of the opening bracket that are not yet closed
     :type cpt: int
-    :return: true if iteration is well formed, false otherwise
-    :rtype: bool
+    :return: the next state and its count, or whether iteration is well
+       formed
+    :rtype: tuple or bool
     """
     try:
         char = next(iteration)
         if cpt == 0:
             return False
         elif char == opening:
-            return anythingButClosing(iteration, cpt+1)
-        elif char in var:
-            return varOrOpening(iteration, cpt)
+            return (anythingButClosing, cpt+1)
+        elif isVar(char):
+            return (varOrOpening, cpt)
         elif char in op:
             binder = next(iteration)
             point = next(iteration)
-            if binder in var and point == dot:
-                return varOrOpening(iteration, cpt)
+            if isVar(binder) and point == dot:
+                return (varOrOpening, cpt)
             else:
                 return False
         else: # char is closing, dot or not in the alphabet
@@ -153,8 +165,9 @@ def anythingButOp(iteration, cpt):
     :type iteration: iterator
     :param cpt: take count of the opening bracket that are not yet closed
     :type cpt: int
-    :return: true if iteration is well formed, false otherwise
-    :rtype: bool
+    :return: the next state and its count, or whether iteration is well
+       formed
+    :rtype: tuple or bool
     """
         
     try:
@@ -162,11 +175,11 @@ def anythingButOp(iteration, cpt):
         if cpt == 0:
             return False
         elif char == closing:
-            return anythingButOp(iteration, cpt-1)
+            return (anythingButOp, cpt-1)
         elif char == opening:
-            return anythingButClosing(iteration, cpt+1)
-        elif char in var:
-            return varOrClosing(iteration, cpt)
+            return (anythingButClosing, cpt+1)
+        elif isVar(char):
+            return (varOrClosing, cpt)
         else: # char is dot, in op or not in alphabet
             return False
         
@@ -185,17 +198,18 @@ def varOrClosing(iteration, cpt):
     :type iteration: iterator
     :param cpt: take count of the opening bracket that are not yet closed
     :type cpt: int
-    :return: true if iteration is well formed, false otherwise
-    :rtype: bool
+    :return: the next state and its count, or whether iteration is well
+       formed
+    :rtype: tuple or bool
     """
     try:
         char = next(iteration)
         if cpt == 0:
             return False
         elif char == closing:
-            return anythingButOp(iteration, cpt-1)
-        elif char in var:
-            return onlyClosing(iteration, cpt)
+            return (anythingButOp, cpt-1)
+        elif isVar(char):
+            return (onlyClosing, cpt)
         else: # char is op, dot, opening or not in the alphabet
             return False
 
@@ -217,15 +231,16 @@ def onlyClosing(iteration, cpt):
     :type iteration: iterator
     :param cpt: take count of the opening bracket that are not yet closed
     :type cpt: int
-    :return: true if iteration is well formed, false otherwise
-    :rtype: bool
+    :return: the next state and its count, or whether iteration is well
+       formed
+    :rtype: tuple or bool
     """
     try:
         char = next(iteration)
         if cpt == 0:
             return False
         elif char == closing:
-            return anythingButOp(iteration, cpt-1)
+            return (anythingButOp, cpt-1)
         else: # char is opening, in var, op or not in the alphabet
             return False
 
@@ -29,12 +29,14 @@ False
 False
 >>> testTree({'root': None, 'left': 'x', 'rigth': 'y'})
 False
+>>> testTree({'root': '/x12', 'left': None, 'right': None})
+True
 """
 
 
 import lib.alphabet_def
 
-var = lib.alphabet_def.VAR_SET
+isVar = lib.alphabet_def.isVarName
 op = lib.alphabet_def.POSSIBLE_OP
 
 
@@ -47,20 +49,25 @@ def testTree(tree):
     :return: True if tree is a well formed input for buildExpr, false otherwise
     :rtype: bool
     """
+    stack = [tree]
     try:
-        assert type(tree) == dict
-        assert tree.keys() == {'root', 'left', 'right'}
-        
-        if tree['root'] == None:
-            return testTree(tree['left']) and testTree(tree['right'])
-        elif tree['root'] in var:
-            return tree['left'] == None and tree['right'] == None
-        elif len(tree['root']) == 2\
-             and tree['root'][0] in op\
-             and tree['root'][1] in var:
-            return tree['left'] == None and tree['right'] == None
-        else:
-            return False
+        while stack:
+            node = stack.pop()
+            assert type(node) == dict
+            assert node.keys() == {'root', 'left', 'right'}
+
+            if node['root'] == None:
+                stack.append(node['right'])
+                stack.append(node['left'])
+            elif isVar(node['root']):
+                assert node['left'] == None and node['right'] == None
+            elif len(node['root']) >= 2\
+                 and node['root'][0] in op\
+                 and isVar(node['root'][1:]):
+                assert node['left'] == None and node['right'] == None
+            else:
+                return False
+        return True
 
     except AssertionError:
         return False